@@ -1,65 +1,259 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.middleware.cors import CORSMiddleware
-from src.document_processor import DocumentProcessor
-from src.llm_engine import ContractAnalyzer
-from src.report_generator import generate_pdf_report
-import shutil
-import os
-
-# --- 1. INITIALIZE APP FIRST (Must be at the top) ---
-app = FastAPI()
-
-# --- 2. SETUP CORS (Allows Frontend to talk to Backend) ---
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# --- 3. INITIALIZE ENGINES ---
-analyzer = ContractAnalyzer()
-
-# --- 4. DEFINE ENDPOINTS ---
-@app.post("/analyze")
-async def analyze_contract(
-    file: UploadFile = File(...), 
-    language: str = Form("English")
-):
-    # A. Save temp file
-    temp_filename = f"temp_{file.filename}"
-    with open(temp_filename, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # B. Extract Text
-    text, error = DocumentProcessor.extract_text(temp_filename)
-    
-    # Clean up immediately
-    if os.path.exists(temp_filename):
-        os.remove(temp_filename)
-
-    # C. Handle Extraction Errors
-    if error:
-        return {
-            "error": error, 
-            "risk_score": 0, 
-            "clauses": [], 
-            "summary": "Could not extract text.",
-            "executive_advice": "Please upload a valid text-based PDF or DOCX."
-        }
-    
-    # D. Analyze with AI
-    result = analyzer.analyze_contract(text, language=language)
-    
-    return result
-
-@app.post("/generate-pdf")
-async def generate_pdf(data: dict):
-    # This endpoint is optional for now, but good to keep
-    try:
-        pdf_bytes = generate_pdf_report(data, "contract.pdf")
-        return {"status": "success", "size": len(pdf_bytes)}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-
+import time
+_import_started = time.perf_counter()  # For the start-up report
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from src.document_processor import DocumentProcessor
+from src.llm_engine import ContractAnalyzer
+from src.analysis_cache import AnalysisCache
+from src.translation import TranslationCache
+from src.version_store import VersionStore
+from src.clause_index import ClauseIndex
+from src.job_queue import JobQueue, QueueFullError
+from src.scheduler import llm_priority, prioritized, SchedulerOverloadedError
+from src.audit_logger import AuditLogger
+from src.metrics import stage_trace, render_prometheus, STARTUP
+from src.report_generator import get_pdf_report, is_pdf
+import asyncio
+import io
+import json
+import os
+import re
+from urllib.parse import quote
+
+STARTUP.record("imports", time.perf_counter() - _import_started)
+
+# --- 1. INITIALIZE APP FIRST (Must be at the top) ---
+app = FastAPI()
+
+# --- 2. SETUP CORS (Allows Frontend to talk to Backend) ---
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# --- 3. INITIALIZE ENGINES ---
+with STARTUP.step("engines"):
+    analysis_cache = AnalysisCache()
+    # CLAUSE_REUSE=1 resolves near-duplicate sections from earlier analyses (opt-in: reused
+    # sections only carry their clauses, so the score and summary come from the novel text)
+    clause_index = ClauseIndex() if os.getenv("CLAUSE_REUSE", "0") == "1" else None
+    translation_cache = TranslationCache()
+    # OLLAMA_PREWARM=0 skips loading the model at start-up
+    analyzer = ContractAnalyzer(cache=analysis_cache, versions=VersionStore(), clause_index=clause_index,
+                                translations=translation_cache, prewarm=os.getenv("OLLAMA_PREWARM", "1") == "1")
+    logger = AuditLogger()
+    # Extraction and Ollama calls are blocking, so they run on a bounded worker pool off the event loop
+    job_queue = JobQueue(max_workers=2, max_queue=20)
+print(STARTUP.render())
+
+def client_id(request):
+    # Fair sharing is per client: an explicit X-Client-Id, else the caller's address
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+def run_analysis_job(job, filename, content, language, mode="full", priority="api", client="anonymous"):
+    with stage_trace(), llm_priority(priority, client):
+        # A. Extract Text (in-memory upload; DocumentProcessor picks the parser from .name)
+        upload = io.BytesIO(content)
+        upload.name = filename
+        text, offset_index, error = DocumentProcessor.extract_with_index(upload)
+
+        # B. Handle Extraction Errors
+        if error:
+            logger.log_event("API_ANALYSIS", filename, 0, status="Failed", metadata={"error": error})
+            return {
+                "error": error, 
+                "risk_score": 0, 
+                "clauses": [], 
+                "summary": "Could not extract text.",
+                "executive_advice": "Please upload a valid text-based PDF or DOCX."
+            }
+
+        if job.cancel_event.is_set():
+            return None
+
+        # C. Analyze with AI
+        # Identical concurrent uploads share one analysis; cancelling this job only detaches it
+        result = analyzer.analyze_contract(text, language=language, mode=mode, cancel_event=job.cancel_event,
+                                           offset_index=offset_index)
+        if job.cancel_event.is_set():
+            return None
+        logger.log_event("API_ANALYSIS", filename, result.get("risk_score", 0),
+                         status="Failed" if "error" in result else "Success", metadata={"mode": mode})
+        return result
+
+def admit_or_503(priority):
+    # Admission control: refuse new work while the model queue for this class is full
+    admit = getattr(analyzer.backend, "admit", None)
+    if admit is None:
+        return  # Backend without a scheduler
+    try:
+        admit(priority)
+    except SchedulerOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+async def submit_upload(file, language, mode="full", priority="api", client="anonymous"):
+    if mode not in ContractAnalyzer.ANALYSIS_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(ContractAnalyzer.ANALYSIS_MODES)}")
+    if priority not in ("api", "batch"):
+        raise HTTPException(status_code=422, detail="priority must be one of api, batch")
+    admit_or_503(priority)
+    content = await file.read()
+    try:
+        return job_queue.submit(run_analysis_job, file.filename, content, language, mode, priority, client,
+                                description=file.filename)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def get_job_or_404(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --- 4. DEFINE ENDPOINTS ---
+@app.post("/analyze")
+async def analyze_contract(
+    request: Request,
+    file: UploadFile = File(...), 
+    language: str = Form("English"),
+    mode: str = Form("full")
+):
+    # Synchronous-style endpoint: waits for its job without blocking other requests
+    job = await submit_upload(file, language, mode, "api", client_id(request))
+    future = asyncio.wrap_future(job.future)
+    while not future.done():
+        if await request.is_disconnected():
+            # The caller left: cancel its job (a shared analysis continues for the others)
+            job_queue.cancel(job.id)
+            raise HTTPException(status_code=499, detail="Client disconnected")
+        await asyncio.wait({future}, timeout=1)
+    if future.cancelled() or job.status in ("cancelling", "cancelled"):
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    return future.result()
+
+@app.post("/analyze/stream")
+async def analyze_contract_stream(
+    request: Request,
+    file: UploadFile = File(...), 
+    language: str = Form("English")
+):
+    # Server-sent events: one event per completed field / clause, then "done"
+    admit_or_503("api")
+    content = await file.read()
+    filename = file.filename
+    client = client_id(request)
+
+    def event_stream():
+        # Sync generator, so Starlette iterates it in a worker thread
+        upload = io.BytesIO(content)
+        upload.name = filename
+        text, offset_index, error = DocumentProcessor.extract_with_index(upload)
+        if error:
+            events = [{"event": "error", "value": {"error": error}}]
+        else:
+            events = analyzer.stream_analysis(text, language=language, offset_index=offset_index)
+        for event in events:
+            payload = {k: v for k, v in event.items() if k != "event"}
+            yield f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+
+    # Starlette advances the generator from worker threads, so the priority travels with it
+    return StreamingResponse(prioritized(event_stream(), "api", client), media_type="text/event-stream")
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    file: UploadFile = File(...), 
+    language: str = Form("English"),
+    mode: str = Form("full"),
+    priority: str = Form("batch")
+):
+    # Background jobs default to batch priority so they never hold up interactive reviews
+    job = await submit_upload(file, language, mode, priority, client_id(request))
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = get_job_or_404(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = get_job_or_404(job_id)
+    return {"job_id": job.id, "cancelled": job_queue.cancel(job.id), "status": job.status}
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "queue": job_queue.stats()}
+
+@app.get("/queue/stats")
+async def queue_stats():
+    return job_queue.stats()
+
+@app.get("/startup")
+async def startup_report():
+    # model_warmup appears once the background pre-warm has finished
+    return STARTUP.as_dict()
+
+@app.get("/backends")
+async def backend_stats():
+    return analyzer.backend.stats()
+
+@app.get("/audit/logs")
+async def audit_logs(
+    start: str = None, end: str = None, event_type: str = None, filename: str = None,
+    min_risk: float = None, max_risk: float = None, limit: int = 100, offset: int = 0
+):
+    # Served from the audit index; only the requested page of entries is read from disk
+    return logger.query(start=start, end=end, event_type=event_type, filename=filename,
+                        min_risk=min_risk, max_risk=max_risk, limit=min(limit, 1000), offset=offset)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text format: stage histograms, LLM sizes/outcomes, cache and queue gauges
+    queue = job_queue.stats()
+    gauges = [
+        "# TYPE contract_job_queue_length gauge",
+        f"contract_job_queue_length {queue['queue_length']}",
+        "# TYPE contract_job_workers_busy gauge",
+        f"contract_job_workers_busy {queue['running']}",
+    ]
+    return render_prometheus() + "\n".join(gauges) + "\n"
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**analysis_cache.stats(), "clause_index": clause_index.stats() if clause_index else None,
+            "translations": translation_cache.stats(), "single_flight": analyzer.single_flight_stats()}
+
+@app.post("/generate-pdf")
+async def generate_pdf(data: dict, filename: str = "contract.pdf"):
+    # Rendering is CPU-bound, so it runs off the event loop; repeat requests hit the report cache
+    pdf_bytes = await asyncio.to_thread(get_pdf_report, data, filename)
+    if not is_pdf(pdf_bytes):
+        raise HTTPException(status_code=500, detail="PDF generation failed")
+
+    def chunks(size=64 * 1024):
+        for start in range(0, len(pdf_bytes), size):
+            yield pdf_bytes[start:start + size]
+
+    # `filename` comes from the client: keep only its last path component and nothing that could break the header
+    base = re.split(r"[\\/]", filename)[-1]
+    report_name = re.sub(r'["\r\n]', "_", base.rsplit(".", 1)[0]) + "_report.pdf"
+    ascii_name = report_name.encode("ascii", "replace").decode("ascii").replace("?", "_")
+    return StreamingResponse(chunks(), media_type="application/pdf", headers={
+        "Content-Disposition": f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(report_name)}",
+        "Content-Length": str(len(pdf_bytes)),
+    })
+
 # Run using: uvicorn api:app --reload
\ No newline at end of file
@@ -1,345 +1,552 @@
-import streamlit as st
-import pandas as pd
-import json
-
-# Import Custom Modules
-from src.document_processor import DocumentProcessor
-from src.llm_engine import ContractAnalyzer
-from src.audit_logger import AuditLogger
-from src.report_generator import generate_pdf_report
-from src.utils import highlight_text 
-
-# -----------------------------------------------------------------------------
-# 1. PAGE CONFIGURATION
-# -----------------------------------------------------------------------------
-st.set_page_config(
-    page_title="ContractSentinel AI",
-    page_icon="⚖️",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# -----------------------------------------------------------------------------
-# 2. PREMIUM CSS OVERHAUL
-# -----------------------------------------------------------------------------
-st.markdown("""
-<style>
-    /* IMPORT FONTS */
-    @import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700&display=swap');
-    
-    /* GLOBAL RESET */
-    * {
-        font-family: 'Plus Jakarta Sans', sans-serif !important;
-    }
-    
-    .stApp {
-        background-color: #f3f4f6;
-    }
-
-    /* HIDE STREAMLIT CHROME */
-    #MainMenu, footer, header {visibility: hidden;}
-    
-    /* SIDEBAR STYLING */
-    [data-testid="stSidebar"] {
-        background-color: #0f172a; /* Midnight Blue */
-        border-right: none;
-    }
-    [data-testid="stSidebar"] * {
-        color: #94a3b8;
-    }
-    [data-testid="stSidebar"] h1 {
-        color: white;
-        font-size: 1.5rem;
-    }
-
-    /* CUSTOM GRADIENT BUTTONS */
-    div.stButton > button {
-        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
-        color: white;
-        border: none;
-        padding: 12px 24px;
-        border-radius: 12px;
-        font-weight: 600;
-        box-shadow: 0 4px 6px -1px rgba(37, 99, 235, 0.3);
-        transition: all 0.3s ease;
-    }
-    div.stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 10px 15px -3px rgba(37, 99, 235, 0.4);
-    }
-    
-    /* GLASSMORPHISM CARDS */
-    .premium-card {
-        background: white;
-        padding: 24px;
-        border-radius: 16px;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05), 0 2px 4px -1px rgba(0, 0, 0, 0.03);
-        border: 1px solid rgba(255,255,255,0.5);
-        margin-bottom: 24px;
-    }
-    
-    /* METRIC WIDGETS */
-    [data-testid="stMetric"] {
-        background: white;
-        padding: 20px;
-        border-radius: 16px;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
-        border: 1px solid #e5e7eb;
-    }
-    [data-testid="stMetricLabel"] {
-        font-size: 0.85rem;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        color: #64748b;
-    }
-    [data-testid="stMetricValue"] {
-        font-size: 2rem;
-        font-weight: 700;
-        color: #0f172a;
-    }
-
-    /* RISK BADGES */
-    .badge-high {
-        background: #fee2e2;
-        color: #991b1b;
-        padding: 4px 12px;
-        border-radius: 9999px;
-        font-size: 0.75rem;
-        font-weight: 700;
-        text-transform: uppercase;
-        display: inline-block;
-    }
-    .badge-medium {
-        background: #ffedd5;
-        color: #9a3412;
-        padding: 4px 12px;
-        border-radius: 9999px;
-        font-size: 0.75rem;
-        font-weight: 700;
-        text-transform: uppercase;
-        display: inline-block;
-    }
-
-    /* DOCUMENT PREVIEW */
-    .doc-paper {
-        background: white;
-        padding: 40px;
-        min-height: 600px;
-        box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-        border-radius: 4px;
-        font-family: 'Georgia', serif;
-        line-height: 1.8;
-        color: #334155;
-    }
-
-    /* HERO GRADIENT TEXT */
-    .gradient-text {
-        background: linear-gradient(to right, #2563eb, #7c3aed);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-weight: 800;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# -----------------------------------------------------------------------------
-# 3. SESSION STATE
-# -----------------------------------------------------------------------------
-if "analysis_result" not in st.session_state:
-    st.session_state.analysis_result = None
-if "full_text" not in st.session_state:
-    st.session_state.full_text = ""
-if "current_filename" not in st.session_state:
-    st.session_state.current_filename = ""
-
-analyzer = ContractAnalyzer()
-logger = AuditLogger()
-
-# -----------------------------------------------------------------------------
-# 4. DARK SIDEBAR NAVIGATION
-# -----------------------------------------------------------------------------
-with st.sidebar:
-    st.markdown("<h1 style='color:white; margin-bottom:0;'>Contract<span style='color:#3b82f6'>Sentinel</span></h1>", unsafe_allow_html=True)
-    st.markdown("<p style='font-size:0.8rem; opacity:0.6; margin-top:0;'>ENTERPRISE EDITION v2.0</p>", unsafe_allow_html=True)
-    st.markdown("---")
-    
-    st.markdown("### ⚙️ **Configuration**")
-    target_lang = st.radio("Target Language", ["English", "Hindi"], label_visibility="collapsed")
-    
-    st.markdown("### 📂 **Upload File**")
-    uploaded_file = st.file_uploader("Upload Contract", type=["pdf", "docx", "txt"], label_visibility="collapsed")
-    
-    if uploaded_file:
-        st.success(f" Ready: {uploaded_file.name}")
-        st.markdown("<br>", unsafe_allow_html=True)
-        
-        if st.button("✨ START ANALYSIS", type="primary", use_container_width=True):
-            with st.spinner("🤖 AI Consultant is reviewing..."):
-                text, error = DocumentProcessor.extract_text(uploaded_file)
-                if error:
-                    st.error(error)
-                else:
-                    st.session_state.full_text = text
-                    st.session_state.current_filename = uploaded_file.name
-                    result = analyzer.analyze_contract(text, language=target_lang)
-                    if "error" in result:
-                        st.error(result["error"])
-                    else:
-                        st.session_state.analysis_result = result
-                        logger.log_event("ANALYSIS", uploaded_file.name, result.get("risk_score", 0))
-
-    st.markdown("---")
-    st.markdown("<div style='background:#1e293b; padding:15px; border-radius:10px; font-size:0.8rem; color:#94a3b8;'>🔒 <b>Secure Enclave</b><br>Your documents are processed locally and never stored.</div>", unsafe_allow_html=True)
-
-# -----------------------------------------------------------------------------
-# 5. MAIN DASHBOARD
-# -----------------------------------------------------------------------------
-
-# HERO SECTION
-if not st.session_state.analysis_result:
-    st.markdown("""
-    <div style="text-align: center; padding: 60px 20px;">
-        <h1 style="font-size: 3.5rem; margin-bottom: 20px;">
-            AI-Powered Legal <span class="gradient-text">Intelligence</span>
-        </h1>
-        <p style="font-size: 1.25rem; color: #64748b; max-width: 700px; margin: 0 auto 40px auto;">
-            Transform complex contracts into clear, actionable insights in seconds. 
-            Upload a document to detect risks, ensure compliance, and draft amendments instantly.
-        </p>
-        <div style="display: flex; justify-content: center; gap: 20px;">
-            <div class="premium-card" style="width: 200px; text-align: center;">
-                <div style="font-size: 2rem;">⚡</div>
-                <div style="font-weight: 600; margin-top: 10px;">Instant Audit</div>
-            </div>
-            <div class="premium-card" style="width: 200px; text-align: center;">
-                <div style="font-size: 2rem;">🛡️</div>
-                <div style="font-weight: 600; margin-top: 10px;">Risk Shield</div>
-            </div>
-            <div class="premium-card" style="width: 200px; text-align: center;">
-                <div style="font-size: 2rem;">📝</div>
-                <div style="font-weight: 600; margin-top: 10px;">Smart Draft</div>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-# RESULTS DASHBOARD
-else:
-    res = st.session_state.analysis_result
-    
-    # 1. HEADER
-    c1, c2 = st.columns([2,1])
-    with c1:
-        st.markdown(f"## 📊 Audit Report: **{st.session_state.current_filename}**")
-    with c2:
-        st.markdown(f"<div style='text-align:right; padding-top:10px;'><span class='badge-high'>CONFIDENTIAL</span></div>", unsafe_allow_html=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    # 2. KEY METRICS
-    m1, m2, m3, m4 = st.columns(4)
-    with m1:
-        score = res.get('risk_score', 0)
-        st.metric("Safety Score", f"{score}/100", delta="- Critical" if score > 70 else "+ Secure")
-    with m2:
-        st.metric("Risk Assessment", res.get('overall_risk_level', 'N/A'))
-    with m3:
-        st.metric("Document Type", res.get('contract_type', 'General'))
-    with m4:
-        st.metric("Jurisdiction", "India (ISO)")
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    # 3. CONTENT TABS
-    tab1, tab2, tab3 = st.tabs(["👁️ Visual Analysis", "⚖️ Compliance & Risks", "📤 Export Tools"])
-
-    # TAB 1: VISUAL ANALYSIS
-    with tab1:
-        col_doc, col_ins = st.columns([1.5, 1])
-        
-        with col_doc:
-            st.markdown("##### 📄 Document Viewer")
-            # Apply the "Paper" effect
-            highlighted = highlight_text(st.session_state.full_text, res.get('clauses', []))
-            st.markdown(f'<div class="doc-paper">{highlighted}</div>', unsafe_allow_html=True)
-            
-        with col_ins:
-            st.markdown("##### 🧠 AI Consultant Insights")
-            
-            # ADVICE CARD
-            advice = res.get('executive_advice', res.get('summary', ''))
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, #1e3a8a 0%, #172554 100%); color: white; padding: 25px; border-radius: 16px; box-shadow: 0 10px 15px -3px rgba(30, 58, 138, 0.4); margin-bottom: 25px;">
-                <div style="font-weight: 700; font-size: 1.1rem; margin-bottom: 10px; display: flex; align-items: center; gap: 10px;">
-                    ✨ Executive Summary
-                </div>
-                <div style="line-height: 1.6; opacity: 0.9;">{advice}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # RISK FEED
-            st.markdown("##### 🚨 Detected Issues")
-            clauses = res.get('clauses', [])
-            risky = [c for c in clauses if c.get('risk_level') in ['High', 'Medium']]
-            
-            for c in risky:
-                risk_badge = "badge-high" if c['risk_level'] == "High" else "badge-medium"
-                icon = "🔥" if c['risk_level'] == "High" else "⚠️"
-                
-                st.markdown(f"""
-                <div class="premium-card" style="padding: 20px; border-left: 4px solid {'#ef4444' if c['risk_level'] == 'High' else '#f97316'};">
-                    <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom: 8px;">
-                        <span style="font-weight: 700; color: #1e293b;">{c['title']}</span>
-                        <span class="{risk_badge}">{c['risk_level']}</span>
-                    </div>
-                    <p style="font-size: 0.9rem; color: #475569; margin-bottom: 12px;">{c['explanation']}</p>
-                    <div style="background: #f8fafc; padding: 10px; border-radius: 8px; font-size: 0.85rem; border: 1px dashed #cbd5e1;">
-                        <strong style="color: #059669;">✅ Recommendation:</strong> {c['recommendation']}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-
-    # TAB 2: COMPLIANCE
-    with tab2:
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown('<div class="premium-card">', unsafe_allow_html=True)
-            st.subheader("🇮🇳 Indian Law Compliance")
-            comp = res.get('compliance_check', {})
-            if comp.get('status') == "Fail":
-                st.error(f"{comp.get('notes')}")
-            else:
-                st.success(f"{comp.get('notes')}")
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-        with c2:
-            st.markdown('<div class="premium-card">', unsafe_allow_html=True)
-            st.subheader("📋 Missing Clauses")
-            missing = res.get('missing_clauses', [])
-            if missing:
-                for m in missing:
-                    st.warning(f"⚠️ Missing: {m}")
-            else:
-                st.info("✅ All standard clauses are present.")
-            st.markdown('</div>', unsafe_allow_html=True)
-
-    # TAB 3: EXPORT
-    with tab3:
-        st.markdown('<div class="premium-card">', unsafe_allow_html=True)
-        st.subheader("📤 Export & Share")
-        col_pdf, col_json = st.columns(2)
-        
-        with col_pdf:
-            st.markdown(" **Download PDF Report**")
-            st.caption("Professional format for legal review.")
-            try:
-                pdf_data = generate_pdf_report(res, st.session_state.current_filename)
-                st.download_button("📥 Download PDF", pdf_data, "report.pdf", "application/pdf", use_container_width=True)
-            except:
-                st.error("PDF generation failed.")
-                
-        with col_json:
-            st.markdown("**Download Raw Data**")
-            st.caption("JSON format for developers.")
-            st.download_button("📥 Download JSON", json.dumps(res, indent=4), "data.json", "application/json", use_container_width=True)
+import time
+_import_started = time.perf_counter()  # For the start-up report
+
+import streamlit as st
+import json
+import os
+import uuid
+from bisect import bisect_right
+
+# Import Custom Modules
+from src.document_processor import DocumentProcessor
+from src.llm_engine import ContractAnalyzer
+from src.analysis_cache import AnalysisCache
+from src.translation import TranslationCache
+from src.version_store import VersionStore
+from src.clause_index import ClauseIndex
+from src.audit_logger import AuditLogger
+from src.report_generator import get_pdf_report, report_key, is_pdf
+from src.utils import highlight_page
+from src.highlighter import paginate, clause_locations
+from src.metrics import stage_trace, STARTUP
+from src.scheduler import llm_priority
+
+STARTUP.record("imports", time.perf_counter() - _import_started)
+
+# -----------------------------------------------------------------------------
+# 1. PAGE CONFIGURATION
+# -----------------------------------------------------------------------------
+st.set_page_config(
+    page_title="ContractSentinel AI",
+    page_icon="⚖️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# -----------------------------------------------------------------------------
+# 2. PREMIUM CSS OVERHAUL
+# -----------------------------------------------------------------------------
+st.markdown("""
+<style>
+    /* IMPORT FONTS */
+    @import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700&display=swap');
+    
+    /* GLOBAL RESET */
+    * {
+        font-family: 'Plus Jakarta Sans', sans-serif !important;
+    }
+    
+    .stApp {
+        background-color: #f3f4f6;
+    }
+
+    /* HIDE STREAMLIT CHROME */
+    #MainMenu, footer, header {visibility: hidden;}
+    
+    /* SIDEBAR STYLING */
+    [data-testid="stSidebar"] {
+        background-color: #0f172a; /* Midnight Blue */
+        border-right: none;
+    }
+    [data-testid="stSidebar"] * {
+        color: #94a3b8;
+    }
+    [data-testid="stSidebar"] h1 {
+        color: white;
+        font-size: 1.5rem;
+    }
+
+    /* CUSTOM GRADIENT BUTTONS */
+    div.stButton > button {
+        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
+        color: white;
+        border: none;
+        padding: 12px 24px;
+        border-radius: 12px;
+        font-weight: 600;
+        box-shadow: 0 4px 6px -1px rgba(37, 99, 235, 0.3);
+        transition: all 0.3s ease;
+    }
+    div.stButton > button:hover {
+        transform: translateY(-2px);
+        box-shadow: 0 10px 15px -3px rgba(37, 99, 235, 0.4);
+    }
+    
+    /* GLASSMORPHISM CARDS */
+    .premium-card {
+        background: white;
+        padding: 24px;
+        border-radius: 16px;
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05), 0 2px 4px -1px rgba(0, 0, 0, 0.03);
+        border: 1px solid rgba(255,255,255,0.5);
+        margin-bottom: 24px;
+    }
+    
+    /* METRIC WIDGETS */
+    [data-testid="stMetric"] {
+        background: white;
+        padding: 20px;
+        border-radius: 16px;
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
+        border: 1px solid #e5e7eb;
+    }
+    [data-testid="stMetricLabel"] {
+        font-size: 0.85rem;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+        color: #64748b;
+    }
+    [data-testid="stMetricValue"] {
+        font-size: 2rem;
+        font-weight: 700;
+        color: #0f172a;
+    }
+
+    /* RISK BADGES */
+    .badge-high {
+        background: #fee2e2;
+        color: #991b1b;
+        padding: 4px 12px;
+        border-radius: 9999px;
+        font-size: 0.75rem;
+        font-weight: 700;
+        text-transform: uppercase;
+        display: inline-block;
+    }
+    .badge-medium {
+        background: #ffedd5;
+        color: #9a3412;
+        padding: 4px 12px;
+        border-radius: 9999px;
+        font-size: 0.75rem;
+        font-weight: 700;
+        text-transform: uppercase;
+        display: inline-block;
+    }
+
+    /* DOCUMENT PREVIEW */
+    .doc-paper {
+        background: white;
+        padding: 40px;
+        min-height: 600px;
+        box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
+        border-radius: 4px;
+        font-family: 'Georgia', serif;
+        line-height: 1.8;
+        color: #334155;
+    }
+
+    /* HERO GRADIENT TEXT */
+    .gradient-text {
+        background: linear-gradient(to right, #2563eb, #7c3aed);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        font-weight: 800;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# -----------------------------------------------------------------------------
+# 3. SESSION STATE
+# -----------------------------------------------------------------------------
+if "analysis_result" not in st.session_state:
+    st.session_state.analysis_result = None
+if "full_text" not in st.session_state:
+    st.session_state.full_text = ""
+if "current_filename" not in st.session_state:
+    st.session_state.current_filename = ""
+if "offset_index" not in st.session_state:
+    st.session_state.offset_index = None
+if "viewer_page" not in st.session_state:
+    st.session_state.viewer_page = 0
+    st.session_state.viewer_goto = 1
+if "analysis_mode" not in st.session_state:
+    st.session_state.analysis_mode = "full"
+if "canonical_result" not in st.session_state:
+    st.session_state.canonical_result = None  # Untranslated analysis; every language is translated from it
+    st.session_state.translation_failed = None  # Language whose translation last failed (not retried on rerun)
+if "client_id" not in st.session_state:
+    st.session_state.client_id = uuid.uuid4().hex  # Per-session fair share in the LLM scheduler
+
+@st.cache_resource
+def get_analyzer():
+    # Built once per server process so the cache hit/miss counters survive reruns
+    with STARTUP.step("engines"):
+        # CLAUSE_REUSE=1 opts in to resolving near-duplicate sections from the clause index
+        clause_index = ClauseIndex() if os.getenv("CLAUSE_REUSE", "0") == "1" else None
+        analyzer = ContractAnalyzer(cache=AnalysisCache(), versions=VersionStore(), clause_index=clause_index,
+                                    translations=TranslationCache(), prewarm=os.getenv("OLLAMA_PREWARM", "1") == "1")
+    print(STARTUP.render())
+    return analyzer
+
+@st.cache_resource
+def get_logger():
+    # One background audit writer per server process
+    return AuditLogger()
+
+analyzer = get_analyzer()
+logger = get_logger()
+
+# Main-area slot for progressive results while an analysis streams in
+live_view = st.empty()
+
+# Document viewer: pages sent to the browser per rerun, and pages pre-rendered ahead of them
+VIEWER_WINDOW = 2
+VIEWER_PREFETCH = 2
+
+def page_for_offset(pages, offset):
+    starts = [start for start, _, _ in pages]
+    return max(0, bisect_right(starts, offset) - 1)
+
+def page_label(pages, index):
+    source_page = pages[index][2]
+    return f"Page {source_page}" if source_page else f"Part {index + 1}"
+
+def jump_to_page(index):
+    st.session_state.viewer_page = index
+    st.session_state.viewer_goto = index + 1
+
+def goto_page():
+    st.session_state.viewer_page = st.session_state.viewer_goto - 1
+
+@st.fragment
+def render_document_viewer(full_text, offset_index, clauses):
+    """
+    Paged viewer: only the visible window of highlighted pages goes to the browser,
+    and paging reruns just this fragment. Pages are memoized, so tab switches and
+    other widgets reuse the rendered HTML.
+    """
+    pages = paginate(full_text, offset_index)
+    total = len(pages)
+    current = min(st.session_state.viewer_page, total - 1)
+
+    nav_prev, nav_page, nav_next = st.columns([1, 2, 1])
+    with nav_prev:
+        st.button("◀", disabled=current == 0, use_container_width=True,
+                  on_click=jump_to_page, args=(max(0, current - VIEWER_WINDOW),))
+    with nav_page:
+        st.number_input(f"of {total}", min_value=1, max_value=total, key="viewer_goto", on_change=goto_page)
+    with nav_next:
+        st.button("▶", disabled=current + VIEWER_WINDOW >= total, use_container_width=True,
+                  on_click=jump_to_page, args=(min(total - 1, current + VIEWER_WINDOW),))
+
+    window = []
+    for index in range(current, min(total, current + VIEWER_WINDOW)):
+        start, end, _ = pages[index]
+        window.append(f"<div style='font-size:0.75rem; color:#94a3b8; margin:10px 0;'>— {page_label(pages, index)} —</div>")
+        window.append(highlight_page(full_text, clauses, start, end))
+    st.markdown(f'<div class="doc-paper">{"".join(window)}</div>', unsafe_allow_html=True)
+
+    # Warm the cache for the next window so paging forward is instant
+    for start, end, _ in pages[current + VIEWER_WINDOW:current + VIEWER_WINDOW + VIEWER_PREFETCH]:
+        highlight_page(full_text, clauses, start, end)
+
+# Sidebar label -> ContractAnalyzer mode
+ANALYSIS_MODES = {"🧠 Full AI Review": "full", "⚖️ Smart (Rules + AI)": "tiered", "⚡ Fast Scan (Rules only)": "fast",
+                  "🔁 Revision (changes only)": "revision"}
+
+def render_live_analysis(events):
+    """
+    Renders streamed analysis events into the main area as they arrive.
+    Returns the final result (or error dict) and clears the live view.
+    """
+    result = {"error": "Analysis ended without a result."}
+    with live_view.container():
+        st.markdown("## ⏳ Live Analysis")
+        score_slot = st.empty()
+        summary_slot = st.empty()
+        st.markdown("##### 🚨 Detected Issues")
+        for event in events:
+            if event["event"] == "field" and event["key"] == "risk_score":
+                score_slot.metric("Safety Score", f"{event['value']}/100")
+            elif event["event"] == "field" and event["key"] in ("summary", "executive_advice"):
+                summary_slot.info(event["value"])
+            elif event["event"] == "item" and event["field"] == "clauses":
+                c = event["value"]
+                if c.get('risk_level') in ['High', 'Medium']:
+                    icon = "🔥" if c['risk_level'] == "High" else "⚠️"
+                    st.markdown(f"{icon} **{c.get('title', '')}** ({c['risk_level']}): {c.get('explanation', '')}")
+            elif event["event"] == "item" and event["field"] == "missing_clauses":
+                st.warning(f"⚠️ Missing: {event['value']}")
+            elif event["event"] in ("done", "error"):
+                result = event["value"]
+    live_view.empty()
+    return result
+
+# -----------------------------------------------------------------------------
+# 4. DARK SIDEBAR NAVIGATION
+# -----------------------------------------------------------------------------
+with st.sidebar:
+    st.markdown("<h1 style='color:white; margin-bottom:0;'>Contract<span style='color:#3b82f6'>Sentinel</span></h1>", unsafe_allow_html=True)
+    st.markdown("<p style='font-size:0.8rem; opacity:0.6; margin-top:0;'>ENTERPRISE EDITION v2.0</p>", unsafe_allow_html=True)
+    st.markdown("---")
+    
+    st.markdown("### ⚙️ **Configuration**")
+    target_lang = st.radio("Target Language", ["English", "Hindi"], label_visibility="collapsed")
+    review_depth = st.radio("Review Depth", list(ANALYSIS_MODES), help="Smart sends only uncertain or high-risk clauses to the AI. Fast uses the rule engine alone.")
+    
+    st.markdown("### 📂 **Upload File**")
+    uploaded_file = st.file_uploader("Upload Contract", type=["pdf", "docx", "txt"], label_visibility="collapsed")
+    
+    if uploaded_file:
+        st.success(f" Ready: {uploaded_file.name}")
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        if st.button("✨ START ANALYSIS", type="primary", use_container_width=True):
+            with st.spinner("🤖 AI Consultant is reviewing..."), stage_trace(), \
+                    llm_priority("interactive", st.session_state.client_id):
+                text, offset_index, error = DocumentProcessor.extract_with_index(uploaded_file)
+                if error:
+                    st.error(error)
+                else:
+                    st.session_state.full_text = text
+                    st.session_state.offset_index = offset_index
+                    st.session_state.viewer_page = 0
+                    st.session_state.viewer_goto = 1
+                    st.session_state.current_filename = uploaded_file.name
+                    mode = ANALYSIS_MODES[review_depth]
+                    canonical = analyzer.CANONICAL_LANGUAGE
+                    if mode == "full":
+                        result = render_live_analysis(analyzer.stream_analysis(text, language=canonical, offset_index=offset_index))
+                    else:
+                        result = analyzer.analyze_contract(text, language=canonical, mode=mode, offset_index=offset_index)
+                    if "error" in result:
+                        st.error(result["error"])
+                    else:
+                        # Stored untranslated; the language switch below translates it
+                        st.session_state.canonical_result = result
+                        st.session_state.analysis_result = result
+                        st.session_state.translation_failed = None
+                        st.session_state.analysis_mode = mode
+                        logger.log_event("ANALYSIS", uploaded_file.name, result.get("risk_score", 0), metadata={"mode": mode})
+
+    # Switching language only translates the stored analysis; nothing is re-analyzed.
+    # A failed translation is reported once and not retried until another language is picked.
+    current = st.session_state.analysis_result
+    canonical = st.session_state.canonical_result
+    if current and canonical and current.get("language", analyzer.CANONICAL_LANGUAGE) != target_lang:
+        if st.session_state.translation_failed != target_lang:
+            try:
+                with st.spinner(f"🌐 Translating to {target_lang}..."), llm_priority("interactive", st.session_state.client_id):
+                    st.session_state.analysis_result = analyzer.translate_result(canonical, target_lang)
+                st.session_state.translation_failed = None
+            except Exception as e:
+                st.session_state.translation_failed = target_lang
+                st.error(f"Translation to {target_lang} failed: {e}")
+        else:
+            st.caption(f"⚠️ Translation to {target_lang} failed; showing {current.get('language', analyzer.CANONICAL_LANGUAGE)}.")
+
+    st.markdown("---")
+    st.markdown("<div style='background:#1e293b; padding:15px; border-radius:10px; font-size:0.8rem; color:#94a3b8;'>🔒 <b>Secure Enclave</b><br>Your documents are processed locally and never leave this machine. To speed up repeat reviews, analysis results (including quoted clauses), earlier contract versions, the clause index and translations are kept on this server under <code>data/</code>.</div>", unsafe_allow_html=True)
+
+# -----------------------------------------------------------------------------
+# 5. MAIN DASHBOARD
+# -----------------------------------------------------------------------------
+
+# HERO SECTION
+if not st.session_state.analysis_result:
+    st.markdown("""
+    <div style="text-align: center; padding: 60px 20px;">
+        <h1 style="font-size: 3.5rem; margin-bottom: 20px;">
+            AI-Powered Legal <span class="gradient-text">Intelligence</span>
+        </h1>
+        <p style="font-size: 1.25rem; color: #64748b; max-width: 700px; margin: 0 auto 40px auto;">
+            Transform complex contracts into clear, actionable insights in seconds. 
+            Upload a document to detect risks, ensure compliance, and draft amendments instantly.
+        </p>
+        <div style="display: flex; justify-content: center; gap: 20px;">
+            <div class="premium-card" style="width: 200px; text-align: center;">
+                <div style="font-size: 2rem;">⚡</div>
+                <div style="font-weight: 600; margin-top: 10px;">Instant Audit</div>
+            </div>
+            <div class="premium-card" style="width: 200px; text-align: center;">
+                <div style="font-size: 2rem;">🛡️</div>
+                <div style="font-weight: 600; margin-top: 10px;">Risk Shield</div>
+            </div>
+            <div class="premium-card" style="width: 200px; text-align: center;">
+                <div style="font-size: 2rem;">📝</div>
+                <div style="font-weight: 600; margin-top: 10px;">Smart Draft</div>
+            </div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+# RESULTS DASHBOARD
+else:
+    res = st.session_state.analysis_result
+    
+    # 1. HEADER
+    c1, c2 = st.columns([2,1])
+    with c1:
+        st.markdown(f"## 📊 Audit Report: **{st.session_state.current_filename}**")
+    with c2:
+        st.markdown(f"<div style='text-align:right; padding-top:10px;'><span class='badge-high'>CONFIDENTIAL</span></div>", unsafe_allow_html=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # 2. KEY METRICS
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        score = res.get('risk_score', 0)
+        st.metric("Safety Score", f"{score}/100", delta="- Critical" if score > 70 else "+ Secure")
+    with m2:
+        st.metric("Risk Assessment", res.get('overall_risk_level', 'N/A'))
+    with m3:
+        st.metric("Document Type", res.get('contract_type', 'General'))
+    with m4:
+        st.metric("Jurisdiction", "India (ISO)")
+
+    revision = res.get('revision')
+    if revision:
+        delta = revision['risk_delta']
+        change = delta['score_change']
+        st.info(f"🔁 Revision of an earlier version ({revision['sections_changed']} sections changed, "
+                f"{revision['sections_removed']} removed, {revision['sections_unchanged']} reused). "
+                f"Risk score {delta['previous_score']} → {delta['risk_score']}"
+                + (f" ({change:+d})" if change is not None else ""))
+        for clause in delta['added_clauses']:
+            st.markdown(f"➕ **{clause['title']}** ({clause['risk_level']})")
+        for clause in delta['removed_clauses']:
+            st.markdown(f"➖ ~~{clause['title']}~~ ({clause['risk_level']})")
+
+    parse_report = res.get('parse_report')
+    if parse_report:
+        dropped = parse_report['issues'].count('dropped_clause')
+        notes = []
+        if 'truncated' in parse_report['repairs']:
+            notes.append("the AI response was cut off and has been repaired")
+        if dropped:
+            notes.append(f"{dropped} malformed clause(s) were skipped")
+        if 'defaulted:risk_score' in parse_report['issues']:
+            notes.append("the AI gave no risk score, so the score shown is an estimate")
+        if notes:
+            st.warning("⚠️ Partial result: " + "; ".join(notes) + ". Re-run the analysis for a complete review.")
+
+    context = res.get('context_report')
+    if context and (context['header_footer_lines_removed'] or context['duplicate_paragraphs_removed']):
+        with st.expander(f"✂️ Prompt trimmed from ~{context['original_tokens']:,} to ~{context['prompt_tokens']:,} tokens"):
+            st.caption(f"Removed {context['header_footer_lines_removed']} header/footer lines repeated at the top or bottom of pages "
+                       f"(identical apart from page numbers) and {context['duplicate_paragraphs_removed']} verbatim duplicate paragraphs. "
+                       "The removed lines are listed below.")
+            for sample in context['removed_samples']:
+                st.text(sample)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # 3. CONTENT TABS
+    tab1, tab2, tab3 = st.tabs(["👁️ Visual Analysis", "⚖️ Compliance & Risks", "📤 Export Tools"])
+
+    # TAB 1: VISUAL ANALYSIS
+    with tab1:
+        col_doc, col_ins = st.columns([1.5, 1])
+        
+        with col_doc:
+            st.markdown("##### 📄 Document Viewer")
+            render_document_viewer(st.session_state.full_text, st.session_state.offset_index, res.get('clauses', []))
+            
+        with col_ins:
+            st.markdown("##### 🧠 AI Consultant Insights")
+            
+            # ADVICE CARD
+            advice = res.get('executive_advice', res.get('summary', ''))
+            st.markdown(f"""
+            <div style="background: linear-gradient(135deg, #1e3a8a 0%, #172554 100%); color: white; padding: 25px; border-radius: 16px; box-shadow: 0 10px 15px -3px rgba(30, 58, 138, 0.4); margin-bottom: 25px;">
+                <div style="font-weight: 700; font-size: 1.1rem; margin-bottom: 10px; display: flex; align-items: center; gap: 10px;">
+                    ✨ Executive Summary
+                </div>
+                <div style="line-height: 1.6; opacity: 0.9;">{advice}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+            # RISK FEED
+            st.markdown("##### 🚨 Detected Issues")
+            clauses = res.get('clauses', [])
+            risky = [c for c in clauses if c.get('risk_level') in ['High', 'Medium']]
+            
+            pages = paginate(st.session_state.full_text, st.session_state.offset_index)
+            locations = clause_locations(st.session_state.full_text, clauses)
+            for i, c in enumerate(risky):
+                risk_badge = "badge-high" if c['risk_level'] == "High" else "badge-medium"
+                icon = "🔥" if c['risk_level'] == "High" else "⚠️"
+                
+                st.markdown(f"""
+                <div class="premium-card" style="padding: 20px; border-left: 4px solid {'#ef4444' if c['risk_level'] == 'High' else '#f97316'};">
+                    <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom: 8px;">
+                        <span style="font-weight: 700; color: #1e293b;">{c['title']}</span>
+                        <span class="{risk_badge}">{c['risk_level']}</span>
+                    </div>
+                    <p style="font-size: 0.9rem; color: #475569; margin-bottom: 12px;">{c['explanation']}</p>
+                    <div style="background: #f8fafc; padding: 10px; border-radius: 8px; font-size: 0.85rem; border: 1px dashed #cbd5e1;">
+                        <strong style="color: #059669;">✅ Recommendation:</strong> {c['recommendation']}
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+                position = locations.get(c.get('original_text'))
+                if position is not None:
+                    page_index = page_for_offset(pages, position)
+                    st.button(f"📍 Show in document ({page_label(pages, page_index)})", key=f"jump_{i}",
+                              on_click=jump_to_page, args=(page_index,))
+
+    # TAB 2: COMPLIANCE
+    with tab2:
+        c1, c2 = st.columns(2)
+        with c1:
+            st.markdown('<div class="premium-card">', unsafe_allow_html=True)
+            st.subheader("🇮🇳 Indian Law Compliance")
+            comp = res.get('compliance_check', {})
+            if comp.get('status') == "Fail":
+                st.error(f"{comp.get('notes')}")
+            else:
+                st.success(f"{comp.get('notes')}")
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+        with c2:
+            st.markdown('<div class="premium-card">', unsafe_allow_html=True)
+            st.subheader("📋 Missing Clauses")
+            missing = res.get('missing_clauses', [])
+            if missing:
+                for m in missing:
+                    st.warning(f"⚠️ Missing: {m}")
+            else:
+                st.info("✅ All standard clauses are present.")
+            st.markdown('</div>', unsafe_allow_html=True)
+
+    # TAB 3: EXPORT
+    with tab3:
+        st.markdown('<div class="premium-card">', unsafe_allow_html=True)
+        st.subheader("📤 Export & Share")
+        col_pdf, col_json = st.columns(2)
+        
+        with col_pdf:
+            st.markdown(" **Download PDF Report**")
+            st.caption("Professional format for legal review.")
+            # Rendered only on request, then reused across reruns for the same analysis
+            pdf_key = report_key(res, st.session_state.current_filename, st.session_state.full_text)
+            ready = st.session_state.get("pdf_key") == pdf_key
+            if not ready and st.button("🧾 Prepare PDF", use_container_width=True):
+                with st.spinner("Rendering report..."):
+                    pdf_data = get_pdf_report(res, st.session_state.current_filename, st.session_state.full_text, st.session_state.offset_index)
+                if is_pdf(pdf_data):
+                    st.session_state.pdf_data = pdf_data
+                    st.session_state.pdf_key = pdf_key
+                    ready = True
+                else:
+                    st.error("PDF generation failed.")
+            if ready:
+                st.download_button("📥 Download PDF", st.session_state.pdf_data, "report.pdf", "application/pdf", use_container_width=True)
+                
+        with col_json:
+            st.markdown("**Download Raw Data**")
+            st.caption("JSON format for developers.")
+            st.download_button("📥 Download JSON", json.dumps(res, indent=4), "data.json", "application/json", use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,218 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src.document_processor import DocumentProcessor
+from src.llm_engine import ContractAnalyzer
+from src.analysis_cache import AnalysisCache
+from src.clause_index import ClauseIndex
+from src.audit_logger import AuditLogger
+from src.metrics import stage_trace
+from src.llm_backend import get_default_pool
+from src.scheduler import LLMScheduler, llm_priority
+from src.report_generator import render_reports, is_pdf
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+def find_contracts(folder):
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def extract_file(path):
+    # Runs in a worker process; page-level parallelism is off because the batch is already parallel.
+    # The OffsetIndex comes back too, so prompt preparation knows the page boundaries
+    with open(path, "rb") as f:
+        return DocumentProcessor.extract_with_index(f, workers=1)
+
+def load_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+def write_parquet(ndjson_path, parquet_path):
+    import pandas as pd  # Only needed for Parquet export (plus pyarrow or fastparquet)
+
+    rows = {}  # Failed files are retried on resume, so keep each file's latest record
+    with open(ndjson_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            result = record.get("result") or {}
+            rows[record["file"]] = {
+                "file": record["file"],
+                "error": record.get("error"),
+                "contract_type": result.get("contract_type"),
+                "risk_score": result.get("risk_score"),
+                "overall_risk_level": result.get("overall_risk_level"),
+                "clauses": len(result.get("clauses", []) or []),
+                "missing_clauses": len(result.get("missing_clauses", []) or []),
+                "result_json": json.dumps(result),
+            }
+    pd.DataFrame(list(rows.values())).to_parquet(parquet_path, index=False)
+
+def relative_name(path, folder):
+    # Path under the scanned folder: contracts with the same file name in different subfolders stay apart
+    return os.path.relpath(path, folder).replace(os.sep, "/")
+
+def report_name(path, folder):
+    """
+    Report file name for a contract, flattened from its path under `folder`:
+    a/b/msa.pdf -> a__b__msa_report.pdf
+    """
+    return os.path.splitext(relative_name(path, folder))[0].replace("/", "__") + "_report.pdf"
+
+def write_reports(ndjson_path, report_dir, folder, workers=None):
+    """
+    Renders a PDF report for every successful record, in a process pool.
+    `folder` is the scanned input folder the report names are made relative to.
+    `report_dir` is a folder, or a .zip archive to write the reports into.
+    Each report is written as soon as it is rendered, so memory stays flat for large portfolios.
+    """
+    names = []
+
+    def jobs():
+        with open(ndjson_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("error") or not record.get("result"):
+                    continue
+                names.append(report_name(record["file"], folder))
+                yield record["result"], relative_name(record["file"], folder)
+
+    if report_dir.lower().endswith(".zip"):
+        archive = zipfile.ZipFile(report_dir, "w", zipfile.ZIP_DEFLATED)
+        save = archive.writestr
+    else:
+        os.makedirs(report_dir, exist_ok=True)
+        archive = None
+
+        def save(name, pdf_bytes):
+            with open(os.path.join(report_dir, name), "wb") as out:
+                out.write(pdf_bytes)
+
+    written = 0
+    try:
+        # A job is consumed before its report is yielded, so names[i] is always there
+        for i, pdf_bytes in enumerate(render_reports(jobs(), workers)):
+            if not is_pdf(pdf_bytes):
+                print(f"⚠️ Report failed: {names[i]}")
+                continue
+            save(names[i], pdf_bytes)
+            written += 1
+    finally:
+        if archive is not None:
+            archive.close()
+    return written
+
+class BatchProgress:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.time()
+
+    def update(self, failed):
+        self.done += 1
+        self.failed += int(failed)
+
+    def report(self):
+        elapsed = time.time() - self.started
+        rate = self.done / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = remaining / (rate / 60) if rate > 0 else float("inf")
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta != float("inf") else "--:--:--"
+        return f"[{self.done}/{self.total}] {rate:.1f} docs/min | failed {self.failed} | ETA {eta_text}"
+
+def run_batch(folder, output, language="English", extract_workers=None, llm_concurrency=3, checkpoint=None,
+              reuse_clauses=False):
+    checkpoint = checkpoint or f"{output}.checkpoint"
+    completed = load_checkpoint(checkpoint)
+    todo = [p for p in find_contracts(folder) if p not in completed]
+    print(f"📂 {len(todo)} contracts to analyze ({len(completed)} already done, resuming from {checkpoint})")
+    if not todo:
+        return
+
+    # No interactive traffic in this process, so batch calls may use every slot.
+    # The scheduler is the single limit on model calls: whole analyses and their chunk fan-out share it.
+    scheduler = LLMScheduler(get_default_pool(), capacity=llm_concurrency, reserve_interactive=0)
+    # Portfolios share a lot of template wording; --reuse-clauses resolves known sections from the clause index
+    analyzer = ContractAnalyzer(cache=AnalysisCache(), max_concurrency=llm_concurrency,
+                                clause_index=ClauseIndex() if reuse_clauses else None, backend=scheduler)
+    logger = AuditLogger()
+    progress = BatchProgress(len(todo))
+
+    # The audit writer thread is already running, so extraction workers are spawned rather than forked
+    with ProcessPoolExecutor(max_workers=extract_workers, mp_context=multiprocessing.get_context("spawn")) as extract_pool:
+        def process(path):
+            with stage_trace() as trace:
+                text, offset_index, error = extract_pool.submit(extract_file, path).result()
+                if error:
+                    return {"file": path, "error": error, "result": None}, trace.as_dict()
+                # Bulk work yields to interactive and API calls in the LLM scheduler
+                with llm_priority("batch", "batch_analyze"):
+                    result = analyzer.analyze_contract(text, language=language, offset_index=offset_index)
+            return {"file": path, "error": result.get("error"), "result": result}, trace.as_dict()
+
+        # Extraction runs ahead of the LLM, so keep a few more threads than LLM slots
+        threads = llm_concurrency + (extract_workers or os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=threads) as pool, \
+                open(output, "a", encoding="utf-8") as out, \
+                open(checkpoint, "a", encoding="utf-8") as ckpt:
+            futures = [pool.submit(process, path) for path in todo]
+            for future in as_completed(futures):
+                record, timings = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                # Checkpoint only after the result line is safely written; failures are retried on resume
+                if not record["error"]:
+                    ckpt.write(record["file"] + "\n")
+                    ckpt.flush()
+
+                result = record["result"] or {}
+                logger.log_event(
+                    "BATCH_ANALYSIS", relative_name(record["file"], folder), result.get("risk_score", 0),
+                    status="Failed" if record["error"] else "Success",
+                    metadata={"path": record["file"], "output": output, "error": record["error"], "stage_timings": timings},
+                )
+                progress.update(bool(record["error"]))
+                print(progress.report(), flush=True)
+
+    logger.flush()
+    print(f"✅ Finished: {progress.report()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-analyze a folder of contracts with resumable checkpoints.")
+    parser.add_argument("folder", help="Folder to scan recursively for PDF/DOCX/TXT contracts")
+    parser.add_argument("--output", default="batch_results.ndjson", help="NDJSON results file (appended to)")
+    parser.add_argument("--parquet", help="Also write the results as a Parquet file at this path")
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--extract-workers", type=int, default=None, help="Extraction processes (default: one per core)")
+    parser.add_argument("--llm-concurrency", type=int, default=3, help="Maximum LLM calls in flight")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--reuse-clauses", action="store_true",
+                        help="Resolve near-duplicate sections from earlier analyses instead of re-analyzing them")
+    parser.add_argument("--reports", help="Also render a PDF report per contract into this folder (or .zip file)")
+    parser.add_argument("--report-workers", type=int, default=None, help="Report rendering processes (default: one per core)")
+    args = parser.parse_args()
+
+    run_batch(args.folder, args.output, args.language, args.extract_workers, args.llm_concurrency, args.checkpoint,
+              args.reuse_clauses)
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+        print(f"📦 Parquet written to {args.parquet}")
+    if args.reports:
+        written = write_reports(args.output, args.reports, args.folder, args.report_workers)
+        print(f"🧾 {written} PDF reports written to {args.reports}")
+
+if __name__ == "__main__":
+    main()
+
+# Run using: python batch_analyze.py contracts/ --output results.ndjson --parquet results.parquet --reports reports/
@@ -0,0 +1,77 @@
+import os
+import random
+
+# Representative clause language, reused by the stub server's canned analysis
+CLAUSE_LIBRARY = [
+    ("Termination", "High", "Either party may terminate this Agreement at any time without notice and without liability to the other party."),
+    ("Indemnity", "High", "The Service Provider shall indemnify the Client against all losses, claims and damages of whatever nature without limit."),
+    ("Limitation of Liability", "Medium", "In no event shall the aggregate liability of the Company exceed the fees paid in the preceding one month."),
+    ("Jurisdiction", "Medium", "This Agreement shall be governed by the laws of the State of New York and the courts there shall have exclusive jurisdiction."),
+    ("Non-Compete", "High", "The Employee shall not engage in any competing business anywhere in the world for a period of five years after termination."),
+    ("Confidentiality", "Low", "Each party shall keep confidential all information disclosed by the other party and use it only for the purposes of this Agreement."),
+    ("Notice Period", "Medium", "Any notice under this Agreement shall be given in writing and shall be deemed received seven days after dispatch by post."),
+    ("Payment Terms", "Low", "The Client shall pay all undisputed invoices within thirty days of receipt by bank transfer to the account notified in writing."),
+]
+
+FILLER = (
+    "The parties acknowledge that the recitals form part of this Agreement and that headings are for convenience only. "
+    "Words importing the singular include the plural and references to a person include a body corporate. "
+)
+
+def contract_text(pages=5, lines_per_page=40, seed=0):
+    """
+    Builds a synthetic contract of roughly `pages` pages with numbered sections.
+    Every clause in CLAUSE_LIBRARY appears at least once so highlighting has work to do.
+    """
+    rng = random.Random(seed)
+    lines = ["MASTER SERVICES AGREEMENT", "This Agreement is made between Acme Technologies Pvt Ltd and Globex India Ltd."]
+    section = 1
+    while len(lines) < pages * lines_per_page:
+        title, _, clause = CLAUSE_LIBRARY[(section - 1) % len(CLAUSE_LIBRARY)]
+        lines.append(f"{section}. {title}")
+        lines.append(clause)
+        for _ in range(rng.randint(2, 5)):
+            lines.append(FILLER.strip())
+        section += 1
+    return "\n".join(lines[:pages * lines_per_page])
+
+def write_txt(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def write_docx(path, text):
+    from docx import Document
+
+    doc = Document()
+    for line in text.split("\n"):
+        doc.add_paragraph(line)
+    doc.save(path)
+
+def write_pdf(path, text, lines_per_page=40):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(False)
+    pdf.set_font("Arial", "", 9)
+    for i, line in enumerate(text.split("\n")):
+        if i % lines_per_page == 0:
+            pdf.add_page()
+        pdf.multi_cell(0, 6, line)
+    pdf.output(path)
+
+WRITERS = {"txt": write_txt, "docx": write_docx, "pdf": write_pdf}
+
+def build_corpus(out_dir, sizes=(5, 50, 150), formats=("pdf", "docx", "txt")):
+    """
+    Writes one contract per (size, format) into `out_dir`.
+    Returns a list of (path, format, pages).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for pages in sizes:
+        text = contract_text(pages, seed=pages)
+        for fmt in formats:
+            path = os.path.join(out_dir, f"contract_{pages}p.{fmt}")
+            WRITERS[fmt](path, text)
+            corpus.append((path, fmt, pages))
+    return corpus
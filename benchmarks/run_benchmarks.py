@@ -0,0 +1,233 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import build_corpus, contract_text
+from benchmarks.stub_ollama import StubOllama, canned_analysis
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def measure(fn, iterations=10, concurrency=1, warmup=1):
+    """
+    Runs `fn` `iterations` times with `concurrency` threads.
+    Returns latency percentiles (ms), throughput (ops/s) and peak traced memory (MB).
+    Peak memory comes from one extra traced call so it does not skew the timings.
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = [l * 1000 for l in latencies]
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "throughput_ops": round(iterations / wall, 3),
+        "peak_mem_mb": round(peak / (1024 * 1024), 3),
+    }
+
+def bench_extraction(corpus, iterations):
+    from src.document_processor import DocumentProcessor
+
+    results = {}
+    for path, fmt, pages in corpus:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        def run(data=data, name=os.path.basename(path)):
+            upload = io.BytesIO(data)
+            upload.name = name
+            text, error = DocumentProcessor.extract_text(upload)
+            assert not error, error
+
+        results[f"extract_text[{fmt},{pages}p]"] = measure(run, iterations)
+    return results
+
+def bench_highlight(pages, iterations):
+    from src import highlighter
+    from src.utils import highlight_text, highlight_page
+
+    text = contract_text(pages, seed=pages)
+    clauses = canned_analysis()["clauses"]
+
+    def cold():
+        highlighter._render_cached.cache_clear()
+        highlight_text(text, clauses)
+
+    viewer_pages = highlighter.paginate(text)
+
+    def viewer_window():
+        # What the dashboard renders per rerun: two pages, spans already located
+        highlighter._page_cached.cache_clear()
+        for start, end, _ in viewer_pages[:2]:
+            highlight_page(text, clauses, start, end)
+
+    return {
+        f"highlight_text[cold,{pages}p]": measure(cold, iterations),
+        f"highlight_text[memoized,{pages}p]": measure(lambda: highlight_text(text, clauses), iterations),
+        f"highlight_page[window,{pages}p]": measure(viewer_window, iterations),
+    }
+
+def bench_report(iterations):
+    from src.report_generator import generate_pdf_report
+
+    analysis = canned_analysis()
+    return {"generate_pdf_report": measure(lambda: generate_pdf_report(analysis, "contract.pdf"), iterations)}
+
+def bench_clean_json(analyzer, iterations):
+    clean = json.dumps(canned_analysis())
+    wrapped = "Sure! Here is the analysis:\n" + clean + "\nLet me know if you need anything else."
+    return {
+        "_clean_json[clean]": measure(lambda: analyzer._clean_json(clean), iterations * 10),
+        "_clean_json[wrapped]": measure(lambda: analyzer._clean_json(wrapped), iterations * 10),
+    }
+
+def bench_analyze_endpoint(corpus, iterations, concurrency):
+    import requests
+    import uvicorn
+    import api
+
+    config = uvicorn.Config(api.app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/analyze"
+
+    path = next(p for p, fmt, pages in corpus if fmt == "txt" and pages == min(c[2] for c in corpus))
+    with open(path, "rb") as f:
+        base = f.read()
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+
+    def run():
+        # A unique line per request so the analysis cache does not short-circuit the LLM call
+        with lock:
+            n = next(counter)
+        body = base + f"\nReference number {n} {time.time()}".encode("utf-8")
+        response = requests.post(url, files={"file": ("contract.txt", body)}, data={"language": "English"}, timeout=300)
+        assert response.status_code == 200, response.text
+
+    try:
+        return {f"/analyze[c={concurrency}]": measure(run, iterations, concurrency)}
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\n{'benchmark':45} {'p50 old':>10} {'p50 new':>10} {'change':>8}")
+    for name, stats in current.items():
+        old = baseline.get(name)
+        if not old or not old.get("p50_ms"):
+            continue
+        change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        print(f"{name:45} {old['p50_ms']:>10.2f} {stats['p50_ms']:>10.2f} {change:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks against a stub Ollama server.")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Previous results JSON to diff p50 latencies against")
+    parser.add_argument("--sizes", default="5,50,150", help="Comma-separated page counts for the corpus")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub Ollama seconds per generation")
+    parser.add_argument("--skip-api", action="store_true", help="Skip the /analyze end-to-end benchmark")
+    args = parser.parse_args()
+
+    sizes = tuple(int(s) for s in args.sizes.split(","))
+    stub = StubOllama(latency=args.llm_latency)
+    os.environ["OLLAMA_ENDPOINTS"] = stub.start()
+    os.environ["OLLAMA_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    output = os.path.abspath(args.output)
+    with tempfile.TemporaryDirectory() as workdir:
+        # Caches and audit logs from the run go to a scratch directory
+        os.chdir(workdir)
+        corpus = build_corpus(os.path.join(workdir, "corpus"), sizes=sizes)
+
+        from src.llm_engine import ContractAnalyzer
+
+        results = {}
+        results.update(bench_extraction(corpus, args.iterations))
+        results.update(bench_highlight(max(sizes), args.iterations))
+        results.update(bench_report(args.iterations))
+        results.update(bench_clean_json(ContractAnalyzer(), args.iterations))
+        if not args.skip_api:
+            results.update(bench_analyze_endpoint(corpus, args.iterations, args.concurrency))
+        os.chdir(ROOT)
+
+    stub.stop()
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": vars(args),
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, stats in results.items():
+        print(f"{name:45} p50 {stats['p50_ms']:>10.2f} ms  p99 {stats['p99_ms']:>10.2f} ms  "
+              f"{stats['throughput_ops']:>9.2f} ops/s  {stats['peak_mem_mb']:>8.2f} MB")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
+
+# Run using: python -m benchmarks.run_benchmarks --output bench_results.json --compare previous.json
@@ -0,0 +1,103 @@
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.corpus import CLAUSE_LIBRARY
+
+def canned_analysis():
+    return {
+        "contract_type": "Master Services Agreement",
+        "parties": ["Acme Technologies Pvt Ltd", "Globex India Ltd"],
+        "risk_score": 72,
+        "overall_risk_level": "High",
+        "summary": "A services agreement with one-sided termination and uncapped indemnity.",
+        "executive_advice": "Cap the indemnity at the annual fees and require 30 days notice for termination.",
+        "clauses": [
+            {"title": title, "risk_level": risk, "explanation": f"{title} is unfavourable.",
+             "recommendation": f"Renegotiate the {title.lower()} clause.", "original_text": text}
+            for title, risk, text in CLAUSE_LIBRARY
+        ],
+        "missing_clauses": ["Force Majeure", "Dispute Resolution"],
+        "compliance_check": {"status": "Fail", "notes": "Foreign governing law for Indian parties."},
+    }
+
+class StubOllama:
+    """
+    Minimal stand-in for Ollama's /api/generate and /api/tags.
+    `latency` seconds are spent per generation; streaming splits the canned
+    response into `stream_chunk`-character fragments spread over that time.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, response=None, stream_chunk=32):
+        self.latency = latency
+        self.response_text = json.dumps(response or canned_analysis())
+        self.stream_chunk = stream_chunk
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._send_json({"models": [{"name": "llama3"}]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                stub.requests += 1
+                if not payload.get("stream"):
+                    time.sleep(stub.latency)
+                    self._send_json({"response": stub.response_text, "done": True})
+                    return
+
+                text = stub.response_text
+                pieces = [text[i:i + stub.stream_chunk] for i in range(0, len(text), stub.stream_chunk)]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for piece in pieces + [""]:
+                    time.sleep(stub.latency / max(len(pieces), 1))
+                    line = (json.dumps({"response": piece, "done": piece == ""}) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-ollama", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server for benchmarks and local testing.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per generation")
+    args = parser.parse_args()
+
+    stub = StubOllama(port=args.port, latency=args.latency)
+    print(f"Stub Ollama listening on {stub.url} (latency {args.latency}s)")
+    stub.server.serve_forever()
+
+if __name__ == "__main__":
+    main()
+
+# Run using: python -m benchmarks.stub_ollama --port 11434 --latency 2
@@ -1,14 +1,41 @@
-import streamlit as st
-from src.llm_engine import ContractAnalyzer
-
-st.title("📝 Standardized Contract Templates")
-
-contract_type = st.selectbox("Select Contract Type", 
-    ["Employment Agreement", "NDA", "Service Agreement", "Lease Deed"])
-
-if st.button("Generate Template"):
-    analyzer = ContractAnalyzer()
-    # You would implement a prompt specifically for generation here
-    template_text = analyzer.generate_template(contract_type)
-    st.text_area("Template Preview", template_text, height=400)
-    st.download_button("Download Template", template_text, file_name=f"{contract_type}.txt")
\ No newline at end of file
+import uuid
+import streamlit as st
+from src.llm_engine import ContractAnalyzer
+from src.templates import TemplateLibrary, CONTRACT_TYPES
+from src.scheduler import llm_priority
+
+st.title("📝 Standardized Contract Templates")
+
+contract_type = st.selectbox("Select Contract Type", CONTRACT_TYPES)
+
+@st.cache_resource
+def get_library():
+    # One engine and library per server process; the backend pool keeps its connections alive
+    return TemplateLibrary(ContractAnalyzer())
+
+c1, c2 = st.columns(2)
+with c1:
+    party_a = st.text_input("First Party")
+    effective_date = st.text_input("Effective Date")
+    jurisdiction = st.text_input("Jurisdiction (City)", "New Delhi")
+with c2:
+    party_b = st.text_input("Second Party")
+    amount = st.text_input("Amount (e.g. INR 50,000 per month)")
+
+requirements = st.text_area("Custom Requirements (optional)",
+                            help="Leave empty to use the standard template instantly. Custom requirements are drafted by the AI once and then reused.")
+
+if st.button("Generate Template"):
+    library = get_library()
+    params = {
+        "PARTY_A": party_a,
+        "PARTY_B": party_b,
+        "EFFECTIVE_DATE": effective_date,
+        "AMOUNT": amount,
+        "JURISDICTION": jurisdiction,
+    }
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    with st.container(height=400), llm_priority("interactive", st.session_state.client_id):
+        template_text = st.write_stream(library.stream(contract_type, params, requirements))
+    st.download_button("Download Template", template_text, file_name=f"{contract_type}.txt")
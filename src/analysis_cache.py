@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from src.utils import normalize_text
+from src.metrics import CACHE_LOOKUPS
+
+class AnalysisCache:
+    """
+    Persistent, content-addressed cache for contract analysis results.
+    One JSON file per entry, keyed by a hash of the normalized contract text,
+    language, model and system-prompt version.
+    """
+    def __init__(self, cache_dir="data/cache/analysis", max_entries=500, max_age_seconds=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Ensure directory exists
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    @staticmethod
+    def make_key(contract_text, language, model, prompt_version):
+        parts = [normalize_text(contract_text), language, model, prompt_version]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _count(self, hit):
+        CACHE_LOOKUPS.inc(result="hit" if hit else "miss")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """
+        Returns the cached result for `key`, or None on a miss / expired entry.
+        """
+        path = self._path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.max_age_seconds:
+                os.remove(path)
+                self._count(False)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            # Touch the entry so eviction removes the least recently used first
+            os.utime(path, None)
+        except (OSError, ValueError):
+            self._count(False)
+            return None
+
+        self._count(True)
+        return result
+
+    def set(self, key, result):
+        """
+        Stores a successful analysis. Error results, chunked results with failed chunks
+        and results the parser had to repair or default (parse_report) are never cached.
+        """
+        if not result or "error" in result or result.get("failed_chunks") or result.get("parse_report"):
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)  # Atomic, so readers never see half a file
+        except Exception as e:
+            print(f"Failed to write analysis cache: {e}")
+            return
+
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.max_age_seconds:
+                self._remove(entry.path)
+            else:
+                entries.append((mtime, entry.path))
+
+        overflow = len(entries) - self.max_entries
+        if overflow > 0:
+            entries.sort()
+            for _, path in entries[:overflow]:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                self._remove(entry.path)
+
+    def stats(self):
+        entries = sum(1 for e in os.scandir(self.cache_dir) if e.name.endswith(".json"))
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "max_age_seconds": self.max_age_seconds,
+        }
@@ -1,46 +1,270 @@
-import json
-import os
-from datetime import datetime
-
-class AuditLogger:
-    def __init__(self, log_dir="data/audit_logs"):
-        self.log_dir = log_dir
-        self.log_file = os.path.join(log_dir, "audit_trail.json")
-        
-        # Ensure directory exists
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
-
-    def log_event(self, event_type, filename, risk_score, status="Success", metadata=None):
-        """
-        Logs a user action or system event.
-        """
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "event_type": event_type,  # e.g., "CONTRACT_ANALYSIS", "TEMPLATE_GENERATION"
-            "filename": filename,
-            "risk_score": risk_score,
-            "status": status,
-            "metadata": metadata or {}
-        }
-
-        try:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                json.dump(entry, f)
-                f.write("\n") # Newline delimited JSON for easy appending
-        except Exception as e:
-            print(f"Failed to write audit log: {e}")
-
-    def get_logs(self):
-        """
-        Reads logs for the dashboard (optional).
-        """
-        logs = []
-        if os.path.exists(self.log_file):
-            with open(self.log_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        logs.append(json.loads(line))
-                    except:
-                        continue
-        return logs
\ No newline at end of file
+import atexit
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from src.metrics import current_trace
+
+_dir_locks = {}
+_dir_locks_guard = threading.Lock()
+
+def _dir_lock(log_dir):
+    # Loggers sharing a directory in one process must not interleave appends
+    with _dir_locks_guard:
+        return _dir_locks.setdefault(os.path.abspath(log_dir), threading.Lock())
+
+@contextmanager
+def _file_lock(path):
+    """
+    Exclusive OS-level lock on `path`, so processes sharing a log directory
+    (API workers, the batch CLI) append and compute offsets one at a time.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class AuditLogger:
+    """
+    Audit trail stored as rotated NDJSON segments plus a SQLite index.
+
+    log_event() only enqueues; a background writer appends events in batches,
+    rotates to a new segment once the active one reaches `segment_max_bytes`,
+    and records each event's (segment, offset) in the index so queries read
+    just the matching lines instead of the whole history.
+    """
+    LEGACY_SEGMENT = "audit_trail.json"
+    SEGMENT_PATTERN = re.compile(r"^audit_trail-(\d{6})\.json$")
+
+    def __init__(self, log_dir="data/audit_logs", segment_max_bytes=8 * 1024 * 1024, batch_size=256):
+        self.log_dir = log_dir
+        self.log_file = os.path.join(log_dir, self.LEGACY_SEGMENT)  # Pre-rotation history, still indexed
+        self.index_path = os.path.join(log_dir, "audit_index.sqlite")
+        self.lock_path = os.path.join(log_dir, "audit.lock")
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_size = batch_size
+        self._write_lock = _dir_lock(log_dir)
+
+        # Ensure directory exists
+        if not os.path.exists(self.log_dir):
+            os.makedirs(self.log_dir)
+
+        self._init_index()
+        self._catch_up_index()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="audit-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    # --- Index ---
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_index(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT, event_type TEXT, filename TEXT, risk_score REAL, status TEXT,
+                    segment TEXT, offset INTEGER, length INTEGER
+                )
+            """)
+            for column in ("timestamp", "event_type", "filename", "risk_score"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_events_{column} ON events ({column})")
+
+    def _segments(self):
+        # Legacy file first, then numbered segments in order
+        names = sorted(n for n in os.listdir(self.log_dir) if self.SEGMENT_PATTERN.match(n))
+        if os.path.exists(self.log_file):
+            names.insert(0, self.LEGACY_SEGMENT)
+        return names
+
+    def _catch_up_index(self):
+        """
+        Indexes any segment bytes written but not yet indexed (first start on an
+        existing trail, or a crash between the append and the index commit).
+        """
+        with self._write_lock, _file_lock(self.lock_path), self._connect() as conn:
+            for segment in self._segments():
+                row = conn.execute("SELECT MAX(offset + length) FROM events WHERE segment = ?", (segment,)).fetchone()
+                indexed_end = row[0] or 0
+                path = os.path.join(self.log_dir, segment)
+                if os.path.getsize(path) <= indexed_end:
+                    continue
+                rows = []
+                with open(path, "rb") as f:
+                    f.seek(indexed_end)
+                    offset = indexed_end
+                    for line in f:
+                        try:
+                            rows.append(self._index_row(json.loads(line), segment, offset, len(line)))
+                        except ValueError:
+                            pass
+                        offset += len(line)
+                conn.executemany(self._INSERT, rows)
+
+    _INSERT = """
+        INSERT INTO events (timestamp, event_type, filename, risk_score, status, segment, offset, length)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _index_row(entry, segment, offset, length):
+        score = entry.get("risk_score")
+        return (
+            entry.get("timestamp"), entry.get("event_type"), entry.get("filename"),
+            score if isinstance(score, (int, float)) else None,
+            entry.get("status"), segment, offset, length,
+        )
+
+    # --- Writer ---
+    def _active_segment(self):
+        numbered = [n for n in self._segments() if n != self.LEGACY_SEGMENT]
+        if not numbered:
+            return "audit_trail-000001.json"
+        last = numbered[-1]
+        path = os.path.join(self.log_dir, last)
+        if os.path.getsize(path) >= self.segment_max_bytes:
+            number = int(self.SEGMENT_PATTERN.match(last).group(1)) + 1
+            return f"audit_trail-{number:06d}.json"
+        return last
+
+    def _write_batch(self, entries):
+        # One open/append per batch; the index is committed only after the lines are on disk.
+        # The file lock covers rotation, append, tell() and the index commit across processes.
+        rows = []
+        try:
+            with self._write_lock, _file_lock(self.lock_path):
+                segment = self._active_segment()
+                with open(os.path.join(self.log_dir, segment), "ab") as f:
+                    offset = f.tell()
+                    for entry in entries:
+                        line = (json.dumps(entry) + "\n").encode("utf-8")  # Newline delimited JSON
+                        f.write(line)
+                        rows.append(self._index_row(entry, segment, offset, len(line)))
+                        offset += len(line)
+                with self._connect() as conn:
+                    conn.executemany(self._INSERT, rows)
+        except Exception as e:
+            print(f"Failed to write audit log: {e}")
+
+    def _write_loop(self):
+        while True:
+            # Block for the first event, then take whatever else is already queued
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Blocks until every queued event is on disk and indexed.
+        """
+        self._queue.join()
+
+    def log_event(self, event_type, filename, risk_score, status="Success", metadata=None):
+        """
+        Logs a user action or system event.
+        Inside a metrics.stage_trace() block, the per-stage timings are attached
+        to the metadata as "stage_timings".
+        """
+        metadata = dict(metadata or {})
+        trace = current_trace()
+        if trace is not None and "stage_timings" not in metadata:
+            metadata["stage_timings"] = trace.as_dict()
+
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "event_type": event_type,  # e.g., "CONTRACT_ANALYSIS", "TEMPLATE_GENERATION"
+            "filename": filename,
+            "risk_score": risk_score,
+            "status": status,
+            "metadata": metadata
+        }
+        self._queue.put(entry)
+
+    # --- Queries ---
+    @staticmethod
+    def _where(start, end, event_type, filename, min_risk, max_risk, status):
+        clauses, params = [], []
+        for column, op, value in (
+            ("timestamp", ">=", start), ("timestamp", "<", end),
+            ("event_type", "=", event_type), ("filename", "=", filename),
+            ("risk_score", ">=", min_risk), ("risk_score", "<=", max_risk),
+            ("status", "=", status),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value.isoformat() if isinstance(value, datetime) else value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start=None, end=None, event_type=None, filename=None, min_risk=None,
+              max_risk=None, status=None, limit=100, offset=0, newest_first=True):
+        """
+        Filtered, paginated read of the trail. `start`/`end` accept datetimes or ISO strings.
+        Returns {"total": <matching events>, "items": [entries]}.
+        """
+        self.flush()
+        where, params = self._where(start, end, event_type, filename, min_risk, max_risk, status)
+        order = "DESC" if newest_first else "ASC"
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+            sql = f"SELECT segment, offset, length FROM events{where} ORDER BY timestamp {order}, id {order}"
+            if limit is not None:
+                sql += " LIMIT ? OFFSET ?"
+                params = params + [limit, offset]
+            rows = conn.execute(sql, params).fetchall()
+        return {"total": total, "items": self._read_entries(rows)}
+
+    def _read_entries(self, rows):
+        # Read each segment once, seeking straight to the indexed lines
+        by_segment = {}
+        for position, (segment, offset, length) in enumerate(rows):
+            by_segment.setdefault(segment, []).append((offset, length, position))
+
+        entries = [None] * len(rows)
+        for segment, locations in by_segment.items():
+            with open(os.path.join(self.log_dir, segment), "rb") as f:
+                for offset, length, position in sorted(locations):
+                    f.seek(offset)
+                    try:
+                        entries[position] = json.loads(f.read(length))
+                    except ValueError:
+                        continue
+        return [e for e in entries if e is not None]
+
+    def get_logs(self):
+        """
+        Reads logs for the dashboard (optional). Oldest first, full history;
+        prefer query() for anything larger than a quick look.
+        """
+        return self.query(limit=None, newest_first=False)["items"]
@@ -0,0 +1,64 @@
+import re
+
+# Lines that start a new clause / section, e.g. "12.", "3.1", "Section 4", "ARTICLE IV", "SCHEDULE A"
+SECTION_PATTERN = re.compile(
+    r"^\s*(?:(?:section|clause|article|schedule|annexure|appendix|exhibit)\b|\d+(?:\.\d+)*[.)]\s|[IVXLC]+\.\s)",
+    re.IGNORECASE,
+)
+
+def split_sections(text):
+    """
+    Splits contract text into sections at clause/section headings.
+    Text before the first heading (title, recitals) becomes its own section.
+    """
+    sections = []
+    current = []
+    for line in text.split("\n"):
+        if SECTION_PATTERN.match(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+def _split_oversized(section, max_chars):
+    # A single section bigger than the budget: fall back to paragraph, then line, then hard cuts
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", section):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.split("\n"):
+            while len(line) > max_chars:
+                cut = line.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(line[:cut])
+                line = line[cut:].lstrip()
+            pieces.append(line)
+    return pieces
+
+def chunk_text(text, max_chars):
+    """
+    Packs whole sections into chunks of at most `max_chars` characters.
+    Sections are never split unless a single section exceeds the budget.
+    Returns a list of chunk strings in document order.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+
+    for section in split_sections(text):
+        parts = [section] if len(section) <= max_chars else _split_oversized(section, max_chars)
+        for part in parts:
+            added = len(part) + (1 if current else 0)
+            if current and current_len + added > max_chars:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+                added = len(part)
+            current.append(part)
+            current_len += added
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
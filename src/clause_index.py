@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+
+from src.chunking import split_sections
+from src.utils import normalize_text
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_WORDS = 3
+MIN_SECTION_WORDS = 20  # Headings and one-liners carry too little text to match safely
+# Bumped when the bucket keys change; older databases get their buckets rebuilt from the stored signatures
+BUCKET_VERSION = 1
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def _shingles(words):
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def reused_result(clauses):
+    """
+    Analysis-shaped result for sections resolved entirely from the index,
+    scored the same way as the rule-based pre-screen.
+    """
+    high = sum(1 for c in clauses if c.get("risk_level") == "High")
+    medium = sum(1 for c in clauses if c.get("risk_level") == "Medium")
+    risk_score = min(100, 10 + 25 * high + 12 * medium)
+    return {
+        "contract_type": "General",
+        "parties": [],
+        "risk_score": risk_score,
+        "overall_risk_level": "High" if risk_score > 70 else "Medium" if risk_score > 40 else "Low",
+        "summary": "",
+        "executive_advice": "",
+        "clauses": clauses,
+        "missing_clauses": [],
+        "compliance_check": {"status": "Pass", "notes": ""},
+    }
+
+class ClauseIndex:
+    """
+    Local near-duplicate index of previously analyzed contract sections.
+    Each section is stored with the clauses the model found in it (possibly none),
+    a MinHash signature and LSH band buckets, in a SQLite database.
+    """
+    def __init__(self, index_dir="data/cache/clauses", num_perm=64, bands=16, threshold=0.85, max_entries=50000):
+        self.index_path = os.path.join(index_dir, "clause_index.sqlite")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Fixed seed: signatures must stay comparable across processes and restarts
+        rng = random.Random(1872)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+        # Ensure directory exists
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        self._init_index()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_index(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    digest TEXT UNIQUE, language TEXT, model TEXT,
+                    signature BLOB, clauses TEXT, created REAL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket INTEGER, section_id INTEGER)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets ON buckets (band, bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_section ON buckets (section_id)")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < BUCKET_VERSION:
+                self._rebuild_buckets(conn)
+                conn.execute(f"PRAGMA user_version = {BUCKET_VERSION}")
+
+    def _rebuild_buckets(self, conn):
+        # Indexes written before BUCKET_VERSION 1 used hash(tuple), which is not stable across interpreters
+        conn.execute("DELETE FROM buckets")
+        for section_id, blob in conn.execute("SELECT id, signature FROM sections").fetchall():
+            conn.executemany("INSERT INTO buckets (band, bucket, section_id) VALUES (?, ?, ?)",
+                             [(band, bucket, section_id) for band, bucket in self._band_buckets(list(array("Q", blob)))])
+
+    # --- MinHash / LSH ---
+    def signature(self, text):
+        shingles = _shingles(_words(text))
+        return [min((a * h + b) % MERSENNE_PRIME for h in shingles) for a, b in self._perms]
+
+    def _band_buckets(self, signature):
+        # CRC of the packed band values: buckets are persisted, so they must not depend on the interpreter's hash()
+        return [(band, zlib.crc32(array("Q", signature[band * self.rows:(band + 1) * self.rows]).tobytes()))
+                for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+    @staticmethod
+    def _digest(text, language, model):
+        return hashlib.sha256("\x1f".join([normalize_text(text).lower(), language, model]).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def indexable(section):
+        return len(_words(section)) >= MIN_SECTION_WORDS
+
+    # --- Writing ---
+    def add_analysis(self, contract_text, language, model, result):
+        """
+        Indexes every section of an analyzed contract with the clauses found in it.
+        Clauses are attributed to sections by their original_text; if any clause
+        cannot be placed, sections without clauses are skipped, since one of them
+        may be where that clause came from.
+        """
+        if not result or "error" in result:
+            return 0
+
+        sections = [s for s in split_sections(contract_text) if self.indexable(s)]
+        normalized = [normalize_text(s).lower() for s in sections]
+        found = [[] for _ in sections]
+        unplaced = False
+        for clause in result.get("clauses", []):
+            quote = normalize_text(clause.get("original_text", "")).lower()
+            position = next((i for i, text in enumerate(normalized) if quote and quote in text), None)
+            if position is None:
+                unplaced = True
+            else:
+                found[position].append(clause)
+
+        rows = [(section, clauses) for section, clauses in zip(sections, found) if clauses or not unplaced]
+        with self._lock, self._connect() as conn:
+            for section, clauses in rows:
+                signature = self.signature(section)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO sections (digest, language, model, signature, clauses, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self._digest(section, language, model), language, model,
+                     array("Q", signature).tobytes(), json.dumps(clauses), time.time()),
+                )
+                if cursor.rowcount:
+                    conn.executemany("INSERT INTO buckets (band, bucket, section_id) VALUES (?, ?, ?)",
+                                     [(band, bucket, cursor.lastrowid) for band, bucket in self._band_buckets(signature)])
+            self._evict(conn)
+        return len(rows)
+
+    def _evict(self, conn):
+        overflow = conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            old = [row[0] for row in conn.execute("SELECT id FROM sections ORDER BY created LIMIT ?", (overflow,))]
+            conn.executemany("DELETE FROM buckets WHERE section_id = ?", [(i,) for i in old])
+            conn.executemany("DELETE FROM sections WHERE id = ?", [(i,) for i in old])
+
+    # --- Lookup ---
+    def lookup(self, section, language, model):
+        """
+        Returns (clauses, similarity) for the closest indexed near-duplicate at or
+        above the threshold, or (None, 0.0). Reused clauses quote the new text.
+        """
+        if not self.indexable(section):
+            return None, 0.0
+
+        signature = self.signature(section)
+        buckets = self._band_buckets(signature)
+        with self._connect() as conn:
+            candidates = conn.execute(
+                "SELECT DISTINCT s.id, s.signature, s.clauses FROM buckets b JOIN sections s ON s.id = b.section_id "
+                f"WHERE ({' OR '.join(['(b.band = ? AND b.bucket = ?)'] * len(buckets))}) AND s.language = ? AND s.model = ?",
+                [v for pair in buckets for v in pair] + [language, model],
+            ).fetchall()
+
+        best, best_similarity = None, 0.0
+        for _, blob, clauses in candidates:
+            similarity = self.similarity(signature, array("Q", blob))
+            if similarity > best_similarity:
+                best, best_similarity = clauses, similarity
+
+        with self._lock:
+            if best is not None and best_similarity >= self.threshold:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if best is None or best_similarity < self.threshold:
+            return None, 0.0
+
+        section_text = normalize_text(section).lower()
+        clauses = []
+        for clause in json.loads(best):
+            # Near-duplicate wording: point the reused clause at this contract's text
+            if normalize_text(clause.get("original_text", "")).lower() not in section_text:
+                clause = dict(clause, original_text=section.strip())
+            clauses.append(clause)
+        return clauses, round(best_similarity, 3)
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,130 @@
+import re
+
+from src.chunking import SECTION_PATTERN
+
+# Llama-style BPE: common English words are ~1 token, long words split every ~6 chars,
+# numbers every 3 digits, and punctuation / non-Latin script roughly one token per character
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+# Page furniture: short lines repeated at the top or bottom of pages ("Page 3 of 12", "CONFIDENTIAL", letterheads)
+FURNITURE_MAX_CHARS = 100
+FURNITURE_MIN_REPEATS = 3
+FURNITURE_EDGE_LINES = 2  # Only this many lines at each end of a page can be furniture
+# Page numbers are the only part of a header/footer allowed to change between pages
+PAGE_NUMBER_PATTERN = re.compile(r"\bpage\s+\d+(?:\s+of\s+\d+)?\b|^[-\s]*\d+(?:\s*(?:/|of)\s*\d+)?[-\s]*$")
+# Paragraphs at least this long are collapsed when repeated verbatim (definitions, signature blocks)
+DUPLICATE_MIN_CHARS = 80
+REPORT_SAMPLES = 5
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate for prompt budgeting. Errs on the high side so that
+    text judged to fit is not truncated by the model.
+    """
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        tokens += 1 + (len(piece) - 1) // 6
+    return tokens
+
+def _line_key(line):
+    return PAGE_NUMBER_PATTERN.sub("#", " ".join(line.lower().split()))
+
+def _is_furniture_candidate(line):
+    stripped = line.strip()
+    return (
+        0 < len(stripped) <= FURNITURE_MAX_CHARS
+        and not SECTION_PATTERN.match(line)
+        and not stripped.endswith((".", ",", ";"))  # wrapped sentence fragments, not headers
+    )
+
+def _page_edge_lines(lines, offset_index):
+    """
+    Returns {line number: page} for the first and last FURNITURE_EDGE_LINES
+    lines of every page, using the extractor's page boundaries.
+    """
+    by_page = {}
+    offset = 0
+    for number, line in enumerate(lines):
+        page = offset_index.page_of(offset)
+        if page is not None and line.strip():
+            by_page.setdefault(page, []).append(number)
+        offset += len(line) + 1
+    edges = {}
+    for page, numbers in by_page.items():
+        for number in numbers[:FURNITURE_EDGE_LINES] + numbers[-FURNITURE_EDGE_LINES:]:
+            edges[number] = page
+    return edges
+
+def compress_boilerplate(text, offset_index=None):
+    """
+    Removes page headers/footers and collapses verbatim duplicate paragraphs.
+    A header/footer is a short line found at the top or bottom of at least
+    FURNITURE_MIN_REPEATS pages, identical apart from its page number; without
+    an OffsetIndex there are no page boundaries, so none are removed.
+    Returns (compressed_text, report) where report lists what was removed.
+    """
+    lines = text.split("\n")
+    edges = _page_edge_lines(lines, offset_index) if offset_index is not None else {}
+
+    pages_by_key = {}
+    for number, page in edges.items():
+        if _is_furniture_candidate(lines[number]):
+            pages_by_key.setdefault(_line_key(lines[number]), set()).add(page)
+    furniture = {key for key, pages in pages_by_key.items() if len(pages) >= FURNITURE_MIN_REPEATS}
+
+    kept, seen = [], set()
+    furniture_removed, duplicates_removed = {}, {}
+    for number, line in enumerate(lines):
+        if number in edges and _is_furniture_candidate(line):
+            key = _line_key(line)
+            if key in furniture:
+                furniture_removed[key] = furniture_removed.get(key, 0) + 1
+                continue
+        stripped = line.strip()
+        if len(stripped) >= DUPLICATE_MIN_CHARS:
+            key = " ".join(stripped.lower().split())
+            if key in seen:
+                duplicates_removed[key] = duplicates_removed.get(key, 0) + 1
+                continue
+            seen.add(key)
+        kept.append(line)
+
+    compressed = "\n".join(kept)
+    report = {
+        "original_chars": len(text),
+        "compressed_chars": len(compressed),
+        "header_footer_lines_removed": sum(furniture_removed.values()),
+        "duplicate_paragraphs_removed": sum(duplicates_removed.values()),
+        "removed_samples": [key for key, _ in sorted(furniture_removed.items(), key=lambda kv: -kv[1])[:REPORT_SAMPLES]]
+                           + [key[:120] for key in list(duplicates_removed)[:REPORT_SAMPLES]],
+    }
+    return compressed, report
+
+def chars_for_tokens(text, max_tokens):
+    """
+    Converts a token budget into a character budget using the token density
+    of `text` itself (dense text such as Hindi or tables gets fewer characters).
+    """
+    sample = text[:20000]
+    tokens = estimate_tokens(sample)
+    if not tokens:
+        return max_tokens * 4
+    return max(1, int(max_tokens * len(sample) / tokens))
+
+def prepare_contract_text(text, max_tokens, offset_index=None):
+    """
+    Prompt-preparation stage: compresses boilerplate, then measures the result
+    against the token budget. Nothing beyond boilerplate is dropped here; text
+    over budget is split across prompts by the caller instead of being truncated.
+    `offset_index` (the extractor's OffsetIndex for `text`) enables header/footer removal.
+    Returns (prepared_text, report).
+    """
+    compressed, report = compress_boilerplate(text, offset_index)
+    tokens = estimate_tokens(compressed)
+    report.update(
+        original_tokens=estimate_tokens(text),
+        prompt_tokens=tokens,
+        token_budget=max_tokens,
+        fits_single_prompt=tokens <= max_tokens,
+    )
+    return compressed, report
@@ -1,50 +1,230 @@
-import io
-import PyPDF2
-from docx import Document
-
-class DocumentProcessor:
-    @staticmethod
-    def extract_text(uploaded_file):
-        """
-        Extracts text from PDF, DOCX, or TXT files.
-        Returns: (text_content, error_message)
-        """
-        text = ""
-        try:
-            # Handle PDF
-            if uploaded_file.name.lower().endswith('.pdf'):
-                pdf_reader = PyPDF2.PdfReader(uploaded_file)
-                num_pages = len(pdf_reader.pages)
-                
-                # Safety check for massive files (token limits)
-                if num_pages > 50:
-                    return None, f"File too large ({num_pages} pages). Please upload a contract under 50 pages."
-                
-                for page in pdf_reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted + "\n"
-            
-            # Handle DOCX
-            elif uploaded_file.name.lower().endswith('.docx'):
-                doc = Document(uploaded_file)
-                for para in doc.paragraphs:
-                    text += para.text + "\n"
-            
-            # Handle TXT
-            elif uploaded_file.name.lower().endswith('.txt'):
-                text = uploaded_file.read().decode("utf-8")
-            
-            else:
-                return None, "Unsupported file format. Please upload PDF, DOCX, or TXT."
-
-            # Post-processing: Remove empty lines/noise
-            clean_text = "\n".join([line for line in text.split('\n') if line.strip()])
-            
-            if len(clean_text) < 50:
-                return None, "Could not extract sufficient text. The file might be a scanned image (OCR required)."
-
-            return clean_text, None
-
-        except Exception as e:
-            return None, f"Error processing file: {str(e)}"
\ No newline at end of file
+import io
+import multiprocessing
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from src.metrics import timed
+
+Segment = namedtuple("Segment", ["page", "paragraph", "text"])
+
+# --- Process-pool workers (module level so they can be pickled) ---
+_worker_reader = None
+
+def _init_pdf_worker(pdf_bytes):
+    # Each worker parses the PDF once, then extracts individual pages on request
+    import PyPDF2
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+def _extract_pdf_page(index):
+    return _worker_reader.pages[index].extract_text() or ""
+
+class ExtractionError(Exception):
+    pass
+
+class OffsetIndex:
+    """
+    Compact map from character offsets in the cleaned text to (page, paragraph).
+    One entry per line, stored in typed arrays so it stays small for huge documents.
+    """
+    def __init__(self):
+        self.starts = array("l")
+        self.pages = array("l")
+        self.paragraphs = array("l")
+        self.length = 0  # Total length of the indexed text
+
+    def add(self, start, page, paragraph):
+        self.starts.append(start)
+        self.pages.append(page)
+        self.paragraphs.append(paragraph)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def locate(self, offset):
+        """
+        Returns (page, paragraph) for a character offset, or None if out of range.
+        """
+        i = bisect_right(self.starts, offset) - 1
+        if i < 0:
+            return None
+        return self.pages[i], self.paragraphs[i]
+
+    def page_of(self, offset):
+        location = self.locate(offset)
+        return location[0] if location else None
+
+    def page_count(self):
+        return self.pages[-1] if len(self.pages) else 0
+
+    def page_span(self, page):
+        """
+        Returns the (start, end) character range covered by `page`, or None if it has no text.
+        Pages are stored in document order, so both ends are found by bisection.
+        """
+        first = bisect_left(self.pages, page)
+        last = bisect_right(self.pages, page)
+        if first == last:
+            return None
+        end = self.starts[last] - 1 if last < len(self.starts) else self.length
+        return self.starts[first], end
+
+class DocumentProcessor:
+    # Large contracts are analyzed in chunks by ContractAnalyzer, so this only guards against runaway uploads
+    MAX_PAGES = 300
+    # Below this many pages, process start-up costs more than parallel extraction saves
+    PARALLEL_MIN_PAGES = 20
+
+    @staticmethod
+    def _iter_pdf_pages(pdf_reader, pdf_bytes, workers, page_timeout):
+        """
+        Yields the text of every page, in order. Large PDFs are spread across a
+        process pool; a page that exceeds `page_timeout` seconds is skipped.
+        """
+        num_pages = len(pdf_reader.pages)
+        workers = min(workers or os.cpu_count() or 1, num_pages)
+        if workers <= 1 or num_pages < DocumentProcessor.PARALLEL_MIN_PAGES:
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ""
+            return
+
+        # Spawned, not forked: callers run with other threads live (job queue, audit writer, Streamlit)
+        pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_pdf_worker, initargs=(pdf_bytes,))
+        try:
+            pending = [pool.apply_async(_extract_pdf_page, (i,)) for i in range(num_pages)]
+            skipped = []
+            for number, result in enumerate(pending, start=1):
+                try:
+                    yield result.get(timeout=page_timeout)
+                except multiprocessing.TimeoutError:
+                    skipped.append(number)
+                    yield ""
+            if skipped:
+                print(f"PDF extraction timed out on pages: {skipped}")
+        finally:
+            # terminate() also kills a worker stuck on a pathological page
+            pool.terminate()
+
+    @staticmethod
+    def _iter_raw_blocks(uploaded_file, workers, page_timeout):
+        # Yields (page_number, block_text) in document order
+        name = uploaded_file.name.lower()
+
+        # Handle PDF
+        if name.endswith('.pdf'):
+            import PyPDF2  # Parsers are imported on first use to keep startup fast
+            from src.ocr import get_default_ocr, needs_ocr
+            pdf_bytes = uploaded_file.read()
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+            num_pages = len(pdf_reader.pages)
+
+            # Safety check for massive files (token limits)
+            if num_pages > DocumentProcessor.MAX_PAGES:
+                raise ExtractionError(f"File too large ({num_pages} pages). Please upload a contract under {DocumentProcessor.MAX_PAGES} pages.")
+
+            # Pages stream through until the first image-only page; from there they are held
+            # (scans carry next to no text) until local OCR has recognized the scanned ones
+            scanned, held = [], []
+            pages = DocumentProcessor._iter_pdf_pages(pdf_reader, pdf_bytes, workers, page_timeout)
+            for i, extracted in enumerate(pages):
+                if needs_ocr(pdf_reader.pages[i], extracted):
+                    scanned.append(i)
+                if scanned:
+                    held.append((i, extracted))
+                else:
+                    yield i + 1, extracted
+            if not scanned:
+                return
+
+            # The caller's process budget also caps OCR (workers=1 inside a batch extraction worker)
+            recognized = get_default_ocr().recognize(pdf_bytes, pdf_reader.pages, scanned, workers)
+            next_ocr = next(recognized, None)
+            for i, extracted in held:
+                if next_ocr is not None and next_ocr[0] == i:
+                    extracted = next_ocr[1]
+                    next_ocr = next(recognized, None)
+                yield i + 1, extracted
+
+        # Handle DOCX (no layout information, so everything is page 1)
+        elif name.endswith('.docx'):
+            from docx import Document
+            doc = Document(uploaded_file)
+            for para in doc.paragraphs:
+                yield 1, para.text
+
+        # Handle TXT (read line by line; form feeds start a new page)
+        elif name.endswith('.txt'):
+            page_number = 1
+            for raw in uploaded_file:
+                line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+                parts = line.rstrip("\n").split("\f")
+                for i, part in enumerate(parts):
+                    yield page_number + i, part
+                page_number += len(parts) - 1
+
+        else:
+            raise ExtractionError("Unsupported file format. Please upload PDF, DOCX, or TXT.")
+
+    @staticmethod
+    def iter_segments(uploaded_file, workers=None, page_timeout=30):
+        """
+        Lazily yields non-empty text lines as Segment(page, paragraph, text).
+        `paragraph` counts non-empty lines within the page, starting at 1.
+        Raises ExtractionError for unsupported or oversized files.
+        """
+        current_page, paragraph = None, 0
+        for page_number, block in DocumentProcessor._iter_raw_blocks(uploaded_file, workers, page_timeout):
+            if page_number != current_page:
+                current_page, paragraph = page_number, 0
+            # Post-processing: Remove empty lines/noise
+            for line in block.split('\n'):
+                if line.strip():
+                    paragraph += 1
+                    yield Segment(page_number, paragraph, line)
+
+    @staticmethod
+    def extract_with_index(uploaded_file, workers=None, page_timeout=30):
+        """
+        Extracts the cleaned text plus an OffsetIndex mapping it back to pages/paragraphs.
+        Returns: (text_content, offset_index, error_message)
+        """
+        try:
+            with timed("extract"):
+                return DocumentProcessor._extract_with_index(uploaded_file, workers, page_timeout)
+        except ExtractionError as e:
+            return None, None, str(e)
+        except Exception as e:
+            return None, None, f"Error processing file: {str(e)}"
+
+    @staticmethod
+    def _extract_with_index(uploaded_file, workers, page_timeout):
+        index = OffsetIndex()
+        parts = []
+        offset = 0
+        for segment in DocumentProcessor.iter_segments(uploaded_file, workers, page_timeout):
+            index.add(offset, segment.page, segment.paragraph)
+            parts.append(segment.text)
+            offset += len(segment.text) + 1  # +1 for the joining newline
+        clean_text = "\n".join(parts)
+        index.length = len(clean_text)
+
+        if len(clean_text) < 50:
+            if not uploaded_file.name.lower().endswith('.pdf'):
+                return None, None, "Could not extract sufficient text. The file appears to be empty."
+            from src.ocr import get_default_ocr
+            if not get_default_ocr().available:
+                return None, None, "Could not extract sufficient text. The file might be a scanned image; install Tesseract with pytesseract and pdf2image to enable OCR."
+            return None, None, "Could not extract sufficient text, even with OCR. The scan may be blank or unreadable."
+
+        return clean_text, index, None
+
+    @staticmethod
+    def extract_text(uploaded_file, workers=None, page_timeout=30):
+        """
+        Extracts text from PDF, DOCX, or TXT files.
+        `workers` caps the PDF extraction processes (None = one per core, 1 = serial).
+        Returns: (text_content, error_message)
+        """
+        text, _, error = DocumentProcessor.extract_with_index(uploaded_file, workers, page_timeout)
+        return text, error
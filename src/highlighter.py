@@ -0,0 +1,221 @@
+import html
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+
+RISK_STYLES = {
+    "High": ("#ffcdd2", "2px solid #e53935"),    # Light Red
+    "Medium": ("#ffe0b2", "2px solid #fb8c00"),  # Light Orange
+}
+RISK_PRIORITY = {"High": 0, "Medium": 1}
+MIN_CLAUSE_LENGTH = 10
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher: finds every occurrence of every pattern in one pass.
+    """
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.lengths = [len(p) for p in patterns]
+
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.output[node].append(pattern_id)
+
+        # Breadth-first construction of failure links
+        queue = deque(self.goto[0].values())  # Depth-1 nodes fail back to the root
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text):
+        """
+        Yields (start, end, pattern_id) for every match, with `end` exclusive.
+        """
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for pattern_id in self.output[node]:
+                yield i + 1 - self.lengths[pattern_id], i + 1, pattern_id
+
+def _normalize_with_map(text):
+    """
+    Lowercases and keeps only alphanumeric characters, so matches survive the
+    LLM re-flowing whitespace or changing punctuation. Returns the normalized
+    string and, for each of its characters, the offset in the original text.
+    """
+    chars, positions = [], []
+    for i, ch in enumerate(text):
+        if ch.isalnum():
+            chars.append(ch.lower())
+            positions.append(i)
+    return "".join(chars), positions
+
+def find_clause_spans(full_text, clauses):
+    """
+    Locates every clause's original_text in `full_text`.
+    Returns non-overlapping (start, end, clause) spans sorted by position.
+    Overlaps are resolved deterministically: higher risk wins, then the longer span,
+    then the earlier clause in the list.
+    """
+    patterns, owners = [], []
+    for clause in clauses:
+        normalized, _ = _normalize_with_map((clause.get('original_text') or '').strip())
+        if len(normalized) < MIN_CLAUSE_LENGTH:
+            continue
+        patterns.append(normalized)
+        owners.append(clause)
+
+    if not patterns:
+        return []
+
+    normalized_text, positions = _normalize_with_map(full_text)
+    candidates = []
+    for start, end, pattern_id in AhoCorasick(patterns).find_all(normalized_text):
+        clause = owners[pattern_id]
+        candidates.append((
+            positions[start],
+            positions[end - 1] + 1,
+            RISK_PRIORITY.get(clause.get('risk_level'), 2),
+            pattern_id,
+        ))
+
+    # Greedy selection in priority order; accepted spans are kept sorted so each
+    # overlap check only looks at the neighbouring spans
+    candidates.sort(key=lambda c: (c[2], -(c[1] - c[0]), c[3], c[0]))
+    starts, chosen = [], []
+    for start, end, _, pattern_id in candidates:
+        i = bisect_right(starts, start)
+        if i > 0 and chosen[i - 1][1] > start:
+            continue
+        if i < len(starts) and starts[i] < end:
+            continue
+        starts.insert(i, start)
+        chosen.insert(i, (start, end, owners[pattern_id]))
+    return chosen
+
+def _escape(text):
+    return html.escape(text).replace("\n", "<br>")
+
+def _span_html(text, clause):
+    color, border = RISK_STYLES[clause['risk_level']]
+    explanation = html.escape(clause.get('explanation') or '', quote=True)
+    return (
+        f'<span style="background-color: {color}; border-bottom: {border}; cursor: help;" title="{explanation}">'
+        f'{_escape(text)}</span>'
+    )
+
+def render_range(full_text, spans, start, end):
+    """
+    Emits full_text[start:end] as HTML, applying the (sorted, non-overlapping) spans
+    that fall inside it. Spans crossing the range edges are clipped.
+    """
+    parts = []
+    cursor = start
+    i = bisect_right([s[1] for s in spans], start)  # First span ending after `start`
+    for span_start, span_end, clause in spans[i:]:
+        if span_start >= end:
+            break
+        span_start, span_end = max(span_start, start), min(span_end, end)
+        parts.append(_escape(full_text[cursor:span_start]))
+        parts.append(_span_html(full_text[span_start:span_end], clause))
+        cursor = span_end
+    parts.append(_escape(full_text[cursor:end]))
+    return "".join(parts)
+
+def render_highlights(full_text, clauses):
+    """
+    Emits the document as HTML with Medium/High clauses wrapped in highlight spans.
+    """
+    risky = [c for c in clauses if c.get('risk_level') in RISK_STYLES]
+    return render_range(full_text, find_clause_spans(full_text, risky), 0, len(full_text))
+
+def _clause_key(clauses):
+    # Only the fields that affect the output, so equal analyses share cache entries
+    return tuple(
+        (c.get('original_text', ''), c.get('risk_level', 'Low'), c.get('explanation', ''))
+        for c in clauses if c.get('risk_level') in RISK_STYLES
+    )
+
+def _clauses_from_key(clause_key):
+    return [{"original_text": o, "risk_level": r, "explanation": e} for o, r, e in clause_key]
+
+@lru_cache(maxsize=16)
+def _render_cached(full_text, clause_key):
+    return render_highlights(full_text, _clauses_from_key(clause_key))
+
+def render_highlights_cached(full_text, clauses):
+    """
+    Memoized render_highlights, keyed on the document and the fields that affect the output.
+    """
+    return _render_cached(full_text, _clause_key(clauses))
+
+# --- Paged viewer ---
+PAGE_CHARS = 4000  # Viewer pages longer than this (or documents without page breaks) are split
+
+@lru_cache(maxsize=16)
+def _spans_cached(full_text, clause_key):
+    return find_clause_spans(full_text, _clauses_from_key(clause_key))
+
+@lru_cache(maxsize=512)
+def _page_cached(full_text, clause_key, start, end):
+    return render_range(full_text, _spans_cached(full_text, clause_key), start, end)
+
+def render_page_cached(full_text, clauses, start, end):
+    """
+    Memoized highlighted HTML for one viewer page. Highlight spans are found once
+    per document, so each page only costs its own slice.
+    """
+    return _page_cached(full_text, _clause_key(clauses), start, end)
+
+@lru_cache(maxsize=16)
+def paginate(full_text, offset_index=None, max_chars=PAGE_CHARS):
+    """
+    Splits the document into viewer pages: a list of (start, end, source_page).
+    Uses the extractor's page boundaries when an OffsetIndex is given; pages over
+    `max_chars` (and text without page breaks) are split at line boundaries.
+    """
+    ranges = []
+    if offset_index is not None:
+        for page in range(1, offset_index.page_count() + 1):
+            span = offset_index.page_span(page)
+            if span:
+                ranges.append((span[0], span[1], page))
+    if not ranges:
+        ranges = [(0, len(full_text), None)]
+
+    pages = []
+    for start, end, page in ranges:
+        while end - start > max_chars:
+            cut = full_text.rfind("\n", start + 1, start + max_chars)
+            cut = cut if cut > start else start + max_chars
+            pages.append((start, cut, page))
+            start = cut
+        pages.append((start, end, page))
+    return pages
+
+def clause_locations(full_text, clauses):
+    """
+    Maps each highlighted clause's original_text to its character offset in the document.
+    """
+    locations = {}
+    for start, _, clause in _spans_cached(full_text, _clause_key(clauses)):
+        locations.setdefault(clause['original_text'], start)
+    return locations
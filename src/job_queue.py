@@ -0,0 +1,148 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id, description=""):
+        self.id = job_id
+        self.description = description
+        self.status = "queued"  # queued -> running -> done / failed / cancelled (running -> cancelling -> cancelled)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self.cancel_event = threading.Event()  # Workers check this between stages
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "description": self.description,
+            "queued_seconds": round((self.started_at or now) - self.created_at, 3),
+            "run_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+            "error": self.error,
+        }
+
+class JobQueue:
+    """
+    Bounded worker pool for long-running analyses.
+    Submissions beyond `max_queue` waiting jobs are rejected with QueueFullError.
+    """
+    def __init__(self, max_workers=2, max_queue=20, keep_finished=500):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+
+    def submit(self, fn, *args, description="", **kwargs):
+        """
+        Queues `fn(job, *args, **kwargs)` and returns the Job immediately.
+        """
+        with self._lock:
+            if self._count("queued") >= self.max_queue:
+                raise QueueFullError(f"Queue is full ({self.max_queue} jobs waiting). Try again later.")
+            job = Job(uuid.uuid4().hex, description)
+            self._jobs[job.id] = job
+            self._prune()
+
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job.status == "cancelled":
+                return None
+            job.status = "running"
+            job.started_at = time.time()
+
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                if job.status == "cancelling":
+                    job.status = "cancelled"
+                else:
+                    job.status = "failed"
+                    job.error = str(e)
+                    self._failed += 1
+                job.finished_at = time.time()
+            raise
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.status == "cancelling":
+                # The worker has exited; only now is its slot free again
+                job.status = "cancelled"
+                return None
+            job.status = "done"
+            job.result = result
+            self._completed += 1
+        return result
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued job outright. A running job is flagged and stays "cancelling"
+        until its worker returns; its result is then discarded.
+        Returns False if the job is unknown, already finished or already cancelling.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished or job.status == "cancelling":
+                return False
+            job.cancel_event.set()
+            if job.status == "running":
+                job.status = "cancelling"
+                return True
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        if job.future is not None:
+            job.future.cancel()
+        return True
+
+    def _count(self, status):
+        return sum(1 for j in self._jobs.values() if j.status == status)
+
+    def _prune(self):
+        # Drop the oldest finished jobs so the registry does not grow without bound
+        finished = [j for j in self._jobs.values() if j.finished]
+        overflow = len(finished) - self.keep_finished
+        if overflow > 0:
+            finished.sort(key=lambda j: j.finished_at or j.created_at)
+            for job in finished[:overflow]:
+                del self._jobs[job.id]
+
+    def stats(self):
+        with self._lock:
+            # A cancelling job still occupies its worker until fn returns
+            running = self._count("running") + self._count("cancelling")
+            return {
+                "queue_length": self._count("queued"),
+                "max_queue": self.max_queue,
+                "running": running,
+                "cancelling": self._count("cancelling"),
+                "workers": self.max_workers,
+                "worker_utilisation": round(running / self.max_workers, 3),
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
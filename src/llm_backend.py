@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+class BackendUnavailableError(Exception):
+    pass
+
+class Endpoint:
+    """
+    One Ollama server with a persistent keep-alive session and a concurrency cap.
+    """
+    def __init__(self, base_url, max_concurrency=2):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.last_latency = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_concurrency, 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def load(self):
+        return self.in_flight / self.max_concurrency
+
+    def to_dict(self):
+        return {
+            "url": self.base_url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.total_requests,
+            "failures": self.total_failures,
+            "last_latency": self.last_latency,
+        }
+
+class BackendPool:
+    """
+    Routes LLM requests across several Ollama endpoints.
+    Each request goes to the least-loaded healthy endpoint with a free slot;
+    failures are retried on another endpoint with exponential backoff.
+    """
+    def __init__(self, urls, max_concurrency_per_endpoint=2, retries=2, backoff=0.5,
+                 health_path="/api/tags", health_interval=30, unhealthy_after=2):
+        if not urls:
+            raise ValueError("BackendPool needs at least one endpoint URL")
+        self.endpoints = [Endpoint(u, max_concurrency_per_endpoint) for u in urls]
+        self.retries = retries
+        self.backoff = backoff
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.unhealthy_after = unhealthy_after
+        self._cond = threading.Condition()
+        self._health_thread = None
+
+    @classmethod
+    def from_env(cls):
+        # OLLAMA_ENDPOINTS=http://box1:11434,http://box2:11434
+        urls = os.getenv("OLLAMA_ENDPOINTS", "http://localhost:11434").split(",")
+        per_endpoint = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+        return cls([u.strip() for u in urls if u.strip()], max_concurrency_per_endpoint=per_endpoint)
+
+    # --- Routing ---
+    def _acquire(self, exclude, timeout):
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                candidates = [e for e in self.endpoints if e.in_flight < e.max_concurrency and e not in exclude]
+                pool = [e for e in candidates if e.healthy]
+                if not pool and not any(e.healthy and e not in exclude for e in self.endpoints):
+                    # Every usable endpoint is marked down: still try one rather than failing outright
+                    pool = candidates
+                if pool:
+                    endpoint = min(pool, key=lambda e: (e.load, e.consecutive_failures))
+                    endpoint.in_flight += 1
+                    return endpoint
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise BackendUnavailableError("No LLM endpoint available")
+                self._cond.wait(remaining)
+
+    def _release(self, endpoint):
+        with self._cond:
+            endpoint.in_flight -= 1
+            self._cond.notify_all()
+
+    def _record(self, endpoint, ok, latency=None):
+        with self._cond:
+            endpoint.total_requests += 1
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.healthy = True
+                endpoint.last_latency = latency
+            else:
+                endpoint.total_failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.unhealthy_after:
+                    endpoint.healthy = False
+
+    @contextmanager
+    def request(self, path, payload, timeout=180, stream=False, wait_timeout=600):
+        """
+        POSTs `payload` to `path` on the best endpoint and yields the response.
+        The endpoint slot is held until the block exits, so streamed bodies count as load.
+        """
+        tried = []
+        last_error = None
+        for attempt in range(self.retries + 1):
+            # Prefer an endpoint we have not tried yet; fall back to any once all were tried
+            exclude = tried if len(tried) < len(self.endpoints) else []
+            endpoint = self._acquire(exclude, wait_timeout)
+            tried.append(endpoint)
+            started = time.time()
+            try:
+                response = endpoint.session.post(endpoint.base_url + path, json=payload, timeout=timeout, stream=stream)
+                if response.status_code >= 500:
+                    response.close()
+                    raise requests.HTTPError(f"{response.status_code} from {endpoint.base_url}")
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                self._release(endpoint)
+                self._record(endpoint, ok=False)
+                last_error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * (2 ** attempt))
+                continue
+            except BaseException:
+                # Anything else (bad payload, KeyboardInterrupt) is not retried, but must not leak the slot
+                self._release(endpoint)
+                raise
+
+            self._record(endpoint, ok=True, latency=round(time.time() - started, 3))
+            try:
+                response.raise_for_status()  # 4xx (e.g. unknown model) is not worth retrying
+                yield response
+            finally:
+                response.close()
+                self._release(endpoint)
+            return
+
+        raise BackendUnavailableError(f"All LLM endpoints failed: {last_error}")
+
+    def broadcast(self, path, payload, timeout=180):
+        """
+        POSTs `payload` to every endpoint directly (no slot accounting), e.g. to load
+        the model everywhere. Returns {url: seconds, or None if it failed}.
+        """
+        results = {}
+
+        def post(endpoint):
+            started = time.time()
+            try:
+                endpoint.session.post(endpoint.base_url + path, json=payload, timeout=timeout).raise_for_status()
+                results[endpoint.base_url] = round(time.time() - started, 3)
+            except requests.RequestException:
+                results[endpoint.base_url] = None
+
+        threads = [threading.Thread(target=post, args=(e,), daemon=True) for e in self.endpoints]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    # --- Health checks ---
+    def check_health(self):
+        for endpoint in self.endpoints:
+            try:
+                ok = endpoint.session.get(endpoint.base_url + self.health_path, timeout=5).ok
+            except requests.RequestException:
+                ok = False
+            with self._cond:
+                endpoint.healthy = ok
+                if ok:
+                    endpoint.consecutive_failures = 0
+                self._cond.notify_all()
+        return self.stats()
+
+    def start_health_checks(self):
+        if self._health_thread is not None:
+            return
+
+        def loop():
+            while True:
+                self.check_health()
+                time.sleep(self.health_interval)
+
+        self._health_thread = threading.Thread(target=loop, name="llm-health", daemon=True)
+        self._health_thread.start()
+
+    def stats(self):
+        with self._cond:
+            return {"endpoints": [e.to_dict() for e in self.endpoints]}
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+def get_default_pool():
+    """
+    Process-wide pool shared by every ContractAnalyzer, so sessions are reused.
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = BackendPool.from_env()
+            _default_pool.start_health_checks()
+        return _default_pool
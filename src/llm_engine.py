@@ -1,96 +1,722 @@
-import json
-import requests
-import re
-
-class ContractAnalyzer:
-    def __init__(self):
-        # Default to local Ollama
-        self.api_url = "http://localhost:11434/api/generate"
-        self.model = "llama3" 
-        print(f"✅ Local AI Engine initialized using {self.model}")
-
-    def _clean_json(self, raw_text):
-        try:
-            return json.loads(raw_text)
-        except:
-            match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group(0))
-                except:
-                    pass
-            return None
-
-    def _get_system_prompt(self):
-        return """
-        You are a Senior Legal Consultant. Analyze the contract and output strict JSON.
-
-        1. CRITICAL FOR PARTIES: 
-           Extract full legal names of all parties. If generic (e.g., "The Employer"), infer them from the signature block or first page.
-        
-        2. CRITICAL FOR "executive_advice":
-           Write a specific, actionable paragraph. Tell the user exactly how to fix the risks found in THIS contract. 
-           - Suggest specific alternatives (e.g., "Change notice period to 30 days").
-           - Quote specific amounts or clauses to change.
-           
-        3. CRITICAL FOR RISKS:
-           Score risks from 0-100 based on Indian Law (ICA 1872).
-
-        Output strict JSON only.
-        """
-
-    def analyze_contract(self, contract_text, language="English"):
-        prompt = f"""
-        {self._get_system_prompt()}
-        
-        Analyze this contract text.
-        Target Language: {language}
-        
-        REQUIRED JSON STRUCTURE:
-        {{
-            "contract_type": "String",
-            "parties": ["Party A", "Party B"], 
-            "risk_score": Integer (0-100),
-            "overall_risk_level": "Low/Medium/High",
-            "summary": "String (Brief overview)",
-            "executive_advice": "String (YOUR STRATEGIC ADVICE PARAGRAPH HERE)",
-            "clauses": [
-                {{ "title": "String", "risk_level": "High/Medium/Low", "explanation": "String", "recommendation": "String", "original_text": "String" }}
-            ],
-            "missing_clauses": ["String"],
-            "compliance_check": {{ "status": "Pass/Fail", "notes": "String" }}
-        }}
-
-        CONTRACT TEXT:
-        {contract_text}
-        """
-
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False,
-            "format": "json",
-            "options": {"temperature": 0.2, "num_ctx": 8192}
-        }
-
-        try:
-            response = requests.post(self.api_url, json=payload, timeout=180)
-            response.raise_for_status()
-            parsed_data = self._clean_json(response.json().get("response", ""))
-            
-            if not parsed_data:
-                return {"error": "Failed to parse JSON", "raw_text": response.json().get("response", "")[:200]}
-                
-            return parsed_data
-
-        except Exception as e:
-            return {"error": f"Local AI Error: {str(e)}"}
-
-    def generate_template(self, contract_type, requirements=""):
-        # This keeps your Template Generator logic working
-        prompt = f"Act as a Legal Expert. Write a {contract_type}. Requirements: {requirements}. Output plain text."
-        payload = {"model": self.model, "prompt": prompt, "stream": False}
-        try:
-            return requests.post(self.api_url, json=payload, timeout=120).json().get("response", "Error")
-        except Exception as e:
-            return str(e)
\ No newline at end of file
+import contextvars
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.chunking import chunk_text, split_sections
+from src.clause_index import reused_result
+from src.stream_parser import IncrementalJSONParser
+from src.scheduler import get_default_scheduler
+from src.single_flight import SingleFlight, cancelled
+from src.context_budget import prepare_contract_text, chars_for_tokens
+from src.version_store import fingerprint, diff_sections, risk_delta, revised_risk_score
+from src.utils import normalize_text
+from src.prescreen import prescreen, needs_llm, rule_based_analysis
+from src.translation import TRANSLATION_SCHEMA, collect_fields, apply_translations, batch_texts
+from src.result_schema import ANALYSIS_SCHEMA, schema_prompt, parse_analysis, validate_clause, RepairingJSONScanner
+from src.metrics import timed, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS, LLM_REQUESTS, PARSE_FAILURES, PARSE_REPAIRS, STARTUP
+
+class ContractAnalyzer:
+    # Bump whenever the analysis prompt / JSON structure changes so cached results are invalidated
+    PROMPT_VERSION = "2"
+    ANALYSIS_MODES = ("full", "tiered", "fast", "revision")
+
+    # Analyses are produced (and cached) in this language; others are translations of it
+    CANONICAL_LANGUAGE = "English"
+
+    # Rough size of one translation request; fields are grouped up to this many characters
+    TRANSLATION_BATCH_CHARS = 3000
+    # Fields kept by the in-process translation memo (used when there is no TranslationCache)
+    TRANSLATION_MEMO_SIZE = 5000
+
+    # A revision that changes more than this share of the text is simply re-analyzed in full
+    REVISION_MAX_CHANGE = 0.6
+
+    # Room kept in the context window for the instructions and the JSON response
+    RESERVED_TOKENS = 3000
+
+    def __init__(self, cache=None, max_concurrency=3, backend=None, versions=None, clause_index=None, translations=None, prewarm=False):
+        # Default to local Ollama (OLLAMA_ENDPOINTS lists every box in the pool), behind the priority scheduler
+        self.backend = backend or get_default_scheduler()
+        self.model = "llama3" 
+        self.num_ctx = 8192
+        # How long Ollama keeps the model loaded after a request (e.g. "30m", "-1" = forever)
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.cache = cache  # Optional AnalysisCache
+        self.versions = versions  # Optional VersionStore for revision mode
+        self.clause_index = clause_index  # Optional ClauseIndex of previously analyzed sections
+        self.translations = translations  # Optional TranslationCache; falls back to an in-process memo
+        self._translation_memo = OrderedDict()  # (text, language) -> translation, least recently used first
+        self._translation_memo_lock = threading.Lock()
+        self._flights = SingleFlight()  # Concurrent identical analyses share one generation
+        self.max_concurrency = max_concurrency  # In-flight Ollama requests for chunked analysis
+        print(f"✅ Local AI Engine initialized using {self.model}")
+        if prewarm:
+            # Load the model in the background so start-up is not held up by it
+            threading.Thread(target=self.warm_up, name="llm-warmup", daemon=True).start()
+
+    def warm_up(self):
+        """
+        Loads the model on every endpoint with an empty prompt, so the first
+        analysis does not pay the load time. Returns the seconds it took, or None on failure.
+        """
+        payload = {"model": self.model, "prompt": "", "stream": False, "keep_alive": self.keep_alive}
+        started = time.perf_counter()
+        try:
+            with timed("model_warmup"):
+                if hasattr(self.backend, "broadcast"):
+                    loaded = self.backend.broadcast("/api/generate", payload, timeout=300)
+                    if not any(seconds is not None for seconds in loaded.values()):
+                        raise RuntimeError("no endpoint answered")
+                else:
+                    with self.backend.request("/api/generate", payload, timeout=300) as response:
+                        response.json()
+        except Exception as e:
+            print(f"⚠️ Model pre-warm failed: {e}")
+            return None
+        seconds = time.perf_counter() - started
+        STARTUP.record("model_warmup", seconds)
+        print(f"🔥 {self.model} loaded in {seconds:.1f}s")
+        return seconds
+
+    def _clean_json(self, raw_text):
+        # Tolerant parse: surrounding prose is ignored, truncated output is cut back and closed,
+        # and the result is validated against the schema
+        return parse_analysis(raw_text)[0]
+
+    @staticmethod
+    def _record_parse(kind, parsed_data, parse_report):
+        repairs = parse_report["repairs"]
+        issues = [i.split(":")[0] for i in parse_report["issues"]]
+        for name in repairs + issues:
+            PARSE_REPAIRS.inc(kind=kind, repair=name)
+        if repairs or issues:
+            parsed_data["parse_report"] = parse_report
+
+    def _get_system_prompt(self):
+        return """
+        You are a Senior Legal Consultant. Analyze the contract and output strict JSON.
+
+        1. CRITICAL FOR PARTIES: 
+           Extract full legal names of all parties. If generic (e.g., "The Employer"), infer them from the signature block or first page.
+        
+        2. CRITICAL FOR "executive_advice":
+           Write a specific, actionable paragraph. Tell the user exactly how to fix the risks found in THIS contract. 
+           - Suggest specific alternatives (e.g., "Change notice period to 30 days").
+           - Quote specific amounts or clauses to change.
+           
+        3. CRITICAL FOR RISKS:
+           Score risks from 0-100 based on Indian Law (ICA 1872).
+
+        Output strict JSON only.
+        """
+
+    def analyze_contract(self, contract_text, language="English", mode="full", cancel_event=None, offset_index=None):
+        """
+        mode="full"   - every section goes to the LLM
+        mode="tiered" - rule pre-screen first; only uncertain or high-risk sections go to the LLM
+        mode="fast"   - rule engine only, no LLM call
+        mode="revision" - diff against the closest stored version; only changed sections go to the LLM
+
+        Analysis always runs in CANONICAL_LANGUAGE; other languages are produced by
+        translate_result, so switching language never re-analyzes the contract.
+
+        Concurrent calls for the same text, mode and model share one analysis.
+        `cancel_event` (e.g. Job.cancel_event) detaches this caller; the shared
+        analysis only stops once every caller waiting on it has cancelled.
+        `offset_index` (from DocumentProcessor.extract_with_index) lets prompt
+        preparation strip page headers and footers.
+        """
+        if mode == "fast":
+            result = self._analyze_canonical(contract_text, mode)
+        else:
+            key = (normalize_text(contract_text), self.CANONICAL_LANGUAGE, self.model, self.PROMPT_VERSION, mode)
+            result = self._flights.run(key, lambda: self._analyze_canonical(contract_text, mode, offset_index), cancel_event)
+            if result is None:
+                return {"error": "Analysis cancelled"}
+        return self.translate_result(result, language)
+
+    def _analyze_canonical(self, contract_text, mode="full", offset_index=None):
+        language = self.CANONICAL_LANGUAGE
+        if mode == "fast":
+            with timed("prescreen"):
+                return rule_based_analysis(contract_text)
+        if mode == "revision":
+            return self._analyze_revision(contract_text, language, offset_index)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(contract_text, language, mode)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        result = self._analyze(contract_text, language, mode, offset_index)
+        self._store(cache_key, contract_text, language, result, learn_clauses=mode == "full")
+        return result
+
+    def single_flight_stats(self):
+        return self._flights.stats()
+
+    @staticmethod
+    def _storable(result):
+        # Incomplete results (a failed chunk, a repaired or defaulted response, an abandoned
+        # analysis) must not outlive this request
+        return (bool(result) and "error" not in result and not result.get("failed_chunks")
+                and not result.get("parse_report") and not cancelled())
+
+    def _store(self, cache_key, contract_text, language, result, parent=None, learn_clauses=True):
+        if not self._storable(result):
+            return
+        if cache_key:
+            self.cache.set(cache_key, result)
+        self._remember(contract_text, language, result, parent=parent, learn_clauses=learn_clauses)
+
+    def _remember(self, contract_text, language, result, parent=None, learn_clauses=True):
+        # Every fresh analysis becomes a version later uploads can be diffed against,
+        # and its model-reviewed sections feed the near-duplicate clause index
+        if self.clause_index is not None and learn_clauses:
+            self.clause_index.add_analysis(contract_text, language, self.model, result)
+        if self.versions is not None:
+            return self.versions.save(contract_text, language, result, parent=parent)
+        return None
+
+    def _analyze_revision(self, contract_text, language, offset_index=None):
+        # Unchanged sections keep their stored clauses; the result carries a "revision" block with the risk delta
+        if self.versions is None:
+            return self._analyze_canonical(contract_text, offset_index=offset_index)
+
+        with timed("version_diff"):
+            previous_id, similarity = self.versions.find_previous(fingerprint(contract_text), language)
+            previous = self.versions.load(previous_id) if previous_id else None
+        if previous is None:
+            return self._analyze_canonical(contract_text, offset_index=offset_index)
+
+        with timed("version_diff"):
+            diff = diff_sections(previous["fingerprint"], contract_text)
+        previous_result = previous["result"]
+        changed_text = "\n".join(diff["changed"])
+        kept_text = "\n".join(diff["unchanged"])
+
+        if not diff["changed"] and not diff["removed"]:
+            result = dict(previous_result)
+        elif len(changed_text) > self.REVISION_MAX_CHANGE * len(contract_text):
+            result = self._analyze(contract_text, language, offset_index=offset_index)
+        else:
+            kept = normalize_text(kept_text).lower()
+            reused = [c for c in previous_result.get("clauses", [])
+                      if normalize_text(c.get("original_text", "")).lower() in kept]
+            result = dict(previous_result, clauses=reused)
+            if diff["changed"]:
+                changed_result = self._analyze(changed_text, language)
+                if "error" in changed_result:
+                    return changed_result
+                result = self._merge_results([result, changed_result], [len(kept_text), len(changed_text)])
+                result.pop("chunks_analyzed", None)
+            # The changed fragment's own score is not comparable with a whole document's,
+            # so the previous score is moved by the risk of the clauses that changed instead
+            score = revised_risk_score(previous_result, result)
+            result["risk_score"] = score
+            result["overall_risk_level"] = "High" if score > 70 else "Medium" if score > 40 else "Low"
+        result.pop("revision", None)
+
+        if "error" not in result:
+            result["revision"] = {
+                "previous_version": previous_id,
+                "similarity": similarity,
+                "sections_unchanged": len(diff["unchanged"]),
+                "sections_changed": len(diff["changed"]),
+                "sections_removed": diff["removed"],
+                "risk_delta": risk_delta(previous_result, result),
+            }
+            self._store(None, contract_text, language, result, parent=previous_id)
+        return result
+
+    def _cache_key(self, contract_text, language, mode="full"):
+        version = self.PROMPT_VERSION if mode == "full" else f"{self.PROMPT_VERSION}:{mode}"
+        return self.cache.make_key(contract_text, language, self.model, version)
+
+    @property
+    def token_budget(self):
+        # Tokens left for contract text once the instructions and response are accounted for
+        return self.num_ctx - self.RESERVED_TOKENS
+
+    def _analyze(self, contract_text, language, mode="full", offset_index=None):
+        # `offset_index` only describes the whole document, so sub-texts (novel or flagged sections) go without it
+        if mode == "tiered":
+            return self._analyze_tiered(contract_text, language)
+        if self.clause_index is not None:
+            return self._analyze_with_reuse(contract_text, language, offset_index=offset_index)
+        return self._analyze_text(contract_text, language, offset_index)
+
+    def _analyze_text(self, contract_text, language, offset_index=None):
+        with timed("prompt_prep"):
+            contract_text, report = prepare_contract_text(contract_text, self.token_budget, offset_index)
+        return self._analyze_prepared(contract_text, language, report)
+
+    def _lookup_sections(self, contract_text, language):
+        # Splits sections into (reused, novel): near-duplicates of indexed sections and the rest
+        reused, novel = [], []
+        with timed("clause_lookup"):
+            for section in split_sections(contract_text):
+                clauses, _ = self.clause_index.lookup(section, language, self.model)
+                if clauses is None:
+                    novel.append(section)
+                else:
+                    reused.append((section, clauses))
+        return reused, novel
+
+    def _analyze_with_reuse(self, contract_text, language, lookup=None, offset_index=None):
+        """
+        Resolves near-duplicate sections from the clause index and sends only
+        the novel sections to the model.
+        """
+        reused, novel = lookup or self._lookup_sections(contract_text, language)
+        if not reused:
+            return self._analyze_text(contract_text, language, offset_index)
+
+        local = reused_result([c for _, clauses in reused for c in clauses])
+        novel_text = "\n".join(novel)
+        if novel_text.strip():
+            llm_result = self._analyze_text(novel_text, language)
+            if "error" in llm_result:
+                return llm_result
+            reused_chars = sum(len(section) for section, _ in reused)
+            result = self._merge_results([llm_result, local], [len(novel_text), reused_chars])
+            result.pop("chunks_analyzed", None)
+            if "context_report" in llm_result:
+                result["context_report"] = llm_result["context_report"]
+        else:
+            result = local
+        result["reused_sections"] = len(reused)
+        result["novel_sections"] = len(novel)
+        return result
+
+    def _analyze_prepared(self, contract_text, language, report):
+        # Contracts that fit the context window go out as a single prompt; larger ones are
+        # split across prompts rather than left for Ollama to truncate
+        if report["fits_single_prompt"]:
+            result = self._run_analysis(contract_text, language)
+        else:
+            result = self.analyze_contract_chunked(contract_text, language)
+        if "error" not in result:
+            result["context_report"] = report
+        return result
+
+    def analyze_contract_chunked(self, contract_text, language="English"):
+        """
+        Map-reduce analysis for contracts larger than the model context.
+        Chunks are split at section boundaries, analyzed with at most
+        `max_concurrency` requests in flight, then merged into one result.
+        """
+        chunks = chunk_text(contract_text, chars_for_tokens(contract_text, self.token_budget))
+        total = len(chunks)
+
+        def run(indexed_chunk):
+            index, chunk = indexed_chunk
+            note = f"This is PART {index + 1} of {total} of a longer contract. Only report clauses found in this part."
+            return self._run_analysis(chunk, language, part_note=note)
+
+        # Each chunk runs in a copy of the caller's context so its stage timings reach the caller's trace
+        contexts = [contextvars.copy_context() for _ in chunks]
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as pool:
+            results = list(pool.map(lambda ctx, item: ctx.run(run, item), contexts, enumerate(chunks)))
+
+        return self._merge_results(results, [len(c) for c in chunks])
+
+    def _analyze_tiered(self, contract_text, language):
+        with timed("prescreen"):
+            segments = prescreen(contract_text)
+            rule_result = rule_based_analysis(contract_text, segments)
+
+        flagged = [s for s in segments if needs_llm(s)]
+        resolved_texts = {s["text"].strip() for s in segments if not needs_llm(s)}
+        rule_result["analysis_mode"] = "tiered"
+        rule_result["llm_segments"] = len(flagged)
+        rule_result["rule_segments"] = len(segments) - len(flagged)
+        if not flagged:
+            return rule_result
+
+        llm_text = "\n".join(s["text"] for s in flagged)
+        llm_result = self._analyze(llm_text, language)
+        if "error" in llm_result:
+            rule_result["llm_error"] = llm_result["error"]
+            return rule_result
+
+        # Confidently classified low-risk sections keep their rule verdicts; the LLM covers the rest
+        local = dict(rule_result, summary="", executive_advice="",
+                     clauses=[c for c in rule_result["clauses"] if c["original_text"] in resolved_texts])
+        merged = self._merge_results([llm_result, local], [len(llm_text), len(contract_text) - len(llm_text)])
+        merged.pop("chunks_analyzed", None)
+        if "context_report" in llm_result:
+            merged["context_report"] = llm_result["context_report"]
+        merged.update(analysis_mode="tiered", llm_segments=len(flagged), rule_segments=len(segments) - len(flagged))
+        return merged
+
+    def _merge_results(self, results, weights):
+        ok = [(r, w) for r, w in zip(results, weights) if "error" not in r]
+        failed = [i for i, r in enumerate(results) if "error" in r]
+        if not ok:
+            return results[0]
+
+        def as_int(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+
+        # Combined score: the riskiest part dominates, the length-weighted mean smooths it
+        scores = [as_int(r.get("risk_score")) for r, _ in ok]
+        total_weight = sum(w for _, w in ok) or 1
+        weighted_mean = sum(s * w for s, (_, w) in zip(scores, ok)) / total_weight
+        risk_score = round(0.6 * max(scores) + 0.4 * weighted_mean)
+
+        clauses, seen = [], set()
+        parties = []
+        for r, _ in ok:
+            for clause in r.get("clauses", []) or []:
+                key = (str(clause.get("title", "")).lower(), str(clause.get("original_text", "")).strip())
+                if key not in seen:
+                    seen.add(key)
+                    clauses.append(clause)
+            for party in r.get("parties", []) or []:
+                if party not in parties:
+                    parties.append(party)
+
+        # A clause is only missing if no part of the contract contains it
+        found_titles = " ".join(str(c.get("title", "")).lower() for c in clauses)
+        missing = []
+        for r, _ in ok:
+            for m in r.get("missing_clauses", []) or []:
+                if m not in missing and str(m).lower() not in found_titles:
+                    missing.append(m)
+
+        def join_unique(values, sep):
+            out = []
+            for v in values:
+                if v and v not in out:
+                    out.append(v)
+            return sep.join(out)
+
+        checks = [r.get("compliance_check") or {} for r, _ in ok]
+
+        levels = [r.get("overall_risk_level") for r, _ in ok]
+        if "High" in levels or risk_score > 70:
+            overall = "High"
+        elif "Medium" in levels or risk_score > 40:
+            overall = "Medium"
+        else:
+            overall = "Low"
+
+        merged = {
+            "contract_type": ok[0][0].get("contract_type", "General"),
+            "parties": parties,
+            "risk_score": risk_score,
+            "overall_risk_level": overall,
+            "summary": join_unique((r.get("summary") for r, _ in ok), " "),
+            "executive_advice": join_unique((r.get("executive_advice") for r, _ in ok), "\n\n"),
+            "clauses": clauses,
+            "missing_clauses": missing,
+            "compliance_check": {
+                "status": "Fail" if any(c.get("status") == "Fail" for c in checks) else "Pass",
+                "notes": join_unique((c.get("notes") for c in checks), " "),
+            },
+            "chunks_analyzed": len(ok),
+        }
+        if failed:
+            merged["failed_chunks"] = failed
+        # Repairs and defaults in any part make the whole result partial
+        reports = [r["parse_report"] for r, _ in ok if r.get("parse_report")]
+        if reports:
+            merged["parse_report"] = {
+                "repairs": list(dict.fromkeys(name for report in reports for name in report["repairs"])),
+                "issues": [issue for report in reports for issue in report["issues"]],
+            }
+        return merged
+
+    def _build_analysis_payload(self, contract_text, language, part_note="", stream=False):
+        prompt = f"""
+        {self._get_system_prompt()}
+        
+        Analyze this contract text.
+        {part_note}
+        Target Language: {language}
+        
+        REQUIRED JSON STRUCTURE:
+        {schema_prompt()}
+
+        CONTRACT TEXT:
+        {contract_text}
+        """
+
+        return {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "prompt": prompt,
+            "stream": stream,
+            "format": ANALYSIS_SCHEMA,  # Ollama structured outputs: decoding is constrained to the schema
+            "options": {"temperature": 0.2, "num_ctx": self.num_ctx}
+        }
+
+    def _run_analysis(self, contract_text, language, part_note=""):
+        if cancelled():
+            # Everyone waiting for this analysis has gone away: skip the remaining model calls
+            return {"error": "Analysis cancelled"}
+        with timed("prompt_build"):
+            payload = self._build_analysis_payload(contract_text, language, part_note)
+        LLM_PROMPT_CHARS.observe(len(payload["prompt"]))
+
+        try:
+            with timed("llm_call"):
+                with self.backend.request("/api/generate", payload, timeout=180) as response:
+                    raw_text = response.json().get("response", "")
+            LLM_RESPONSE_CHARS.observe(len(raw_text))
+
+            with timed("json_parse"):
+                parsed_data, parse_report = parse_analysis(raw_text)
+            
+            if not parsed_data:
+                PARSE_FAILURES.inc(kind="analysis")
+                LLM_REQUESTS.inc(kind="analysis", outcome="parse_error")
+                return {"error": "Failed to parse JSON", "raw_text": raw_text[:200], "parse_report": parse_report}
+                
+            self._record_parse("analysis", parsed_data, parse_report)
+            LLM_REQUESTS.inc(kind="analysis", outcome="ok")
+            return parsed_data
+
+        except Exception as e:
+            LLM_REQUESTS.inc(kind="analysis", outcome="error")
+            return {"error": f"Local AI Error: {str(e)}"}
+
+    def stream_analysis(self, contract_text, language="English", offset_index=None):
+        """
+        Streaming variant of analyze_contract. Yields events as soon as each
+        top-level field, clause or missing clause is complete:
+            {"event": "field", "key": ..., "value": ...}
+            {"event": "item", "field": "clauses" | "missing_clauses", "index": n, "value": ...}
+        and finally {"event": "done", "value": result} or {"event": "error", "value": result}.
+        Progress events are in CANONICAL_LANGUAGE; the final result is translated.
+        """
+        for event in self._stream_canonical(contract_text, self.CANONICAL_LANGUAGE, offset_index):
+            if event["event"] == "done":
+                event = {"event": "done", "value": self.translate_result(event["value"], language)}
+            yield event
+
+    def _stream_canonical(self, contract_text, language, offset_index=None):
+        # Produces stream_analysis's events for the untranslated analysis, caching the final result
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(contract_text, language, self.model, self.PROMPT_VERSION)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield from self._replay_events(cached)
+                return
+
+        # Known sections are resolved from the clause index, which needs the merged (non-streamed) path
+        if self.clause_index is not None:
+            lookup = self._lookup_sections(contract_text, language)
+            if lookup[0]:
+                result = self._analyze_with_reuse(contract_text, language, lookup, offset_index)
+                self._store(cache_key, contract_text, language, result)
+                yield from self._replay_events(result)
+                return
+
+        with timed("prompt_prep"):
+            prompt_text, report = prepare_contract_text(contract_text, self.token_budget, offset_index)
+
+        # Chunked analysis merges at the end, so there is nothing to stream token by token
+        if not report["fits_single_prompt"]:
+            result = self._analyze_prepared(prompt_text, language, report)
+            self._store(cache_key, contract_text, language, result)
+            yield from self._replay_events(result)
+            return
+
+        with timed("prompt_build"):
+            payload = self._build_analysis_payload(prompt_text, language, stream=True)
+        LLM_PROMPT_CHARS.observe(len(payload["prompt"]))
+        parser = IncrementalJSONParser()
+        scanner = RepairingJSONScanner()
+        raw_parts = []
+        try:
+            # Includes time the consumer spends rendering between events
+            with timed("llm_stream"):
+                with self.backend.request("/api/generate", payload, timeout=180, stream=True) as response:
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        fragment = chunk.get("response", "")
+                        raw_parts.append(fragment)
+                        scanner.feed(fragment)
+                        for event in parser.feed(fragment):
+                            # Clauses are validated one by one; a bad one is skipped, not fatal
+                            if event["event"] == "item" and event["field"] == "clauses":
+                                event["value"] = validate_clause(event["value"])
+                                if event["value"] is None:
+                                    continue
+                            yield event
+                        if chunk.get("done"):
+                            break
+        except Exception as e:
+            LLM_REQUESTS.inc(kind="analysis_stream", outcome="error")
+            yield {"event": "error", "value": {"error": f"Local AI Error: {str(e)}"}}
+            return
+
+        raw_text = "".join(raw_parts)
+        LLM_RESPONSE_CHARS.observe(len(raw_text))
+        with timed("json_parse"):
+            parsed_data, parse_report = parse_analysis(raw_text, scanner)
+        if not parsed_data:
+            PARSE_FAILURES.inc(kind="analysis_stream")
+            LLM_REQUESTS.inc(kind="analysis_stream", outcome="parse_error")
+            yield {"event": "error", "value": {"error": "Failed to parse JSON", "raw_text": raw_text[:200], "parse_report": parse_report}}
+            return
+        self._record_parse("analysis_stream", parsed_data, parse_report)
+        LLM_REQUESTS.inc(kind="analysis_stream", outcome="ok")
+        parsed_data["context_report"] = report
+
+        self._store(cache_key, contract_text, language, parsed_data)
+        yield {"event": "done", "value": parsed_data}
+
+    @staticmethod
+    def _replay_events(result):
+        # Same event sequence as a live stream, for results that are already complete
+        if "error" in result:
+            yield {"event": "error", "value": result}
+            return
+        for key, value in result.items():
+            if key in ("clauses", "missing_clauses") and isinstance(value, list):
+                for index, item in enumerate(value):
+                    yield {"event": "item", "field": key, "index": index, "value": item}
+            yield {"event": "field", "key": key, "value": value}
+        yield {"event": "done", "value": result}
+
+    def stream_text(self, prompt, kind="template"):
+        """
+        Streams a plain-text generation (e.g. a template). Errors are raised
+        so callers can tell a failed generation from generated text.
+        """
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        try:
+            with timed(f"{kind}_llm_call"):
+                with self.backend.request("/api/generate", payload, timeout=120, stream=True) as response:
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        yield chunk.get("response", "")
+                        if chunk.get("done"):
+                            break
+        except Exception:
+            LLM_REQUESTS.inc(kind=kind, outcome="error")
+            raise
+        LLM_REQUESTS.inc(kind=kind, outcome="ok")
+
+    # --- Translation ---
+    def translate_result(self, result, language):
+        """
+        Returns `result` with its user-facing text in `language`. Fields are translated
+        in small batched LLM calls and cached per field, so a language switch re-uses
+        the canonical analysis and only pays for text it has not seen before.
+        A batch that fails or comes back malformed stays in CANONICAL_LANGUAGE.
+        """
+        if not result or "error" in result or not language:
+            return result
+        language = " ".join(language.split()).title()  # "english", "HINDI " -> "English", "Hindi"
+        if language == self.CANONICAL_LANGUAGE:
+            return result
+
+        result = copy.deepcopy(result)
+        result["language"] = language
+        fields = collect_fields(result)
+        texts = list(dict.fromkeys(text for _, text in fields))
+        if not texts:
+            return result
+
+        with timed("translation_cache"):
+            if self.translations is not None:
+                known = self.translations.get_many(texts, language, self.model)
+            else:
+                known = self._memo_get(texts, language)
+        missing = [t for t in texts if t not in known]
+
+        if missing:
+            batches = list(batch_texts(missing, self.TRANSLATION_BATCH_CHARS))
+
+            def run(batch, ctx):
+                return ctx.run(self._translate_batch, batch, language)
+
+            workers = max(1, min(self.max_concurrency, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run, batch, contextvars.copy_context()) for batch in batches]
+                fresh = {}
+                for future in futures:
+                    fresh.update(future.result())
+            if self.translations is not None:
+                self.translations.set_many(fresh, language, self.model)
+            else:
+                self._memo_set(fresh, language)
+            known.update(fresh)
+            if len(fresh) < len(missing):
+                result["translation_incomplete"] = len(missing) - len(fresh)
+
+        return apply_translations(result, {path: known[text] for path, text in fields if text in known})
+
+    def _memo_get(self, texts, language):
+        with self._translation_memo_lock:
+            known = {}
+            for text in texts:
+                if (text, language) in self._translation_memo:
+                    self._translation_memo.move_to_end((text, language))
+                    known[text] = self._translation_memo[(text, language)]
+            return known
+
+    def _memo_set(self, pairs, language):
+        with self._translation_memo_lock:
+            for text, translation in pairs.items():
+                self._translation_memo[(text, language)] = translation
+                self._translation_memo.move_to_end((text, language))
+            while len(self._translation_memo) > self.TRANSLATION_MEMO_SIZE:
+                self._translation_memo.popitem(last=False)
+
+    def _translate_batch(self, texts, language):
+        # One request per batch; the model returns the inputs translated, in order
+        prompt = f"""Translate each string in the JSON array below into {language}.
+Keep legal meaning, numbers, party names and section references unchanged.
+Return {{"translations": [...]}} with exactly {len(texts)} strings in the same order.
+
+{json.dumps(texts, ensure_ascii=False)}"""
+        payload = {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "prompt": prompt,
+            "stream": False,
+            "format": TRANSLATION_SCHEMA,
+            "options": {"temperature": 0.1, "num_ctx": self.num_ctx},
+        }
+        LLM_PROMPT_CHARS.observe(len(prompt))
+        try:
+            with timed("translate_llm_call"):
+                with self.backend.request("/api/generate", payload, timeout=120) as response:
+                    raw_text = response.json().get("response", "")
+            LLM_RESPONSE_CHARS.observe(len(raw_text))
+        except Exception:
+            LLM_REQUESTS.inc(kind="translation", outcome="error")
+            return {}
+
+        scanner = RepairingJSONScanner()
+        scanner.feed(raw_text)
+        data, _ = scanner.result()
+        translated = (data or {}).get("translations")
+        if (not isinstance(translated, list) or len(translated) != len(texts)
+                or not all(isinstance(t, str) and t.strip() for t in translated)):
+            # Can't tell which output belongs to which input: keep this batch untranslated
+            PARSE_FAILURES.inc(kind="translation")
+            LLM_REQUESTS.inc(kind="translation", outcome="parse_error")
+            return {}
+        LLM_REQUESTS.inc(kind="translation", outcome="ok")
+        return dict(zip(texts, translated))
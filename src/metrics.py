@@ -0,0 +1,166 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(dict(key))} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = dict(key)
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_labels(labels)} {series[-1]}")
+        return lines
+
+# --- Process-wide metrics ---
+STAGE_SECONDS = Histogram("contract_stage_seconds", "Time spent per pipeline stage.", DURATION_BUCKETS)
+LLM_PROMPT_CHARS = Histogram("contract_llm_prompt_chars", "Size of prompts sent to the LLM.", SIZE_BUCKETS)
+LLM_RESPONSE_CHARS = Histogram("contract_llm_response_chars", "Size of LLM responses.", SIZE_BUCKETS)
+LLM_REQUESTS = Counter("contract_llm_requests_total", "LLM requests by kind and outcome.")
+PARSE_FAILURES = Counter("contract_llm_parse_failures_total", "LLM responses that could not be parsed as JSON.")
+CACHE_LOOKUPS = Counter("contract_analysis_cache_total", "Analysis cache lookups by result.")
+OCR_PAGES = Counter("contract_ocr_pages_total", "Image-only PDF pages by OCR outcome (ocr, cache_hit, unavailable, timeout, error).")
+LLM_QUEUE_SECONDS = Histogram("contract_llm_queue_seconds", "Time LLM calls waited in the scheduler queue, by priority.", DURATION_BUCKETS)
+LLM_GENERATION_SECONDS = Histogram("contract_llm_generation_seconds", "Time LLM calls held a scheduler slot (generation incl. streaming), by priority.", DURATION_BUCKETS)
+LLM_ADMISSION = Counter("contract_llm_admission_total", "LLM calls admitted to or rejected by the scheduler, by priority.")
+PARSE_REPAIRS = Counter("contract_llm_parse_repairs_total", "LLM responses salvaged by repair, and clauses dropped or fields defaulted by validation.")
+
+REGISTRY = [STAGE_SECONDS, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS, LLM_REQUESTS, PARSE_FAILURES, PARSE_REPAIRS, CACHE_LOOKUPS, OCR_PAGES,
+            LLM_QUEUE_SECONDS, LLM_GENERATION_SECONDS, LLM_ADMISSION]
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Start-up report ---
+class StartupReport:
+    """
+    Where process start-up time goes. Each named step is recorded once (the first
+    time), so Streamlit reruns do not overwrite the cold-start numbers.
+    """
+    def __init__(self):
+        self.steps = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.steps.setdefault(name, round(seconds, 4))
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self._lock:
+            return {"steps": dict(self.steps), "total_seconds": round(sum(self.steps.values()), 4)}
+
+    def render(self):
+        report = self.as_dict()
+        steps = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in report["steps"].items())
+        return f"⏱️ Startup {report['total_seconds']:.2f}s: {steps}"
+
+STARTUP = StartupReport()
+
+# --- Per-request stage breakdown ---
+class StageTrace:
+    """
+    Collects stage durations for one analysis (summed when a stage repeats,
+    e.g. one LLM call per chunk).
+    """
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {stage: round(seconds, 4) for stage, seconds in self.stages.items()}
+
+_current_trace = contextvars.ContextVar("stage_trace", default=None)
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def stage_trace():
+    """
+    Starts collecting a per-stage breakdown for everything timed inside the block.
+    """
+    trace = StageTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def timed(stage):
+    """
+    Times a pipeline stage into the stage histogram and the active StageTrace, if any.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, elapsed)
@@ -0,0 +1,207 @@
+import hashlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import threading
+
+from src.metrics import timed, OCR_PAGES
+
+# Pages with less extracted text than this are treated as scans
+MIN_TEXT_CHARS = 25
+
+def has_images(page):
+    """
+    True if the page draws at least one image XObject (directly or in a form).
+    """
+    try:
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources else None
+        if not xobjects:
+            return False
+        for ref in xobjects.get_object().values():
+            xobject = ref.get_object()
+            if xobject.get("/Subtype") == "/Image":
+                return True
+            if xobject.get("/Subtype") == "/Form" and has_images(xobject):
+                return True
+    except Exception:
+        return True  # Malformed resources: let OCR decide
+    return False
+
+def needs_ocr(page, extracted_text):
+    return len((extracted_text or "").strip()) < MIN_TEXT_CHARS and has_images(page)
+
+def page_hash(page):
+    """
+    Hash of a page's content stream and image data; identical pages in
+    different files (re-uploads, revisions) share it.
+    """
+    # Images are hashed as serialized (dictionary with /Filter, then the encoded stream):
+    # no need to decompress them, and some FlateDecode images cannot be decoded by get_data()
+    digest = hashlib.sha256()
+    try:
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+        xobjects = (page["/Resources"].get_object().get("/XObject") or {}).get_object()
+        for name in sorted(xobjects):
+            serialized = io.BytesIO()
+            xobjects[name].get_object().write_to_stream(serialized, None)
+            digest.update(name.encode("utf-8"))
+            digest.update(serialized.getvalue())
+    except Exception:
+        return None
+    return digest.hexdigest()
+
+# --- Process-pool workers (module level so they can be pickled) ---
+_worker_pdf = None
+
+def _init_ocr_worker(pdf_bytes):
+    global _worker_pdf
+    _worker_pdf = pdf_bytes
+
+def _ocr_page(index, dpi, lang):
+    return _recognize_page(_worker_pdf, index, dpi, lang)
+
+def _recognize_page(pdf_bytes, index, dpi, lang):
+    import pytesseract
+    from pdf2image import convert_from_bytes
+
+    # Rasterize just this page, then OCR it
+    images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=index + 1, last_page=index + 1)
+    return "\n".join(pytesseract.image_to_string(image, lang=lang) for image in images)
+
+class PageOCR:
+    """
+    OCR fallback for image-only PDF pages, run on a process pool.
+    Results are cached on disk by page content hash, OCR language and resolution.
+    """
+    def __init__(self, cache_dir="data/cache/ocr", lang="eng", dpi=300, workers=None, page_timeout=120):
+        self.cache_dir = cache_dir
+        self.lang = lang
+        self.dpi = dpi
+        self.workers = workers
+        self.page_timeout = page_timeout
+        self._available = None
+        self._lock = threading.Lock()
+
+        # Ensure directory exists
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    @classmethod
+    def from_env(cls):
+        return cls(lang=os.environ.get("OCR_LANG", "eng"),
+                   dpi=int(os.environ.get("OCR_DPI", "300")),
+                   workers=int(os.environ["OCR_WORKERS"]) if os.environ.get("OCR_WORKERS") else None)
+
+    @property
+    def available(self):
+        # Optional: a local Tesseract install (pytesseract) and Poppler (pdf2image) enable OCR.
+        # Only looked up here; the packages are imported by the process that runs the OCR
+        if self._available is None:
+            self._available = all(importlib.util.find_spec(name) is not None for name in ("pytesseract", "pdf2image"))
+        return self._available
+
+    # --- Cache ---
+    def _path(self, content_hash):
+        key = hashlib.sha256(f"{content_hash}\x1f{self.lang}\x1f{self.dpi}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _get(self, content_hash):
+        if content_hash is None:
+            return None
+        try:
+            with open(self._path(content_hash), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _set(self, content_hash, text):
+        if content_hash is None or not text.strip():
+            return
+        path = self._path(content_hash)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to write OCR cache: {e}")
+
+    # --- OCR ---
+    def recognize(self, pdf_bytes, pages, indices, workers=None):
+        """
+        Yields (index, text) for each page index in `indices`, in order.
+        Cached pages come back immediately; the rest are OCR'd in parallel.
+        `workers` is the caller's process budget (overrides self.workers); with 1,
+        pages are OCR'd serially in this process, e.g. inside a batch extraction worker.
+        Pages that fail or time out yield "".
+        """
+        hashes = {i: page_hash(pages[i]) for i in indices}
+        cached = {i: self._get(hashes[i]) for i in indices}
+        todo = [i for i in indices if cached[i] is None]
+        for i in indices:
+            if cached[i] is not None:
+                OCR_PAGES.inc(result="cache_hit")
+
+        if not todo or not self.available:
+            for i in todo:
+                OCR_PAGES.inc(result="unavailable")
+            for i in indices:
+                yield i, cached[i] or ""
+            return
+
+        pool = None
+        if workers == 1:
+            def result(i):
+                return _recognize_page(pdf_bytes, i, self.dpi, self.lang)
+        else:
+            workers = max(1, min(workers or self.workers or os.cpu_count() or 1, len(todo)))
+            # Spawned, not forked: forking a process with live threads can deadlock the child
+            pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_ocr_worker, initargs=(pdf_bytes,))
+            pending = {i: pool.apply_async(_ocr_page, (i, self.dpi, self.lang)) for i in todo}
+
+            def result(i):
+                return pending[i].get(timeout=self.page_timeout)
+        try:
+            for i in indices:
+                if cached[i] is not None:
+                    yield i, cached[i]
+                    continue
+                try:
+                    with timed("ocr"):
+                        text = result(i)
+                except multiprocessing.TimeoutError:
+                    print(f"OCR timed out on page {i + 1}")
+                    OCR_PAGES.inc(result="timeout")
+                    yield i, ""
+                    continue
+                except Exception as e:
+                    print(f"OCR failed on page {i + 1}: {e}")
+                    OCR_PAGES.inc(result="error")
+                    yield i, ""
+                    continue
+                OCR_PAGES.inc(result="ocr")
+                with self._lock:
+                    self._set(hashes[i], text)
+                yield i, text
+        finally:
+            # terminate() also kills a worker stuck on a pathological page
+            if pool is not None:
+                pool.terminate()
+
+_default_ocr = None
+_default_lock = threading.Lock()
+
+def get_default_ocr():
+    """
+    Process-wide OCR engine shared by every extraction, configured from
+    OCR_LANG / OCR_DPI / OCR_WORKERS.
+    """
+    global _default_ocr
+    with _default_lock:
+        if _default_ocr is None:
+            _default_ocr = PageOCR.from_env()
+        return _default_ocr
@@ -0,0 +1,27 @@
+from fpdf import FPDF
+
+# Imported by report_generator on first render, so fpdf stays off the startup path
+
+class PDFReport(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 12)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 10, 'ContractSentinel AI - Professional Audit Report', 0, 1, 'C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()} | Generated by ContractSentinel', 0, 0, 'C')
+
+    def chapter_title(self, title):
+        self.set_font('Arial', 'B', 14)
+        self.set_fill_color(240, 240, 240)
+        self.set_text_color(0, 0, 0)
+        self.cell(0, 10, title, 0, 1, 'L', 1)
+        self.ln(4)
+
+    def chapter_body(self, body):
+        self.set_font('Arial', '', 11)
+        self.multi_cell(0, 6, body)
+        self.ln()
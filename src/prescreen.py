@@ -0,0 +1,200 @@
+import re
+
+from src.chunking import split_sections
+
+# --- Clause-type keyword index ---
+# Each type: display title, keyword patterns used for classification, and risk rules
+# (pattern, risk level, reason, recommendation) tuned to the Indian Contract Act, 1872.
+CLAUSE_RULES = {
+    "termination": {
+        "title": "Termination",
+        "keywords": [r"\bterminat\w*", r"\bexpiry\b", r"\bcancel\w*"],
+        "risks": [
+            (r"terminat\w*[^.]{0,100}\b(at any time|without (?:prior )?(?:notice|cause|reason)|(?:its )?sole discretion|forthwith)",
+             "High", "One-sided termination without notice or cause.",
+             "Make termination mutual and require at least 30 days written notice."),
+        ],
+    },
+    "indemnity": {
+        "title": "Indemnity",
+        "keywords": [r"\bindemnif\w*", r"\bhold harmless\b", r"\bindemnit\w*"],
+        "risks": [
+            (r"\b(any and all|all) (losses|claims|damages|liabilities)|\bwithout (?:any )?limit\w*|\bunlimited\b|\bhowsoever aris\w*",
+             "High", "Uncapped indemnity obligation.",
+             "Cap the indemnity at the fees paid in the preceding 12 months and make it mutual."),
+        ],
+    },
+    "limitation_of_liability": {
+        "title": "Limitation of Liability",
+        "keywords": [r"\blimitation of liability\b", r"\bliabilit\w*[^.]{0,40}\b(exceed|limited to|capped)", r"\bin no event shall\b",
+                     r"\b(shall|will) not be liable\b"],
+        "risks": [
+            (r"\bunlimited liability\b|\bliabilit\w*[^.]{0,60}\bunlimited\b",
+             "High", "Unlimited liability exposure.",
+             "Introduce an aggregate liability cap linked to the contract value."),
+            (r"\b(shall|will) not be liable (?:for|in respect of) any\b",
+             "Medium", "Broad exclusion of liability for one party.",
+             "Carve out fraud, gross negligence and wilful misconduct from the exclusion."),
+            (r"\b(exceed|limited to)[^.]{0,60}\b(one|1|two|2|three|3)\s*\(?\w*\)?\s*months?\b",
+             "Medium", "Liability cap is very low.",
+             "Raise the cap to at least 12 months of fees."),
+        ],
+    },
+    "jurisdiction": {
+        "title": "Jurisdiction & Governing Law",
+        "keywords": [r"\bgoverned by\b", r"\bjurisdiction\b", r"\bcourts? (?:of|at|in)\b", r"\bgoverning law\b", r"\barbitrat\w*"],
+        "risks": [
+            (r"\blaws? of (?:the )?(?:state of )?(new york|england|england and wales|singapore|delaware|california|hong kong|united states|united kingdom)\b",
+             "Medium", "Foreign governing law for an Indian contract.",
+             "Choose Indian law and courts (or seat arbitration in India)."),
+            (r"\b(shall not|cannot|waives? (?:the|its|any) right to)\s+(?:\w+\s+){0,3}(sue|file|institute|initiate|approach)\b[^.]{0,60}\b(courts?|suit|legal proceedings?)",
+             "High", "Restraint of legal proceedings (void under ICA Section 28).",
+             "Remove the restriction on approaching courts; limit it to an arbitration clause."),
+        ],
+    },
+    "non_compete": {
+        "title": "Non-Compete",
+        "keywords": [r"\bnon-?compet\w*", r"\bshall not (?:directly or indirectly )?(?:engage|compete|carry on)\b", r"\brestraint\b",
+                     r"\bcompeting business\b"],
+        "risks": [
+            (r"\b(after|following|post|upon|subsequent to) (?:the )?(termination|expiry|cessation|end)\b",
+             "High", "Post-termination restraint of trade (void under ICA Section 27).",
+             "Limit the restriction to the term of the agreement plus non-solicitation of clients."),
+            (r"\banywhere in (?:the world|india)\b|\bworldwide\b",
+             "Medium", "Excessive geographic scope of restraint.",
+             "Restrict the scope to the specific territory where the business operates."),
+        ],
+    },
+    "notice_period": {
+        "title": "Notice Period",
+        "keywords": [r"\bnotice period\b", r"\b\d+\s*(?:\(\w+\)\s*)?days?'?\s*(?:prior\s+)?(?:written\s+)?notice\b", r"\bnotices?\b"],
+        "risks": [],  # Short notice periods are checked numerically below
+    },
+}
+
+STANDARD_CLAUSES = ["termination", "jurisdiction", "limitation_of_liability", "notice_period"]
+NOTICE_DAYS_PATTERN = re.compile(r"\b(\d+)\s*(?:\(\w+\)\s*)?days?'?\s*(?:prior\s+)?(?:written\s+)?notice\b", re.IGNORECASE)
+MIN_NOTICE_DAYS = 30
+
+CONTRACT_TYPES = [
+    ("Non-Disclosure Agreement", r"\bnon-?disclosure\b|\bconfidentiality agreement\b"),
+    ("Employment Agreement", r"\bemploy(?:ment|ee|er)\b"),
+    ("Lease Deed", r"\blease\b|\blessor\b|\blessee\b|\brent\b"),
+    ("Service Agreement", r"\bservices?\b"),
+]
+
+CONFIDENCE_THRESHOLD = 0.6
+
+_COMPILED = {
+    clause_type: {
+        "keywords": [re.compile(p, re.IGNORECASE) for p in rule["keywords"]],
+        "risks": [(re.compile(p, re.IGNORECASE), level, reason, fix) for p, level, reason, fix in rule["risks"]],
+    }
+    for clause_type, rule in CLAUSE_RULES.items()
+}
+
+def classify_segment(segment):
+    """
+    Returns (clause_type, confidence) for a segment, or (None, 0.0) if nothing matches.
+    Confidence grows with distinct keyword hits and a hit in the heading line.
+    """
+    heading = segment.split("\n", 1)[0]
+    best, best_score = None, 0.0
+    for clause_type, compiled in _COMPILED.items():
+        hits = sum(1 for k in compiled["keywords"] if k.search(segment))
+        if not hits:
+            continue
+        in_heading = any(k.search(heading) for k in compiled["keywords"])
+        score = min(1.0, 0.35 * hits + (0.35 if in_heading else 0.0))
+        if score > best_score:
+            best, best_score = clause_type, score
+    return best, round(best_score, 2)
+
+def assess_segment(segment, clause_type):
+    """
+    Returns a list of (risk level, reason, recommendation) found in a classified segment.
+    """
+    findings = []
+    for pattern, level, reason, fix in _COMPILED[clause_type]["risks"]:
+        if pattern.search(segment):
+            findings.append((level, reason, fix))
+
+    if clause_type in ("notice_period", "termination"):
+        days = [int(d) for d in NOTICE_DAYS_PATTERN.findall(segment)]
+        if days and min(days) < MIN_NOTICE_DAYS:
+            findings.append(("Medium", f"Short notice period ({min(days)} days).",
+                             f"Extend the notice period to at least {MIN_NOTICE_DAYS} days."))
+    return findings
+
+def prescreen(contract_text):
+    """
+    Segments the contract at section boundaries and classifies each segment.
+    Returns a list of dicts with clause_type, confidence, risk_level, findings and text.
+    """
+    results = []
+    for section in split_sections(contract_text):
+        clause_type, confidence = classify_segment(section)
+        findings = assess_segment(section, clause_type) if clause_type else []
+        levels = [f[0] for f in findings]
+        risk_level = "High" if "High" in levels else "Medium" if "Medium" in levels else "Low"
+        results.append({
+            "clause_type": clause_type,
+            "confidence": confidence,
+            "risk_level": risk_level,
+            "findings": findings,
+            "text": section,
+        })
+    return results
+
+def needs_llm(segment):
+    # Only uncertain or risky segments are worth model time
+    return segment["confidence"] < CONFIDENCE_THRESHOLD or segment["risk_level"] == "High"
+
+def rule_based_analysis(contract_text, segments=None):
+    """
+    Fast mode: a complete analysis result (same shape as ContractAnalyzer output)
+    built from the rule engine alone, in milliseconds.
+    """
+    segments = segments if segments is not None else prescreen(contract_text)
+
+    clauses, found_types = [], set()
+    high = medium = 0
+    for seg in segments:
+        if not seg["clause_type"]:
+            continue
+        found_types.add(seg["clause_type"])
+        if not seg["findings"] and seg["confidence"] < CONFIDENCE_THRESHOLD:
+            continue
+        high += sum(1 for f in seg["findings"] if f[0] == "High")
+        medium += sum(1 for f in seg["findings"] if f[0] == "Medium")
+        clauses.append({
+            "title": CLAUSE_RULES[seg["clause_type"]]["title"],
+            "risk_level": seg["risk_level"],
+            "explanation": " ".join(f[1] for f in seg["findings"]) or "Standard wording; no rule-based risk found.",
+            "recommendation": " ".join(f[2] for f in seg["findings"]) or "No change required.",
+            "original_text": seg["text"].strip(),
+        })
+
+    missing = [CLAUSE_RULES[t]["title"] for t in STANDARD_CLAUSES if t not in found_types]
+    risk_score = min(100, 10 + 25 * high + 12 * medium + 8 * len(missing))
+    overall = "High" if risk_score > 70 else "Medium" if risk_score > 40 else "Low"
+
+    void_findings = list(dict.fromkeys(f[1] for seg in segments for f in seg["findings"] if "ICA Section" in f[1]))
+    contract_type = next((name for name, p in CONTRACT_TYPES if re.search(p, contract_text[:3000], re.IGNORECASE)), "General")
+    fixes = [c["recommendation"] for c in clauses if c["risk_level"] in ("High", "Medium")]
+
+    return {
+        "contract_type": contract_type,
+        "parties": [],
+        "risk_score": risk_score,
+        "overall_risk_level": overall,
+        "summary": f"Rule-based pre-screen: {high} high and {medium} medium risk findings across {len(clauses)} classified clauses.",
+        "executive_advice": " ".join(fixes) or "No rule-based risks found. Run a full AI review for a detailed opinion.",
+        "clauses": clauses,
+        "missing_clauses": missing,
+        "compliance_check": {
+            "status": "Fail" if void_findings else "Pass",
+            "notes": " ".join(void_findings) or "No clauses void under ICA Sections 27/28 detected by rules.",
+        },
+        "analysis_mode": "fast",
+    }
@@ -1,101 +1,159 @@
-from fpdf import FPDF
-
-class PDFReport(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.set_text_color(100, 100, 100)
-        self.cell(0, 10, 'ContractSentinel AI - Professional Audit Report', 0, 1, 'C')
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Page {self.page_no()} | Generated by ContractSentinel', 0, 0, 'C')
-
-    def chapter_title(self, title):
-        self.set_font('Arial', 'B', 14)
-        self.set_fill_color(240, 240, 240)
-        self.set_text_color(0, 0, 0)
-        self.cell(0, 10, title, 0, 1, 'L', 1)
-        self.ln(4)
-
-    def chapter_body(self, body):
-        self.set_font('Arial', '', 11)
-        self.multi_cell(0, 6, body)
-        self.ln()
-
-def generate_pdf_report(analysis_json, filename):
-    try:
-        pdf = PDFReport()
-        pdf.add_page()
-        
-        # --- 1. TITLE PAGE ---
-        pdf.set_font("Arial", "B", 20)
-        pdf.set_text_color(30, 58, 138)
-        pdf.cell(0, 15, f"Contract Risk Assessment", ln=True, align='C')
-        
-        pdf.set_font("Arial", "", 12)
-        pdf.set_text_color(0, 0, 0)
-        pdf.cell(0, 10, f"Filename: {filename}", ln=True, align='C')
-        
-        score = analysis_json.get('risk_score', 0)
-        risk_level = analysis_json.get('overall_risk_level', 'Unknown')
-        
-        pdf.ln(5)
-        pdf.set_font("Arial", "B", 16)
-        if score > 70: pdf.set_text_color(220, 53, 69)
-        elif score > 40: pdf.set_text_color(255, 193, 7)
-        else: pdf.set_text_color(40, 167, 69)
-            
-        pdf.cell(0, 10, f"Risk Score: {score}/100 ({risk_level})", ln=True, align='C')
-        pdf.set_text_color(0, 0, 0)
-        pdf.ln(10)
-
-        # --- 2. EXECUTIVE SUMMARY ---
-        pdf.chapter_title("1. Executive Summary")
-        pdf.chapter_body(analysis_json.get('summary', 'No summary provided.'))
-
-        # --- 3. STRATEGIC ADVICE (New Section) ---
-        pdf.chapter_title("2. Strategic Advice & Alternatives")
-        advice = analysis_json.get('executive_advice', 'No specific advice generated.')
-        pdf.set_font("Arial", "I", 11)
-        pdf.multi_cell(0, 6, advice)
-        pdf.ln(5)
-        
-        # --- 4. REDLINED RISK AREAS ---
-        pdf.chapter_title("3. Redlined Risk Areas")
-        clauses = analysis_json.get('clauses', [])
-        high_risk = [c for c in clauses if c.get('risk_level') in ['High', 'Medium']]
-        
-        if not high_risk:
-            pdf.cell(0, 10, "No critical risks found.", ln=True)
-        
-        for clause in high_risk:
-            risk = clause.get('risk_level', 'Low')
-            if risk == 'High':
-                pdf.set_fill_color(255, 235, 238)
-            else:
-                pdf.set_fill_color(255, 243, 224)
-                
-            pdf.set_font("Arial", "B", 11)
-            pdf.cell(0, 8, f" {clause.get('title')} ({risk})", ln=True, fill=False)
-            
-            pdf.set_font("Courier", "", 10)
-            pdf.multi_cell(0, 6, f"\"{clause.get('original_text', '')}\"", border=1, fill=True)
-            pdf.ln(2)
-            
-            pdf.set_font("Arial", "I", 10)
-            pdf.multi_cell(0, 6, f"Fix: {clause.get('recommendation')}")
-            pdf.ln(5)
-
-        # --- CRITICAL: RETURN BYTES ---
-        # This handles different FPDF versions safely
-        try:
-            return pdf.output(dest='S').encode('latin-1')
-        except:
-            return pdf.output()
-
-    except Exception as e:
-        # If PDF generation fails, return a basic error PDF byte string to prevent app crash
-        print(f"PDF Error: {e}")
+import hashlib
+import itertools
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+
+from src.utils import locate_clause_page
+from src.metrics import timed
+
+# Rendered reports kept in memory, keyed by report_key(); a report is a few KB to a few hundred KB
+REPORT_CACHE_SIZE = 32
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def generate_pdf_report(analysis_json, filename, full_text=None, offset_index=None):
+    """
+    Renders the audit report. When the extracted text and its OffsetIndex are
+    given, each redlined clause is labelled with the page it was found on.
+    """
+    with timed("pdf_render"):
+        return _render_pdf_report(analysis_json, filename, full_text, offset_index)
+
+def report_key(analysis_json, filename, full_text=None):
+    """
+    Hash of everything that affects the rendered PDF.
+    """
+    digest = hashlib.sha256(json.dumps(analysis_json, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(b"\x1f" + filename.encode("utf-8"))
+    if full_text:
+        digest.update(b"\x1f" + full_text.encode("utf-8"))
+    return digest.hexdigest()
+
+def get_pdf_report(analysis_json, filename, full_text=None, offset_index=None):
+    """
+    Memoized generate_pdf_report: the same analysis is only rendered once per process.
+    Failed renders are not cached.
+    """
+    key = report_key(analysis_json, filename, full_text)
+    with _report_cache_lock:
+        if key in _report_cache:
+            _report_cache.move_to_end(key)
+            return _report_cache[key]
+
+    pdf_bytes = generate_pdf_report(analysis_json, filename, full_text, offset_index)
+    if is_pdf(pdf_bytes):
+        with _report_cache_lock:
+            _report_cache[key] = pdf_bytes
+            while len(_report_cache) > REPORT_CACHE_SIZE:
+                _report_cache.popitem(last=False)
+    return pdf_bytes
+
+def is_pdf(data):
+    return isinstance(data, (bytes, bytearray)) and data[:5] == b"%PDF-"
+
+def _render_job(job):
+    analysis_json, filename = job
+    return generate_pdf_report(analysis_json, filename)
+
+def render_reports(jobs, workers=None):
+    """
+    Batch mode for portfolio exports: renders (analysis_json, filename) pairs in a
+    process pool, since FPDF rendering is CPU-bound. Yields PDF bytes in input
+    order as each report is ready, so callers can write it out straight away.
+    """
+    jobs = iter(jobs)
+    head = list(itertools.islice(jobs, 2))
+    if workers == 1 or len(head) < 2:
+        for job in itertools.chain(head, jobs):
+            yield _render_job(job)
+        return
+    pool = multiprocessing.get_context("spawn").Pool(workers)  # Never fork a threaded process
+    try:
+        yield from pool.imap(_render_job, itertools.chain(head, jobs), chunksize=4)
+    finally:
+        pool.terminate()
+
+def _render_pdf_report(analysis_json, filename, full_text, offset_index):
+    try:
+        from src.pdf_report import PDFReport  # fpdf is imported on first use to keep startup fast
+        pdf = PDFReport()
+        pdf.add_page()
+        
+        # --- 1. TITLE PAGE ---
+        pdf.set_font("Arial", "B", 20)
+        pdf.set_text_color(30, 58, 138)
+        pdf.cell(0, 15, f"Contract Risk Assessment", ln=True, align='C')
+        
+        pdf.set_font("Arial", "", 12)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(0, 10, f"Filename: {filename}", ln=True, align='C')
+        
+        score = analysis_json.get('risk_score', 0)
+        risk_level = analysis_json.get('overall_risk_level', 'Unknown')
+        
+        pdf.ln(5)
+        pdf.set_font("Arial", "B", 16)
+        if score > 70: pdf.set_text_color(220, 53, 69)
+        elif score > 40: pdf.set_text_color(255, 193, 7)
+        else: pdf.set_text_color(40, 167, 69)
+            
+        pdf.cell(0, 10, f"Risk Score: {score}/100 ({risk_level})", ln=True, align='C')
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(10)
+
+        # --- 2. EXECUTIVE SUMMARY ---
+        pdf.chapter_title("1. Executive Summary")
+        pdf.chapter_body(analysis_json.get('summary', 'No summary provided.'))
+
+        # --- 3. STRATEGIC ADVICE (New Section) ---
+        pdf.chapter_title("2. Strategic Advice & Alternatives")
+        advice = analysis_json.get('executive_advice', 'No specific advice generated.')
+        pdf.set_font("Arial", "I", 11)
+        pdf.multi_cell(0, 6, advice)
+        pdf.ln(5)
+        
+        # --- 4. REDLINED RISK AREAS ---
+        pdf.chapter_title("3. Redlined Risk Areas")
+        clauses = analysis_json.get('clauses', [])
+        high_risk = [c for c in clauses if c.get('risk_level') in ['High', 'Medium']]
+        
+        if not high_risk:
+            pdf.cell(0, 10, "No critical risks found.", ln=True)
+        
+        for clause in high_risk:
+            risk = clause.get('risk_level', 'Low')
+            if risk == 'High':
+                pdf.set_fill_color(255, 235, 238)
+            else:
+                pdf.set_fill_color(255, 243, 224)
+                
+            heading = f" {clause.get('title')} ({risk})"
+            if full_text and offset_index is not None:
+                page = locate_clause_page(full_text, clause.get('original_text'), offset_index)
+                if page:
+                    heading += f" - Page {page}"
+
+            pdf.set_font("Arial", "B", 11)
+            pdf.cell(0, 8, heading, ln=True, fill=False)
+            
+            pdf.set_font("Courier", "", 10)
+            pdf.multi_cell(0, 6, f"\"{clause.get('original_text', '')}\"", border=1, fill=True)
+            pdf.ln(2)
+            
+            pdf.set_font("Arial", "I", 10)
+            pdf.multi_cell(0, 6, f"Fix: {clause.get('recommendation')}")
+            pdf.ln(5)
+
+        # --- CRITICAL: RETURN BYTES ---
+        # This handles different FPDF versions safely
+        try:
+            return pdf.output(dest='S').encode('latin-1')
+        except:
+            return pdf.output()
+
+    except Exception as e:
+        # If PDF generation fails, return a basic error PDF byte string to prevent app crash
+        print(f"PDF Error: {e}")
         return b"Error generating PDF"
\ No newline at end of file
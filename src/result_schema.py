@@ -0,0 +1,283 @@
+import json
+import re
+
+RISK_LEVELS = ["Low", "Medium", "High"]
+# Stand-in score when the model gave none, by its stated overall level
+DEFAULT_RISK_SCORES = {"Low": 20, "Medium": 55, "High": 85}
+
+# The analysis result, defined once: sent to Ollama as the structured-output `format`,
+# rendered into the prompt, and used to validate whatever comes back
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "contract_type": {"type": "string", "description": "String"},
+        "parties": {"type": "array", "items": {"type": "string", "description": "Party name"}},
+        "risk_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "overall_risk_level": {"type": "string", "enum": RISK_LEVELS},
+        "summary": {"type": "string", "description": "String (Brief overview)"},
+        "executive_advice": {"type": "string", "description": "String (YOUR STRATEGIC ADVICE PARAGRAPH HERE)"},
+        "clauses": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "description": "String"},
+                    "risk_level": {"type": "string", "enum": RISK_LEVELS},
+                    "explanation": {"type": "string", "description": "String"},
+                    "recommendation": {"type": "string", "description": "String"},
+                    "original_text": {"type": "string", "description": "String (exact quote from the contract)"},
+                },
+                "required": ["title", "risk_level", "explanation", "recommendation", "original_text"],
+            },
+        },
+        "missing_clauses": {"type": "array", "items": {"type": "string", "description": "String"}},
+        "compliance_check": {
+            "type": "object",
+            "properties": {
+                "status": {"type": "string", "enum": ["Pass", "Fail"]},
+                "notes": {"type": "string", "description": "String"},
+            },
+            "required": ["status", "notes"],
+        },
+    },
+    "required": ["contract_type", "parties", "risk_score", "overall_risk_level", "summary",
+                 "executive_advice", "clauses", "missing_clauses", "compliance_check"],
+}
+
+def _example(schema):
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: _example(value) for key, value in schema["properties"].items()}
+    if kind == "array":
+        return [_example(schema["items"])]
+    if kind == "integer":
+        return f"Integer ({schema.get('minimum', 0)}-{schema.get('maximum', 100)})"
+    if "enum" in schema:
+        return "/".join(schema["enum"])
+    return schema.get("description", "String")
+
+def schema_prompt(schema=ANALYSIS_SCHEMA):
+    """
+    The schema as the JSON skeleton the prompt shows the model.
+    """
+    return json.dumps(_example(schema), indent=4)
+
+# --- Tolerant parsing ---
+class RepairingJSONScanner:
+    """
+    Incremental scanner for the first JSON object in a model response.
+    Tracks string/bracket state fragment by fragment and remembers the last
+    point where everything before it was complete, so a truncated response
+    can be cut back to that point and closed. Text after the object is ignored.
+    """
+    def __init__(self):
+        self.buf = []
+        self.length = 0
+        self.started = False
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.complete = False
+        self.safe = None  # (length, closers) of the last complete prefix
+
+    def feed(self, fragment):
+        for ch in fragment:
+            if self.complete:
+                return
+            if not self.started:
+                if ch != "{":
+                    continue
+                self.started = True
+            self.buf.append(ch)
+            self.length += 1
+            self._step(ch)
+
+    def _step(self, ch):
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif ch == "\\":
+                self.escape = True
+            elif ch == '"':
+                self.in_string = False
+            return
+        if ch == '"':
+            self.in_string = True
+        elif ch in "{[":
+            self.stack.append("}" if ch == "{" else "]")
+            self.safe = (self.length, tuple(self.stack))
+        elif ch in "}]":
+            if self.stack:
+                self.stack.pop()
+            if not self.stack:
+                self.complete = True
+            else:
+                self.safe = (self.length, tuple(self.stack))
+        elif ch == ",":
+            self.safe = (self.length - 1, tuple(self.stack))
+
+    def result(self):
+        """
+        Returns (parsed_object, repairs) where repairs lists what had to be fixed,
+        or (None, repairs) if nothing usable was found.
+        """
+        if not self.started:
+            return None, ["no_json"]
+        text = "".join(self.buf)
+        repairs = []
+        if not self.complete:
+            repairs.append("truncated")
+            if self.safe is None:
+                return None, repairs
+            length, closers = self.safe
+            text = text[:length] + "".join(reversed(closers))
+
+        for candidate in (text, _strip_trailing_commas(text)):
+            try:
+                value = json.loads(candidate)
+            except ValueError:
+                repairs.append("syntax")
+                continue
+            if candidate is not text:
+                repairs = [r for r in repairs if r != "syntax"] + ["trailing_comma"]
+            return (value, repairs) if isinstance(value, dict) else (None, repairs + ["not_object"])
+        return None, repairs
+
+def _strip_trailing_commas(text):
+    # String-aware removal of "," directly before a closing bracket
+    out, in_string, escape = [], False, False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(ch)
+    return "".join(out)
+
+# --- Validation ---
+def _text(value):
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+def normalize_risk_level(value):
+    """
+    Maps "high", "HIGH RISK", "Medium-risk" etc. onto Low/Medium/High; None if unrecognised.
+    """
+    text = _text(value).lower()
+    for level in ("high", "medium", "low"):
+        if level in text:
+            return level.capitalize()
+    if "moderate" in text:
+        return "Medium"
+    return None
+
+def validate_clause(clause):
+    """
+    Returns a cleaned clause, or None if it cannot be used.
+    """
+    if not isinstance(clause, dict):
+        return None
+    risk_level = normalize_risk_level(clause.get("risk_level"))
+    title = _text(clause.get("title")).strip()
+    original_text = _text(clause.get("original_text")).strip()
+    if risk_level is None or not (title or original_text):
+        return None
+    return {
+        "title": title or "Untitled clause",
+        "risk_level": risk_level,
+        "explanation": _text(clause.get("explanation")),
+        "recommendation": _text(clause.get("recommendation")),
+        "original_text": original_text,
+    }
+
+def validate_analysis(data):
+    """
+    Coerces a parsed model response into the analysis schema. Bad clauses are
+    dropped one by one; missing or malformed fields get defaults.
+    Returns (result, issues) where issues lists what was fixed.
+    """
+    issues = []
+
+    def field(key, default, check):
+        value = data.get(key)
+        if check(value):
+            return value
+        issues.append(f"defaulted:{key}")
+        return default
+
+    level = normalize_risk_level(data.get("overall_risk_level"))
+    score = data.get("risk_score")
+    if isinstance(score, str):
+        match = re.search(r"\d+", score)
+        score = int(match.group(0)) if match else None
+    if isinstance(score, (int, float)) and not isinstance(score, bool):
+        score = max(0, min(100, int(score)))
+    else:
+        # Never default to 0 ("Low"): take the middle of the stated level, or a neutral score
+        issues.append("defaulted:risk_score")
+        score = DEFAULT_RISK_SCORES.get(level, 50)
+
+    clauses = []
+    raw_clauses = data.get("clauses")
+    if not isinstance(raw_clauses, list):
+        issues.append("defaulted:clauses")
+        raw_clauses = []
+    for clause in raw_clauses:
+        cleaned = validate_clause(clause)
+        if cleaned is None:
+            issues.append("dropped_clause")
+        else:
+            clauses.append(cleaned)
+
+    if level is None:
+        issues.append("defaulted:overall_risk_level")
+        level = "High" if score > 70 else "Medium" if score > 40 else "Low"
+
+    compliance = data.get("compliance_check")
+    if isinstance(compliance, dict) and _text(compliance.get("status")).capitalize() in ("Pass", "Fail"):
+        compliance = {"status": _text(compliance["status"]).capitalize(), "notes": _text(compliance.get("notes"))}
+    else:
+        issues.append("defaulted:compliance_check")
+        compliance = {"status": "Unknown", "notes": "Compliance was not assessed."}
+
+    result = dict(data)  # Keep extra keys the pipeline adds (context_report, revision, ...)
+    result.update(
+        contract_type=_text(field("contract_type", "General", lambda v: isinstance(v, str) and v.strip())),
+        parties=[_text(p) for p in field("parties", [], lambda v: isinstance(v, list)) if _text(p).strip()],
+        risk_score=score,
+        overall_risk_level=level,
+        summary=_text(field("summary", "", lambda v: isinstance(v, str))),
+        executive_advice=_text(field("executive_advice", "", lambda v: isinstance(v, str))),
+        clauses=clauses,
+        missing_clauses=[_text(m) for m in field("missing_clauses", [], lambda v: isinstance(v, list)) if _text(m).strip()],
+        compliance_check=compliance,
+    )
+    return result, issues
+
+def parse_analysis(raw_text, scanner=None):
+    """
+    Tolerant parse + validation of an analysis response.
+    `scanner` may be a RepairingJSONScanner that was already fed the stream.
+    Returns (result or None, report) where report = {"repairs": [...], "issues": [...]}.
+    """
+    if scanner is None:
+        scanner = RepairingJSONScanner()
+        scanner.feed(raw_text)
+    data, repairs = scanner.result()
+    if data is not None and not any(key in data for key in ("risk_score", "clauses", "summary")):
+        data, repairs = None, repairs + ["empty"]  # Cut off before anything worth keeping
+    if data is None:
+        return None, {"repairs": repairs, "issues": []}
+    result, issues = validate_analysis(data)
+    return result, {"repairs": repairs, "issues": issues}
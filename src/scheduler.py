@@ -0,0 +1,291 @@
+import contextvars
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from src.llm_backend import BackendUnavailableError, get_default_pool
+from src.metrics import timed, LLM_QUEUE_SECONDS, LLM_GENERATION_SECONDS, LLM_ADMISSION
+
+# Lower rank is served first
+PRIORITIES = {"interactive": 0, "api": 1, "batch": 2}
+DEFAULT_PRIORITY = "api"
+# How often a call waiting for a slot on behalf of a SharedCaller checks whether it was abandoned
+ABANDON_POLL_SECONDS = 0.5
+
+class SchedulerOverloadedError(BackendUnavailableError):
+    pass
+
+_Caller = namedtuple("_Caller", ["priority", "client"])
+_current_caller = contextvars.ContextVar("llm_caller", default=_Caller(DEFAULT_PRIORITY, "default"))
+
+class SharedCaller:
+    """
+    Caller identity for work done on behalf of several callers at once (a
+    coalesced analysis). It runs at the most urgent priority among the callers
+    still attached, read live, so calls already queued pick up a change; once
+    every caller has detached it is abandoned and gets no further slots.
+    """
+    def __init__(self, client):
+        self.client = client
+        self._priorities = []
+        self._lock = threading.Lock()
+
+    def attach(self, priority):
+        with self._lock:
+            self._priorities.append(priority)
+
+    def detach(self, priority):
+        with self._lock:
+            self._priorities.remove(priority)
+
+    @property
+    def priority(self):
+        with self._lock:
+            return min(self._priorities, key=PRIORITIES.get, default=DEFAULT_PRIORITY)
+
+    @property
+    def abandoned(self):
+        with self._lock:
+            return not self._priorities
+
+def current_caller():
+    """
+    The (priority, client) model calls made here are tagged with.
+    """
+    return _current_caller.get()
+
+def use_caller(caller):
+    # Sets the caller for the rest of the current context (e.g. a SharedCaller in a worker thread)
+    _current_caller.set(caller)
+
+@contextmanager
+def llm_priority(priority, client="default"):
+    """
+    Tags every model call made inside the block (including worker threads started
+    with a copied context) with a priority class and a client id.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    token = _current_caller.set(_Caller(priority, client))
+    try:
+        yield
+    finally:
+        _current_caller.reset(token)
+
+def prioritized(events, priority, client="default"):
+    """
+    Wraps a generator so every step runs as `priority`/`client`. Needed when the
+    generator is advanced from different threads (e.g. a Starlette streaming response).
+    """
+    ctx = contextvars.copy_context()
+    ctx.run(_current_caller.set, _Caller(priority, client))
+    iterator = ctx.run(iter, events)
+    while True:
+        try:
+            yield ctx.run(next, iterator)
+        except StopIteration:
+            return
+
+class _Ticket:
+    def __init__(self, caller):
+        self.caller = caller
+        self.client = caller.client
+        self.enqueued = time.time()
+        self.granted = False
+
+    @property
+    def priority(self):
+        # Read at every dispatch: a SharedCaller's priority rises when a more urgent caller joins
+        return self.caller.priority
+
+class _TokenBucket:
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute / 6.0)  # Allow a burst of ten seconds' worth
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+class LLMScheduler:
+    """
+    Orders model calls before they reach the backend pool.
+    Waiting calls are served by priority class (interactive > api > batch), and
+    within a class the client with the fewest calls in flight goes first, so one
+    large upload cannot starve everyone else. Each class has a queue-depth limit
+    (admission control) and an optional per-client rate limit. Batch work never
+    takes the last free slot, which stays available for interactive reviews.
+    """
+    def __init__(self, backend, capacity=None, max_queue=None, rate_limits=None, reserve_interactive=1):
+        self.backend = backend
+        endpoints = getattr(backend, "endpoints", [])
+        self.capacity = capacity or sum(e.max_concurrency for e in endpoints) or 1
+        self.max_queue = {"interactive": 64, "api": 64, "batch": 512, **(max_queue or {})}
+        self.rate_limits = rate_limits or {}  # priority -> requests per minute per client
+        self.reserve_interactive = reserve_interactive if self.capacity > reserve_interactive else 0
+        self._waiting = []
+        self._in_flight = {}  # client -> calls in flight
+        self._in_flight_total = 0
+        self._buckets = {}
+        self._served = {p: 0 for p in PRIORITIES}
+        self._rejected = {p: 0 for p in PRIORITIES}
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls, backend):
+        # LLM_RATE_LIMITS=api:60,batch:600 (requests per minute per client)
+        limits = {}
+        for item in os.getenv("LLM_RATE_LIMITS", "").split(","):
+            if ":" in item:
+                priority, per_minute = item.split(":", 1)
+                limits[priority.strip()] = float(per_minute)
+        return cls(backend, rate_limits=limits)
+
+    # --- Admission ---
+    def _depth(self, priority):
+        return sum(1 for t in self._waiting if t.priority == priority)
+
+    def _check_admission(self, priority):
+        if self._depth(priority) >= self.max_queue[priority]:
+            self._rejected[priority] += 1
+            LLM_ADMISSION.inc(priority=priority, outcome="rejected")
+            raise SchedulerOverloadedError(f"LLM queue is full for {priority} requests. Try again later.")
+
+    def admit(self, priority):
+        """
+        Raises SchedulerOverloadedError if the queue for `priority` is full, so
+        callers can reject work up front instead of failing it later.
+        """
+        with self._cond:
+            self._check_admission(priority)
+
+    # --- Dispatch ---
+    def _bucket(self, ticket):
+        per_minute = self.rate_limits.get(ticket.priority)
+        if not per_minute:
+            return None
+        key = (ticket.priority, ticket.client)
+        if key not in self._buckets:
+            self._buckets[key] = _TokenBucket(per_minute)
+        return self._buckets[key]
+
+    def _dispatch(self):
+        # Grants free slots to the best eligible waiters; returns seconds until a rate-limited one is eligible
+        now = time.time()
+        next_ready = None
+        while self._waiting and self._in_flight_total < self.capacity:
+            free = self.capacity - self._in_flight_total
+            eligible = []
+            for ticket in self._waiting:
+                if ticket.priority == "batch" and free <= self.reserve_interactive:
+                    continue
+                bucket = self._bucket(ticket)
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = bucket.wait_time()
+                    if wait > 0:
+                        next_ready = wait if next_ready is None else min(next_ready, wait)
+                        continue
+                eligible.append(ticket)
+            if not eligible:
+                break
+            ticket = min(eligible, key=lambda t: (PRIORITIES[t.priority], self._in_flight.get(t.client, 0), t.enqueued))
+            bucket = self._bucket(ticket)
+            if bucket is not None:
+                bucket.tokens -= 1
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            self._in_flight[ticket.client] = self._in_flight.get(ticket.client, 0) + 1
+            self._in_flight_total += 1
+            self._served[ticket.priority] += 1
+            self._cond.notify_all()
+        return next_ready
+
+    def _acquire(self, caller, wait_timeout):
+        ticket = _Ticket(caller)
+        deadline = ticket.enqueued + wait_timeout
+        shared = isinstance(caller, SharedCaller)
+        with self._cond:
+            priority = ticket.priority
+            self._check_admission(priority)
+            LLM_ADMISSION.inc(priority=priority, outcome="admitted")
+            self._waiting.append(ticket)
+            while True:
+                next_ready = self._dispatch()
+                if ticket.granted:
+                    return ticket
+                if shared and caller.abandoned:
+                    # Nobody is waiting for this work any more: give the place in the queue back
+                    self._waiting.remove(ticket)
+                    raise BackendUnavailableError("Every caller waiting for this analysis has gone away")
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    raise BackendUnavailableError(f"Timed out after {wait_timeout}s waiting for an LLM slot")
+                timeout = min(remaining, next_ready) if next_ready else remaining
+                self._cond.wait(min(timeout, ABANDON_POLL_SECONDS) if shared else timeout)
+
+    def _release(self, ticket):
+        with self._cond:
+            self._in_flight[ticket.client] -= 1
+            if not self._in_flight[ticket.client]:
+                del self._in_flight[ticket.client]
+            self._in_flight_total -= 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    @contextmanager
+    def request(self, path, payload, timeout=180, stream=False, wait_timeout=600):
+        """
+        Same interface as BackendPool.request. The call waits for a scheduler slot
+        first; queue wait and generation time (slot held, including streaming)
+        are recorded separately.
+        """
+        with timed("llm_queue_wait"):
+            ticket = self._acquire(_current_caller.get(), wait_timeout)
+        granted = time.time()
+        priority = ticket.priority
+        LLM_QUEUE_SECONDS.observe(granted - ticket.enqueued, priority=priority)
+        try:
+            with self.backend.request(path, payload, timeout=timeout, stream=stream,
+                                      wait_timeout=max(1.0, wait_timeout - (granted - ticket.enqueued))) as response:
+                yield response
+        finally:
+            LLM_GENERATION_SECONDS.observe(time.time() - granted, priority=priority)
+            self._release(ticket)
+
+    def broadcast(self, path, payload, timeout=180):
+        return self.backend.broadcast(path, payload, timeout=timeout)
+
+    def stats(self):
+        with self._cond:
+            scheduler = {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight_total,
+                "queued": {p: self._depth(p) for p in PRIORITIES},
+                "served": dict(self._served),
+                "rejected": dict(self._rejected),
+                "max_queue": dict(self.max_queue),
+                "rate_limits": dict(self.rate_limits),
+            }
+        return {**self.backend.stats(), "scheduler": scheduler}
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+def get_default_scheduler():
+    """
+    Process-wide scheduler in front of the default backend pool.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler.from_env(get_default_pool())
+        return _default_scheduler
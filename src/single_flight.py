@@ -0,0 +1,109 @@
+import contextvars
+import threading
+
+from src.scheduler import SharedCaller, current_caller, use_caller
+
+# Set inside a flight: the event that is set once every caller waiting on it has gone away
+_flight_cancel = contextvars.ContextVar("flight_cancel", default=None)
+
+def cancelled():
+    """
+    True if the work running in the current flight no longer has anyone waiting for it.
+    Long-running work checks this between model calls.
+    """
+    event = _flight_cancel.get()
+    return event is not None and event.is_set()
+
+class _Flight:
+    def __init__(self, client):
+        self.caller = SharedCaller(client)  # Model calls run at the most urgent waiter's priority
+        self.waiters = 0
+        self.done = threading.Event()
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    work on a background thread, later callers attach to it, and all of them
+    receive the same result. Cancellation is reference-counted; the work is only
+    told to stop (see cancelled()) once every attached caller has cancelled, and
+    from then on its model calls get no further scheduler slots.
+    """
+    def __init__(self, poll_interval=0.2):
+        self.poll_interval = poll_interval
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def run(self, key, fn, cancel_event=None):
+        """
+        Returns fn() for `key`, sharing one execution among concurrent callers.
+        If `cancel_event` is set while waiting, this caller detaches and gets None.
+        Exceptions raised by fn are re-raised in every caller.
+        """
+        caller = current_caller()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(caller.client)
+                self.started += 1
+                start = True
+            else:
+                self.coalesced += 1
+                start = False
+            flight.waiters += 1
+            flight.caller.attach(caller.priority)
+
+        if start:
+            # The work inherits the first caller's context (stage trace), but its LLM
+            # priority follows whoever is still waiting for it
+            ctx = contextvars.copy_context()
+            ctx.run(use_caller, flight.caller)
+            thread = threading.Thread(target=ctx.run, args=(self._execute, key, flight, fn),
+                                      name="single-flight", daemon=True)
+            thread.start()
+
+        while not flight.done.wait(self.poll_interval if cancel_event is not None else None):
+            if cancel_event.is_set():
+                self._detach(key, flight, caller.priority)
+                return None
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _execute(self, key, flight, fn):
+        _flight_cancel.set(flight.cancel_event)
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def _detach(self, key, flight, priority):
+        with self._lock:
+            flight.waiters -= 1
+            flight.caller.detach(priority)
+            if flight.waiters == 0 and not flight.done.is_set():
+                # Nobody is left: stop the work and let the next caller start afresh
+                flight.cancel_event.set()
+                self.abandoned += 1
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "started": self.started,
+                "coalesced": self.coalesced,
+                "abandoned": self.abandoned,
+            }
@@ -0,0 +1,111 @@
+import json
+
+WHITESPACE = " \t\r\n"
+
+class IncrementalJSONParser:
+    """
+    Consumes a streamed JSON object fragment by fragment and reports each
+    top-level field as soon as its value closes. Elements of the arrays named
+    in `stream_arrays` are also reported one by one while the array is open.
+
+    feed() returns a list of events:
+        {"event": "field", "key": <name>, "value": <parsed value>}
+        {"event": "item", "field": <array name>, "index": <n>, "value": <parsed element>}
+    """
+    def __init__(self, stream_arrays=("clauses", "missing_clauses")):
+        self.stream_arrays = set(stream_arrays)
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key = None
+        self.key_start = None
+        self.state = "key"  # key -> colon -> value, only meaningful at depth 1
+        self.value_start = None
+        self.item_start = None
+        self.item_index = 0
+
+    def feed(self, fragment):
+        events = []
+        self.buf += fragment
+        while self.pos < len(self.buf):
+            self._step(self.buf[self.pos], events)
+            self.pos += 1
+        return events
+
+    def _emit_field(self, end, events):
+        raw = self.buf[self.value_start:end].strip()
+        try:
+            events.append({"event": "field", "key": self.key, "value": json.loads(raw)})
+        except ValueError:
+            pass
+        self.state = "key"
+        self.value_start = None
+
+    def _emit_item(self, end, events):
+        raw = self.buf[self.item_start:end].strip()
+        try:
+            events.append({"event": "item", "field": self.key, "index": self.item_index, "value": json.loads(raw)})
+            self.item_index += 1
+        except ValueError:
+            pass
+        self.item_start = None
+
+    def _streaming_array(self):
+        return self.key in self.stream_arrays and self.buf[self.value_start] == "["
+
+    def _step(self, ch, events):
+        i = self.pos
+
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif ch == "\\":
+                self.escape = True
+            elif ch == '"':
+                self.in_string = False
+                if self.depth == 1 and self.state == "key":
+                    self.key = self.buf[self.key_start + 1:i]
+                    self.state = "colon"
+                elif self.depth == 1 and self.state == "value":
+                    self._emit_field(i + 1, events)
+                elif self.depth == 2 and self.item_start is not None and self._streaming_array():
+                    self._emit_item(i + 1, events)
+            return
+
+        if ch in WHITESPACE:
+            return
+
+        # Start of a top-level value / array element
+        if self.depth == 1 and self.state == "value" and self.value_start is None:
+            self.value_start = i
+            self.item_index = 0
+        elif self.depth == 2 and self.state == "value" and self.item_start is None and ch not in ",]":
+            if self._streaming_array():
+                self.item_start = i
+
+        if ch == '"':
+            self.in_string = True
+            if self.depth == 1 and self.state == "key":
+                self.key_start = i
+        elif ch in "{[":
+            self.depth += 1
+        elif ch in "}]":
+            self.depth -= 1
+            if self.depth == 1 and self.item_start is not None:
+                self._emit_item(i, events)  # Trailing primitive before the closing bracket
+                self._emit_field(i + 1, events)
+            elif self.depth == 1 and self.state == "value":
+                self._emit_field(i + 1, events)
+            elif self.depth == 2 and self.item_start is not None:
+                self._emit_item(i + 1, events)
+            elif self.depth == 0 and self.state == "value" and self.value_start is not None:
+                self._emit_field(i, events)  # Trailing primitive before the closing brace
+        elif ch == ":" and self.depth == 1 and self.state == "colon":
+            self.state = "value"
+        elif ch == ",":
+            if self.depth == 1 and self.state == "value" and self.value_start is not None:
+                self._emit_field(i, events)
+            elif self.depth == 2 and self.item_start is not None:
+                self._emit_item(i, events)
@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from src.utils import normalize_text
+
+CONTRACT_TYPES = ["Employment Agreement", "NDA", "Service Agreement", "Lease Deed"]
+
+# Placeholders the base templates are generated with; filled locally per request
+PLACEHOLDERS = {
+    "PARTY_A": "full legal name of the first party",
+    "PARTY_B": "full legal name of the second party",
+    "EFFECTIVE_DATE": "date the agreement takes effect",
+    "AMOUNT": "fee, salary, rent or other consideration, with currency",
+    "JURISDICTION": "city whose courts have exclusive jurisdiction",
+}
+PLACEHOLDER_PATTERN = re.compile(r"\[\[([A-Z_]+)\]\]")
+
+def fill_template(text, params):
+    """
+    Substitutes [[PLACEHOLDER]] markers. Placeholders without a value are left visible.
+    """
+    params = params or {}
+    return PLACEHOLDER_PATTERN.sub(lambda m: params.get(m.group(1)) or m.group(0), text)
+
+def fill_stream(fragments, params):
+    """
+    fill_template for streamed text: holds back a possibly split "[[..." marker
+    until it is complete, and passes everything else through immediately.
+    """
+    pending = ""
+    for fragment in fragments:
+        pending += fragment
+        cut = pending.rfind("[[")
+        if cut == -1 or "]]" in pending[cut:]:
+            cut = len(pending)
+        if pending.endswith("[") and cut == len(pending):
+            cut -= 1
+        if cut:
+            yield fill_template(pending[:cut], params)
+            pending = pending[cut:]
+    if pending:
+        yield fill_template(pending, params)
+
+def _slug(contract_type):
+    return re.sub(r"[^a-z0-9]+", "_", contract_type.lower()).strip("_")
+
+class TemplateLibrary:
+    """
+    On-disk library of generated base templates, one per contract type and
+    TEMPLATE_VERSION. Parties, dates, amounts and jurisdiction are filled in
+    locally; the LLM is only called to build a missing base template or to
+    apply custom requirements, and those results are cached too.
+    """
+    # Bump whenever the base prompt changes so old templates are regenerated
+    TEMPLATE_VERSION = "1"
+
+    def __init__(self, analyzer, library_dir="data/templates", max_custom=200):
+        self.analyzer = analyzer
+        self.library_dir = library_dir
+        self.custom_dir = os.path.join(library_dir, "custom")
+        self.max_custom = max_custom
+        self._lock = threading.Lock()
+
+        # Ensure directory exists
+        if not os.path.exists(self.custom_dir):
+            os.makedirs(self.custom_dir)
+
+    # --- Storage ---
+    def _base_path(self, contract_type):
+        return os.path.join(self.library_dir, _slug(contract_type), f"v{self.TEMPLATE_VERSION}.txt")
+
+    def _custom_path(self, contract_type, requirements, base):
+        parts = [contract_type, normalize_text(requirements).lower(), self.TEMPLATE_VERSION,
+                 self.analyzer.model, hashlib.sha256((base or "").encode("utf-8")).hexdigest()]
+        key = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+        return os.path.join(self.custom_dir, f"{key}.txt")
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path, None)  # Recently used custom templates survive eviction
+            return text
+        except OSError:
+            return None
+
+    def _write(self, path, text, meta=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            if meta is not None:
+                with open(path[:-4] + ".json", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, indent=2)
+        except Exception as e:
+            print(f"Failed to write template: {e}")
+
+    def _evict_custom(self):
+        entries = []
+        for entry in os.scandir(self.custom_dir):
+            if entry.name.endswith(".txt"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_custom)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_base(self, contract_type):
+        return self._read(self._base_path(contract_type))
+
+    def versions(self, contract_type):
+        folder = os.path.dirname(self._base_path(contract_type))
+        if not os.path.isdir(folder):
+            return []
+        return sorted(name[1:-4] for name in os.listdir(folder) if name.startswith("v") and name.endswith(".txt"))
+
+    # --- Prompts ---
+    def _base_prompt(self, contract_type, requirements=""):
+        markers = "\n".join(f"[[{name}]] - {meaning}" for name, meaning in PLACEHOLDERS.items())
+        extra = f"\nAdditional requirements: {requirements}" if requirements else ""
+        return f"""Act as a Legal Expert drafting under Indian law (Indian Contract Act, 1872).
+Write a complete, standard {contract_type}.{extra}
+Wherever these details belong, write the placeholder exactly as shown and never invent names, dates or amounts:
+{markers}
+Output plain text only."""
+
+    def _custom_prompt(self, contract_type, base, requirements):
+        return f"""Act as a Legal Expert. Below is a standard {contract_type}.
+Revise it so that it satisfies these requirements: {requirements}
+Keep every [[PLACEHOLDER]] marker exactly as written. Output the complete revised contract as plain text only.
+
+{base}"""
+
+    # --- Generation ---
+    def stream(self, contract_type, params=None, requirements=""):
+        """
+        Yields the filled template text. Library and cache hits come back in one
+        piece immediately; LLM generations are streamed and stored once complete.
+        """
+        requirements = (requirements or "").strip()
+        base = self.get_base(contract_type)
+
+        if not requirements:
+            if base is not None:
+                yield fill_template(base, params)
+                return
+            path, prompt = self._base_path(contract_type), self._base_prompt(contract_type)
+        else:
+            path = self._custom_path(contract_type, requirements, base)
+            cached = self._read(path)
+            if cached is not None:
+                yield fill_template(cached, params)
+                return
+            # Without a base to revise, generate the custom contract directly
+            prompt = (self._custom_prompt(contract_type, base, requirements) if base is not None
+                      else self._base_prompt(contract_type, requirements))
+
+        parts = []
+
+        def generate():
+            for fragment in self.analyzer.stream_text(prompt, kind="template"):
+                parts.append(fragment)
+                yield fragment
+
+        try:
+            yield from fill_stream(generate(), params)
+        except Exception as e:
+            yield f"\n\n⚠️ Template generation failed: {e}"
+            return
+
+        text = "".join(parts).strip()
+        if not text:
+            return
+        meta = None if requirements else {
+            "contract_type": contract_type,
+            "template_version": self.TEMPLATE_VERSION,
+            "model": self.analyzer.model,
+            "generated_at": time.time(),
+            "placeholders": sorted(set(PLACEHOLDER_PATTERN.findall(text))),
+        }
+        with self._lock:
+            self._write(path, text, meta)
+            if requirements:
+                self._evict_custom()
+
+    def generate(self, contract_type, params=None, requirements=""):
+        return "".join(self.stream(contract_type, params, requirements))
+
+    def build(self, contract_types=None, force=False):
+        """
+        Pre-generates the base template for each contract type so requests are instant.
+        """
+        for contract_type in contract_types or CONTRACT_TYPES:
+            if force:
+                try:
+                    os.remove(self._base_path(contract_type))
+                except OSError:
+                    pass
+            elif self.get_base(contract_type) is not None:
+                print(f"✅ {contract_type}: v{self.TEMPLATE_VERSION} already in library")
+                continue
+            start = time.time()
+            self.generate(contract_type)
+            status = "✅" if self.get_base(contract_type) is not None else "❌"
+            print(f"{status} {contract_type}: generated in {time.time() - start:.1f}s")
+
+def main():
+    from src.llm_engine import ContractAnalyzer
+
+    parser = argparse.ArgumentParser(description="Pre-generate the base template library.")
+    parser.add_argument("--library", default="data/templates")
+    parser.add_argument("--force", action="store_true", help="Regenerate templates already in the library")
+    args = parser.parse_args()
+    TemplateLibrary(ContractAnalyzer(), args.library).build(force=args.force)
+
+if __name__ == "__main__":
+    main()
+
+# Run using: python -m src.templates
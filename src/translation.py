@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from src.metrics import CACHE_LOOKUPS
+
+# Structured output for one translation batch: the inputs, translated, in order
+TRANSLATION_SCHEMA = {
+    "type": "object",
+    "properties": {"translations": {"type": "array", "items": {"type": "string"}}},
+    "required": ["translations"],
+}
+
+def collect_fields(result):
+    """
+    The user-facing text of an analysis as a list of (path, text).
+    Quotes from the contract (original_text), titles, names and enums are never translated.
+    """
+    fields = []
+    for key in ("summary", "executive_advice"):
+        if result.get(key):
+            fields.append(((key,), result[key]))
+    for i, clause in enumerate(result.get("clauses", [])):
+        for key in ("explanation", "recommendation"):
+            if clause.get(key):
+                fields.append((("clauses", i, key), clause[key]))
+    for i, missing in enumerate(result.get("missing_clauses", [])):
+        if missing:
+            fields.append((("missing_clauses", i), missing))
+    notes = (result.get("compliance_check") or {}).get("notes")
+    if notes:
+        fields.append((("compliance_check", "notes"), notes))
+    return fields
+
+def apply_translations(result, translations):
+    """
+    Writes {path: text} back into `result` (modified in place).
+    """
+    for path, text in translations.items():
+        target = result
+        for step in path[:-1]:
+            target = target[step]
+        target[path[-1]] = text
+    return result
+
+def batch_texts(texts, max_chars=3000):
+    """
+    Groups texts into batches of roughly `max_chars`; a longer text gets a batch of its own.
+    """
+    batch, size = [], 0
+    for text in texts:
+        if batch and size + len(text) > max_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text)
+    if batch:
+        yield batch
+
+class TranslationCache:
+    """
+    Per-field translation cache: one SQLite row per (source text, language, model),
+    so a field shared by many analyses is translated once.
+    """
+    def __init__(self, cache_dir="data/cache/translations", max_entries=100000):
+        self.db_path = os.path.join(cache_dir, "translations.sqlite")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Ensure directory exists
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, text TEXT, used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_used ON translations (used)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def make_key(text, language, model):
+        return hashlib.sha256("\x1f".join([text, language, model]).encode("utf-8")).hexdigest()
+
+    def get_many(self, texts, language, model):
+        """
+        Returns {source text: translation} for the texts already cached.
+        """
+        keys = {self.make_key(t, language, model): t for t in set(texts)}
+        found = {}
+        with self._connect() as conn:
+            for key, text in conn.execute(
+                f"SELECT key, text FROM translations WHERE key IN ({','.join('?' * len(keys))})", list(keys)
+            ) if keys else []:
+                found[keys[key]] = text
+            if found:
+                conn.executemany("UPDATE translations SET used = ? WHERE key = ?",
+                                 [(time.time(), self.make_key(t, language, model)) for t in found])
+        hits, misses = len(found), len(keys) - len(found)
+        if hits:
+            CACHE_LOOKUPS.inc(hits, result="translation_hit")
+        if misses:
+            CACHE_LOOKUPS.inc(misses, result="translation_miss")
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+        return found
+
+    def set_many(self, pairs, language, model):
+        """
+        Stores {source text: translation}.
+        """
+        if not pairs:
+            return
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO translations (key, text, used) VALUES (?, ?, ?)",
+                             [(self.make_key(s, language, model), t, now) for s, t in pairs.items()])
+            overflow = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute("DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY used LIMIT ?)",
+                             (overflow,))
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
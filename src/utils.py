@@ -1,62 +1,56 @@
-import re
-
-def highlight_text(full_text, clauses):
-    """
-    Takes the full contract text and the list of risky clauses.
-    Wraps the risky 'original_text' in HTML <mark> tags for highlighting.
-    """
-    # 1. Preserve line breaks for HTML rendering
-    # We replace newlines with <br> placeholders, then do text replacement, then finalize HTML
-    html_text = full_text.replace("\n", "<br>")
-    
-    # 2. Iterate through analyzed clauses
-    for clause in clauses:
-        original = clause.get('original_text', '').strip()
-        risk_level = clause.get('risk_level', 'Low')
-        explanation = clause.get('explanation', '')
-        
-        if not original or len(original) < 10:
-            continue
-            
-        # Define Color Logic
-        if risk_level == "High":
-            color = "#ffcdd2" # Light Red
-            border = "2px solid #e53935"
-        elif risk_level == "Medium":
-            color = "#ffe0b2" # Light Orange
-            border = "2px solid #fb8c00"
-        else:
-            continue # Don't highlight Low risk to keep it clean
-
-        # 3. Create the Highlight HTML span with a Tooltip (title attribute)
-        # We use a simple Replace, but in production, fuzzy matching is better.
-        highlight_html = f"""
-        <span style="background-color: {color}; border-bottom: {border}; cursor: help;" title="{explanation}">
-            {original}
-        </span>
-        """
-        
-        # 4. Replace the text
-        # Escape special regex characters to avoid crashing on symbols like $ or ()
-        try:
-            # Simple string replace is safer than regex for exact matches
-            html_text = html_text.replace(original, highlight_html)
-        except Exception:
-            continue
-
-    # Wrap in a readable container
-    final_html = f"""
-    <div style="
-        font-family: 'Arial', sans-serif; 
-        font-size: 14px; 
-        line-height: 1.6; 
-        background-color: #f9f9f9; 
-        padding: 20px; 
-        border-radius: 10px; 
-        border: 1px solid #ddd;
-        height: 600px; 
-        overflow-y: scroll;">
-        {html_text}
-    </div>
-    """
+import re
+from src.highlighter import render_highlights_cached, render_page_cached
+from src.metrics import timed
+
+def normalize_text(text):
+    """
+    Collapses whitespace so that trivially re-formatted copies of the same
+    contract produce the same cache / dedup key.
+    """
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def locate_clause_page(full_text, original_text, offset_index):
+    """
+    Returns the page number where a clause's original_text appears, or None.
+    """
+    original = (original_text or "").strip()
+    if not original or offset_index is None:
+        return None
+    position = full_text.find(original)
+    if position < 0:
+        return None
+    return offset_index.page_of(position)
+
+def highlight_page(full_text, clauses, start, end):
+    """
+    Highlighted HTML for one page of the document viewer, memoized per page.
+    """
+    with timed("highlight"):
+        return render_page_cached(full_text, clauses, start, end)
+
+def highlight_text(full_text, clauses):
+    """
+    Takes the full contract text and the list of risky clauses.
+    Wraps the risky 'original_text' in HTML highlight spans (Medium/High only).
+    All clauses are matched in a single pass and the result is memoized per
+    (document, clauses), so Streamlit reruns do not redo the work.
+    """
+    with timed("highlight"):
+        html_text = render_highlights_cached(full_text, clauses)
+
+    # Wrap in a readable container
+    final_html = f"""
+    <div style="
+        font-family: 'Arial', sans-serif; 
+        font-size: 14px; 
+        line-height: 1.6; 
+        background-color: #f9f9f9; 
+        padding: 20px; 
+        border-radius: 10px; 
+        border: 1px solid #ddd;
+        height: 600px; 
+        overflow-y: scroll;">
+        {html_text}
+    </div>
+    """
     return final_html
\ No newline at end of file
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from src.chunking import split_sections
+from src.utils import normalize_text
+
+def _section_key(section):
+    return hashlib.sha1(normalize_text(section).lower().encode("utf-8")).hexdigest()[:16]
+
+def fingerprint(contract_text):
+    """
+    Ordered list of section hashes. Whitespace and case changes do not count as edits.
+    """
+    return [_section_key(s) for s in split_sections(contract_text) if s.strip()]
+
+def diff_sections(previous_fingerprint, contract_text):
+    """
+    Clause-level diff of a new version against a stored fingerprint.
+    Returns {"unchanged": [...], "changed": [...], "removed": n} where the lists
+    hold section texts of the new version in document order.
+    """
+    previous = set(previous_fingerprint)
+    unchanged, changed, seen = [], [], set()
+    for section in split_sections(contract_text):
+        if not section.strip():
+            continue
+        key = _section_key(section)
+        seen.add(key)
+        (unchanged if key in previous else changed).append(section)
+    return {"unchanged": unchanged, "changed": changed, "removed": len(previous - seen)}
+
+def _clause_key(clause):
+    return normalize_text(clause.get("original_text", "")).lower() or clause.get("title", "").lower()
+
+# Score points per clause, as in the rule engine's score (10 + 25 per High + 12 per Medium)
+CLAUSE_RISK_POINTS = {"High": 25, "Medium": 12}
+
+def revised_risk_score(previous_result, result):
+    """
+    Whole-document score for a partial re-analysis: the previous version's score,
+    moved by the risk of the clauses that disappeared and those that are new.
+    Unlike a merge with the changed fragment's own score, it stays comparable
+    with the previous score.
+    """
+    before = {_clause_key(c): c for c in previous_result.get("clauses", [])}
+    after = {_clause_key(c): c for c in result.get("clauses", [])}
+    try:
+        score = int(previous_result.get("risk_score", 0))
+    except (TypeError, ValueError):
+        score = 0
+    score -= sum(CLAUSE_RISK_POINTS.get(c.get("risk_level"), 0) for k, c in before.items() if k not in after)
+    score += sum(CLAUSE_RISK_POINTS.get(c.get("risk_level"), 0) for k, c in after.items() if k not in before)
+    return max(0, min(100, score))
+
+def risk_delta(previous_result, result):
+    """
+    What moved between two analyses: score, overall level, and clauses that appeared or disappeared.
+    """
+    before = {_clause_key(c): c for c in previous_result.get("clauses", [])}
+    after = {_clause_key(c): c for c in result.get("clauses", [])}
+
+    def brief(clause):
+        return {"title": clause.get("title", ""), "risk_level": clause.get("risk_level", "")}
+
+    previous_score = previous_result.get("risk_score", 0)
+    score = result.get("risk_score", 0)
+    return {
+        "previous_score": previous_score,
+        "risk_score": score,
+        "score_change": score - previous_score if isinstance(score, int) and isinstance(previous_score, int) else None,
+        "previous_level": previous_result.get("overall_risk_level"),
+        "overall_risk_level": result.get("overall_risk_level"),
+        "added_clauses": [brief(c) for k, c in after.items() if k not in before],
+        "removed_clauses": [brief(c) for k, c in before.items() if k not in after],
+    }
+
+class VersionStore:
+    """
+    Remembers analyzed contracts by their section fingerprints, so a new upload
+    can be recognised as a revision of an earlier one.
+    One JSON file per version: fingerprint, language and the analysis result.
+    """
+    def __init__(self, store_dir="data/versions", max_versions=200, min_similarity=0.5):
+        self.store_dir = store_dir
+        self.max_versions = max_versions
+        self.min_similarity = min_similarity
+        self._index = {}  # version id -> (language, set of section hashes, saved_at)
+        self._lock = threading.Lock()
+
+        # Ensure directory exists
+        if not os.path.exists(self.store_dir):
+            os.makedirs(self.store_dir)
+        self._load_index()
+
+    def _path(self, version_id):
+        return os.path.join(self.store_dir, f"{version_id}.json")
+
+    def _load_index(self):
+        for entry in os.scandir(self.store_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                self._index[record["id"]] = (record["language"], set(record["fingerprint"]), record["saved_at"])
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def find_previous(self, contract_fingerprint, language):
+        """
+        Returns (version_id, similarity) of the closest stored version in the same
+        language, or (None, 0.0) if nothing shares at least `min_similarity` of its sections.
+        """
+        current = set(contract_fingerprint)
+        best_id, best_similarity = None, 0.0
+        with self._lock:
+            candidates = list(self._index.items())
+        for version_id, (version_language, sections, _) in candidates:
+            if version_language != language or not sections:
+                continue
+            similarity = len(current & sections) / len(current | sections)
+            if similarity > best_similarity:
+                best_id, best_similarity = version_id, similarity
+        if best_similarity < self.min_similarity:
+            return None, 0.0
+        return best_id, round(best_similarity, 3)
+
+    def load(self, version_id):
+        try:
+            with open(self._path(version_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, contract_text, language, result, parent=None):
+        """
+        Stores a successful analysis as a version. Returns its id (None for errors).
+        Identical text in the same language maps to the same id.
+        """
+        if not result or "error" in result:
+            return None
+
+        contract_fingerprint = fingerprint(contract_text)
+        version_id = hashlib.sha256("\x1f".join(contract_fingerprint + [language]).encode("utf-8")).hexdigest()[:24]
+        record = {
+            "id": version_id,
+            "language": language,
+            "parent": parent,
+            "saved_at": time.time(),
+            "fingerprint": contract_fingerprint,
+            "result": result,
+        }
+        path = self._path(version_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to write contract version: {e}")
+            return None
+
+        with self._lock:
+            self._index[version_id] = (language, set(contract_fingerprint), record["saved_at"])
+            overflow = sorted(self._index.items(), key=lambda kv: kv[1][2])[:max(0, len(self._index) - self.max_versions)]
+            for old_id, _ in overflow:
+                del self._index[old_id]
+                try:
+                    os.remove(self._path(old_id))
+                except OSError:
+                    pass
+        return version_id